@@ -1,68 +1,199 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, g, request, jsonify
 from flask_cors import CORS
 import pandas as pd
-import sqlite3
 import os
+import hashlib
+import json
+import threading
+import time
 from datetime import datetime
 import numpy as np
 from werkzeug.utils import secure_filename
 
 # Import your database functions
-from api import (
+from database_setup import (
     setup_database, 
-    insert_fraudulent_transactions, 
-    get_fraudulent_transactions, 
+    schema_ready,
+    start_retention,
+    insert_fraudulent_frame,
+    append_fraudulent_transactions,
+    log_processing,
+    get_job,
+    decode_cursor,
+    get_fraudulent_transactions_page,
+    get_fraud_statistics as get_fraud_rollups,
+    get_fraud_geo_statistics,
     get_processing_logs
 )
+from ingestion import (
+    allowed_extension, read_transactions, iter_transaction_chunks, IDENTIFIER_COLUMNS, UploadParseError
+)
+import geo
+import metrics
+import result_cache
+from jobs import JobRunner, JOB_CHUNK_SIZE, job_status
+from serialization import (
+    COLUMNAR, MEDIA_TYPES, NDJSON, iter_columnar, iter_ndjson, iter_records, validate_format
+)
 
 app = Flask(__name__)
-CORS(app)  # Enable CORS for React frontend
+CORS(app, expose_headers=['X-Next-Cursor', 'X-Result-Cache', 'Server-Timing'])  # Enable CORS for React frontend
+
+@app.before_request
+def start_request_metrics():
+    g.request_started = time.perf_counter()
+    # X-Profile: 1 returns this request's stage breakdown as Server-Timing
+    if metrics.profiling_requested(request.headers.get(metrics.PROFILE_HEADER)):
+        g.profile_token = metrics.start_profile()
 
-# Configuration
-UPLOAD_FOLDER = 'uploads'
-ALLOWED_EXTENSIONS = {'csv', 'xlsx', 'xls'}
-app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
+@app.after_request
+def record_request_metrics(response):
+    elapsed = time.perf_counter() - g.request_started
+    path = request.url_rule.rule if request.url_rule else 'unmatched'
+    metrics.observe_request(request.method, path, response.status_code, elapsed)
+    token = g.pop('profile_token', None)
+    if token is not None:
+        response.headers['Server-Timing'] = metrics.server_timing(metrics.stop_profile(token), elapsed)
+    return response
 
-# Create upload directory if it doesn't exist
-os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+@app.teardown_request
+def stop_request_profile(exc):
+    # The handler failed before after_request ran; don't leak the profile
+    token = g.pop('profile_token', None)
+    if token is not None:
+        metrics.stop_profile(token)
+
+# Columns parsed from uploads: everything the rules read or the database stores
+UPLOAD_COLUMNS = [
+    'step', 'type', 'amount', 'oldbalanceOrg', 'newbalanceOrig',
+    'oldbalanceDest', 'newbalanceDest', 'isFlaggedFraud'
+] + IDENTIFIER_COLUMNS
 
 def allowed_file(filename):
-    return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
+    return allowed_extension(filename)
+
+def _column(df, name, default=0):
+    """Return a column, or a constant Series when the upload lacks it"""
+    if name in df.columns:
+        return df[name]
+    return pd.Series(default, index=df.index)
+
+# Rule table: (description, score weight, vectorized predicate over the frame).
+# Each predicate returns a boolean mask for the whole upload, so adding a rule
+# is one more entry here rather than another branch in a per-row loop.
+FRAUD_RULES = [
+    (
+        'Large amount transfers', 30,
+        lambda df: (_column(df, 'type', None) == 'TRANSFER') & (_column(df, 'amount') > 100000)
+    ),
+    (
+        'Cash out with high amounts', 25,
+        lambda df: (_column(df, 'type', None) == 'CASH_OUT') & (_column(df, 'amount') > 50000)
+    ),
+    (
+        'Balance inconsistencies', 40,
+        lambda df: (_column(df, 'oldbalanceOrg') - _column(df, 'amount')) != _column(df, 'newbalanceOrig')
+    ),
+    (
+        'Zero destination balance after receiving money', 35,
+        lambda df: _column(df, 'type', None).isin(['TRANSFER', 'CASH_IN']) & (_column(df, 'newbalanceDest') == 0)
+    ),
+]
+
+# Transactions scoring above this are marked as fraud
+FRAUD_SCORE_THRESHOLD = 50
+
+# Fingerprint of the rule table; part of every result cache key
+RULES_VERSION = 'rules-' + hashlib.sha256(
+    repr(([(description, weight) for description, weight, _ in FRAUD_RULES],
+          FRAUD_SCORE_THRESHOLD)).encode()
+).hexdigest()[:16]
+
+def score_transactions(df, rules=FRAUD_RULES):
+    """Compute the rule-based fraud score of every row at once"""
+    fraud_score = np.zeros(len(df), dtype=np.int64)
+    for _, weight, predicate in rules:
+        fraud_score += weight * np.asarray(predicate(df), dtype=bool)
+    return fraud_score
+
+def detect_fraud_frame(df, rules=FRAUD_RULES):
+    """
+    Return the fraudulent rows of ``df`` as a DataFrame with
+    ``isFlaggedFraud`` and ``prediction_confidence`` filled in
+    """
+    fraud_score = score_transactions(df, rules)
+    is_fraud = fraud_score > FRAUD_SCORE_THRESHOLD
+    
+    fraudulent_df = df[is_fraud].copy()
+    fraudulent_df['isFlaggedFraud'] = 1
+    fraudulent_df['prediction_confidence'] = np.minimum(fraud_score[is_fraud], 100)
+    return fraudulent_df
 
 def detect_fraud(df):
     """
     Simple fraud detection logic - replace with your ML model
     This is a basic rule-based approach for demonstration
     """
-    fraudulent_transactions = []
-    
-    for _, row in df.iterrows():
-        fraud_score = 0
-        
-        # Rule 1: Large amount transfers
-        if row.get('type') == 'TRANSFER' and row.get('amount', 0) > 100000:
-            fraud_score += 30
-            
-        # Rule 2: Cash out with high amounts
-        if row.get('type') == 'CASH_OUT' and row.get('amount', 0) > 50000:
-            fraud_score += 25
-            
-        # Rule 3: Balance inconsistencies
-        if (row.get('oldbalanceOrg', 0) - row.get('amount', 0)) != row.get('newbalanceOrig', 0):
-            fraud_score += 40
-            
-        # Rule 4: Zero destination balance after receiving money
-        if row.get('type') in ['TRANSFER', 'CASH_IN'] and row.get('newbalanceDest', 0) == 0:
-            fraud_score += 35
+    return detect_fraud_frame(df).to_dict('records')
+
+REQUIRED_COLUMNS = ['step', 'type', 'amount', 'oldbalanceOrg', 'newbalanceOrig']
+
+def run_upload_job(job, path, report):
+    """Apply the rules to a spooled upload chunk by chunk (job worker thread)"""
+    total_transactions = 0
+    fraudulent_count = 0
+    preview_data = []
+    with open(path, 'rb') as source:
+        for chunk in iter_transaction_chunks(source, job['filename'], UPLOAD_COLUMNS, JOB_CHUNK_SIZE):
+            if total_transactions == 0:
+                missing_columns = [col for col in REQUIRED_COLUMNS if col not in chunk.columns]
+                if missing_columns:
+                    raise ValueError(f'Missing required columns: {missing_columns}')
+                preview_data = json.loads(chunk.head(10).to_json(orient='records'))
             
-        # Mark as fraud if score > 50
-        if fraud_score > 50:
-            transaction_dict = row.to_dict()
-            transaction_dict['isFlaggedFraud'] = 1
-            transaction_dict['prediction_confidence'] = min(fraud_score, 100)
-            fraudulent_transactions.append(transaction_dict)
+            fraudulent_df = detect_fraud_frame(chunk)
+            append_fraudulent_transactions(fraudulent_df)
+            total_transactions += len(chunk)
+            fraudulent_count += len(fraudulent_df)
+            report(total_transactions, fraudulent_count)
     
-    return fraudulent_transactions
+    log_processing(job['filename'], total_transactions, fraudulent_count, RULES_VERSION)
+    result = {
+        'message': 'File processed successfully',
+        'total_transactions': total_transactions,
+        'fraudulent_count': fraudulent_count,
+        'fraud_rate': f"{(fraudulent_count / max(total_transactions, 1) * 100):.2f}%",
+        'preview_data': preview_data
+    }
+    cache_key = job['options'].get('cache_key')
+    if cache_key:
+        result_cache.put(cache_key, result)
+    return result
+
+_job_runner = None
+_job_runner_lock = threading.Lock()
+
+def get_job_runner():
+    """The upload job runner, started on first use if it is not running yet"""
+    global _job_runner
+    if _job_runner is None:
+        with _job_runner_lock:
+            # Concurrent first submits must not start a second runner
+            if _job_runner is None:
+                runner = JobRunner('upload', run_upload_job)
+                runner.start()
+                _job_runner = runner
+    return _job_runner
+
+def start_background_work():
+    """Start the job runner and retention thread for this process.
+
+    Starting the runner takes over jobs left queued or running by a stopped
+    server, so they resume without waiting for the next submit. WSGI
+    servers should call this once per worker after setup_database().
+    """
+    get_job_runner()
+    start_retention()
 
 @app.route('/api/upload', methods=['POST'])
 def upload_file():
@@ -75,60 +206,127 @@ def upload_file():
             return jsonify({'error': 'No file selected'}), 400
         
         if not allowed_file(file.filename):
-            return jsonify({'error': 'Invalid file type. Please upload CSV or Excel files.'}), 400
+            return jsonify({'error': 'Invalid file type. Please upload CSV (plain, gzip or zstd), Parquet, Arrow or Excel files.'}), 400
         
-        # Save uploaded file
         filename = secure_filename(file.filename)
-        filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-        file.save(filepath)
         
-        # Read the file
+        # A file already scored by the same rules is answered from the result
+        # cache without being parsed, scored or stored again
+        cache_key = None
+        if result_cache.enabled():
+            with metrics.stage('hash'):
+                content_hash = result_cache.hash_upload(file.stream)
+            cache_key = result_cache.cache_key(content_hash, RULES_VERSION)
+            cached = result_cache.get(cache_key)
+            if cached is not None:
+                response = jsonify(cached)
+                response.headers['X-Result-Cache'] = 'hit'
+                return response
+        
+        # Parse straight from the request stream; nothing is written to disk
         try:
-            if filename.endswith('.csv'):
-                df = pd.read_csv(filepath)
-            else:
-                df = pd.read_excel(filepath)
-        except Exception as e:
+            with metrics.stage('parse'):
+                df = read_transactions(file.stream, filename, UPLOAD_COLUMNS)
+        except UploadParseError as e:
             return jsonify({'error': f'Error reading file: {str(e)}'}), 400
+        metrics.count_rows('parse', len(df))
         
         # Validate required columns
-        required_columns = ['step', 'type', 'amount', 'oldbalanceOrg', 'newbalanceOrig']
-        missing_columns = [col for col in required_columns if col not in df.columns]
+        missing_columns = [col for col in REQUIRED_COLUMNS if col not in df.columns]
         if missing_columns:
             return jsonify({'error': f'Missing required columns: {missing_columns}'}), 400
         
         # Run fraud detection
-        fraudulent_transactions = detect_fraud(df)
+        with metrics.stage('detect_fraud', len(df)):
+            fraudulent_df = detect_fraud_frame(df)
         
-        # Prepare data for database insertion
-        transaction_data = {
-            'fraudulent_data': fraudulent_transactions,
-            'total_transactions': len(df)
-        }
+        # Bulk insert the flagged rows into the database
+        insert_fraudulent_frame(fraudulent_df, filename, len(df), RULES_VERSION)
         
-        # Insert into database
-        insert_fraudulent_transactions(transaction_data, filename)
-        
-        # Clean up uploaded file
-        os.remove(filepath)
-        
-        return jsonify({
+        result = {
             'message': 'File processed successfully',
             'total_transactions': len(df),
-            'fraudulent_count': len(fraudulent_transactions),
-            'fraud_rate': f"{(len(fraudulent_transactions) / len(df) * 100):.2f}%",
+            'fraudulent_count': len(fraudulent_df),
+            'fraud_rate': f"{(len(fraudulent_df) / len(df) * 100):.2f}%",
             'preview_data': df.head(10).to_dict('records')  # First 10 rows for preview
-        })
+        }
+        response = jsonify(result)
+        if cache_key is not None:
+            with metrics.stage('cache_store'):
+                result_cache.put(cache_key, result)
+            response.headers['X-Result-Cache'] = 'miss'
+        return response
+        
+    except Exception as e:
+        return jsonify({'error': f'Server error: {str(e)}'}), 500
+
+@app.route('/api/upload/jobs', methods=['POST'])
+def submit_upload_job():
+    """Queue an upload for background processing; poll /api/jobs/<job_id>"""
+    try:
+        if 'file' not in request.files:
+            return jsonify({'error': 'No file provided'}), 400
+        
+        file = request.files['file']
+        if file.filename == '':
+            return jsonify({'error': 'No file selected'}), 400
+        
+        if not allowed_file(file.filename):
+            return jsonify({'error': 'Invalid file type. Please upload CSV (plain, gzip or zstd), Parquet, Arrow or Excel files.'}), 400
+        
+        filename = secure_filename(file.filename)
+        runner = get_job_runner()
+        
+        options = {}
+        if result_cache.enabled():
+            options['cache_key'] = result_cache.cache_key(result_cache.hash_upload(file.stream), RULES_VERSION)
+            cached = result_cache.get(options['cache_key'])
+            if cached is not None:
+                job_id = runner.complete(filename, cached, options)
+                return jsonify({'job_id': job_id, 'status': 'done', 'status_url': f'/api/jobs/{job_id}'}), 202
+        
+        job_id = runner.submit(file.stream, filename, options)
+        return jsonify({'job_id': job_id, 'status': 'queued', 'status_url': f'/api/jobs/{job_id}'}), 202
         
     except Exception as e:
         return jsonify({'error': f'Server error: {str(e)}'}), 500
 
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_upload_job(job_id):
+    try:
+        job = get_job(job_id)
+        if job is None:
+            return jsonify({'error': f'Job {job_id} not found'}), 404
+        return jsonify(job_status(job))
+    except Exception as e:
+        return jsonify({'error': f'Error fetching job: {str(e)}'}), 500
+
 @app.route('/api/fraud-transactions', methods=['GET'])
 def get_fraud_transactions():
+    limit = request.args.get('limit', 100, type=int)
+    cursor = request.args.get('cursor')
     try:
-        limit = request.args.get('limit', 100, type=int)
-        transactions = get_fraudulent_transactions(limit)
-        return jsonify(transactions)
+        response_format = validate_format(request.args.get('format', 'json'))
+        if cursor is not None:
+            decode_cursor(cursor)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    try:
+        transactions, next_cursor = get_fraudulent_transactions_page(limit, cursor)
+        
+        # Stream the page in the requested shape: a records array (default),
+        # NDJSON or {column: [values]}; the keyset cursor rides in a header
+        if response_format == NDJSON:
+            body = iter_ndjson(transactions)
+        elif response_format == COLUMNAR:
+            body = iter_columnar(transactions)
+        else:
+            body = iter_records(transactions)
+        response = Response(body, mimetype=MEDIA_TYPES[response_format])
+        if next_cursor:
+            response.headers['X-Next-Cursor'] = next_cursor
+        return response
     except Exception as e:
         return jsonify({'error': f'Error fetching transactions: {str(e)}'}), 500
 
@@ -144,10 +342,11 @@ def get_logs():
 @app.route('/api/fraud-stats', methods=['GET'])
 def get_fraud_statistics():
     try:
-        # Get all fraudulent transactions for statistics
-        transactions = get_fraudulent_transactions(1000)
+        # Rollups are maintained on insert, so this covers the whole history
+        rollups = get_fraud_rollups()
+        total = rollups['total']
         
-        if not transactions:
+        if not total['fraud_count']:
             return jsonify({
                 'fraudByStep': [],
                 'fraudByType': [],
@@ -156,49 +355,37 @@ def get_fraud_statistics():
                 'totalAmount': 0
             })
         
-        df = pd.DataFrame(transactions)
-        
         # Fraud by step
-        fraud_by_step = df.groupby('step').agg({
-            'id': 'count',
-            'amount': 'sum'
-        }).reset_index()
-        fraud_by_step.columns = ['step', 'fraudCount', 'totalAmount']
-        fraud_by_step['totalTransactions'] = fraud_by_step['fraudCount'] * 2  # Estimate
+        fraud_by_step = [{
+            'step': row['step'],
+            'fraudCount': row['fraud_count'],
+            'totalAmount': row['total_amount'],
+            'totalTransactions': row['fraud_count'] * 2  # Estimate
+        } for row in rollups['by_step']]
         
         # Fraud by type
-        fraud_by_type = df.groupby('type').agg({
-            'id': 'count',
-            'amount': 'sum'
-        }).reset_index()
-        fraud_by_type.columns = ['type', 'count', 'amount']
+        fraud_by_type = [{
+            'type': row['type'],
+            'count': row['fraud_count'],
+            'amount': row['total_amount']
+        } for row in rollups['by_type']]
         
         # Amount ranges
-        def categorize_amount(amount):
-            if amount < 1000:
-                return '0-1K'
-            elif amount < 10000:
-                return '1K-10K'
-            elif amount < 50000:
-                return '10K-50K'
-            elif amount < 100000:
-                return '50K-100K'
-            else:
-                return '100K+'
-        
-        df['amount_range'] = df['amount'].apply(categorize_amount)
-        amount_ranges = df.groupby('amount_range').agg({
-            'id': 'count',
-            'prediction_confidence': 'mean'
-        }).reset_index()
-        amount_ranges.columns = ['range', 'count', 'avgRisk']
+        amount_ranges = [{
+            'range': row['amount_range'],
+            'count': row['fraud_count'],
+            'avgRisk': (
+                row['confidence_sum'] / row['confidence_count']
+                if row['confidence_count'] else None
+            )
+        } for row in rollups['by_amount_range']]
         
         return jsonify({
-            'fraudByStep': fraud_by_step.to_dict('records'),
-            'fraudByType': fraud_by_type.to_dict('records'),
-            'amountRanges': amount_ranges.to_dict('records'),
-            'totalFraud': len(transactions),
-            'totalAmount': df['amount'].sum()
+            'fraudByStep': fraud_by_step,
+            'fraudByType': fraud_by_type,
+            'amountRanges': amount_ranges,
+            'totalFraud': total['fraud_count'],
+            'totalAmount': total['total_amount']
         })
         
     except Exception as e:
@@ -207,87 +394,82 @@ def get_fraud_statistics():
 @app.route('/api/fraud-geo-data', methods=['GET'])
 def get_fraud_geo_data():
     try:
-        # Get all fraudulent transactions for geo mapping
-        transactions = get_fraudulent_transactions(1000)
-        
-        if not transactions:
-            return jsonify([])
+        city = request.args.get('city')
+        if city is not None:
+            # Drill-down: one page of a city's transactions, newest first
+            if city not in geo.CITY_INDEX:
+                return jsonify({'error': f'Unknown city: {city}'}), 400
+            limit = request.args.get('limit', 100, type=int)
+            cursor = request.args.get('cursor')
+            if cursor is not None:
+                try:
+                    decode_cursor(cursor)
+                except ValueError as e:
+                    return jsonify({'error': str(e)}), 400
+            transactions, next_cursor = get_fraudulent_transactions_page(
+                limit, cursor, geo.CITY_INDEX[city]
+            )
+            response = jsonify({'city': city, 'transactions': transactions, 'next_cursor': next_cursor})
+            if next_cursor:
+                response.headers['X-Next-Cursor'] = next_cursor
+            return response
         
-        # Madhya Pradesh cities with coordinates
-        mp_cities = {
-            'Bhopal': {'lat': 23.2599, 'lng': 77.4126, 'district': 'Bhopal'},
-            'Indore': {'lat': 22.7196, 'lng': 75.8577, 'district': 'Indore'},
-            'Jabalpur': {'lat': 23.1815, 'lng': 79.9864, 'district': 'Jabalpur'},
-            'Gwalior': {'lat': 26.2183, 'lng': 78.1828, 'district': 'Gwalior'},
-            'Ujjain': {'lat': 23.1765, 'lng': 75.7885, 'district': 'Ujjain'},
-            'Sagar': {'lat': 23.8388, 'lng': 78.7378, 'district': 'Sagar'},
-            'Dewas': {'lat': 22.9676, 'lng': 76.0534, 'district': 'Dewas'},
-            'Satna': {'lat': 24.5670, 'lng': 80.8320, 'district': 'Satna'},
-            'Ratlam': {'lat': 23.3315, 'lng': 75.0367, 'district': 'Ratlam'},
-            'Rewa': {'lat': 24.5364, 'lng': 81.2964, 'district': 'Rewa'},
-            'Singrauli': {'lat': 24.1992, 'lng': 82.6739, 'district': 'Singrauli'},
-            'Burhanpur': {'lat': 21.3009, 'lng': 76.2291, 'district': 'Burhanpur'},
-            'Khandwa': {'lat': 21.8343, 'lng': 76.3569, 'district': 'Khandwa'},
-            'Bhind': {'lat': 26.5653, 'lng': 78.7875, 'district': 'Bhind'},
-            'Chhindwara': {'lat': 22.0572, 'lng': 78.9315, 'district': 'Chhindwara'},
-            'Guna': {'lat': 24.6537, 'lng': 77.3112, 'district': 'Guna'},
-            'Shivpuri': {'lat': 25.4244, 'lng': 77.6581, 'district': 'Shivpuri'},
-            'Vidisha': {'lat': 23.5251, 'lng': 77.8081, 'district': 'Vidisha'},
-            'Chhatarpur': {'lat': 24.9178, 'lng': 79.5941, 'district': 'Chhatarpur'}
-        }
-        
-        # Group transactions by simulated cities
-        city_keys = list(mp_cities.keys())
-        grouped_data = {}
-        
-        for i, transaction in enumerate(transactions):
-            # Simulate city assignment based on transaction characteristics
-            city_index = abs(
-                (transaction.get('id', i)) + 
-                int(transaction.get('amount', 0)) + 
-                int(transaction.get('step', 0))
-            ) % len(city_keys)
-            
-            city_name = city_keys[city_index]
-            
-            if city_name not in grouped_data:
-                grouped_data[city_name] = {
-                    'city': city_name,
-                    'coordinates': mp_cities[city_name],
-                    'transactions': [],
-                    'total_amount': 0,
-                    'avg_risk_score': 0,
-                    'count': 0
-                }
-            
-            grouped_data[city_name]['transactions'].append(transaction)
-            grouped_data[city_name]['total_amount'] += transaction.get('amount', 0)
-            grouped_data[city_name]['count'] += 1
-        
-        # Calculate averages and risk scores
-        for city_data in grouped_data.values():
-            if city_data['count'] > 0:
-                city_data['avg_risk_score'] = sum(
-                    t.get('prediction_confidence', 0) for t in city_data['transactions']
-                ) / city_data['count']
-                city_data['avg_amount'] = city_data['total_amount'] / city_data['count']
+        # Cities are assigned at insert and rolled up per city, so this is one
+        # small table read however much fraud has been stored
+        grouped_data = []
+        for row in get_fraud_geo_statistics():
+            location = geo.CITIES[row['city']]
+            grouped_data.append({
+                'city': location['city'],
+                'coordinates': {key: location[key] for key in ('lat', 'lng', 'district')},
+                'total_amount': row['total_amount'],
+                'avg_risk_score': (
+                    row['confidence_sum'] / row['confidence_count']
+                    if row['confidence_count'] else 0
+                ),
+                'avg_amount': row['total_amount'] / row['fraud_count'],
+                'count': row['fraud_count']
+            })
         
-        return jsonify(list(grouped_data.values()))
+        return jsonify(grouped_data)
         
     except Exception as e:
         return jsonify({'error': f'Error generating geo data: {str(e)}'}), 500
 
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    return Response(metrics.render(), content_type=metrics.CONTENT_TYPE)
+
 @app.route('/api/health', methods=['GET'])
 def health_check():
     return jsonify({
         'status': 'healthy',
         'timestamp': datetime.now().isoformat(),
-        'database': 'connected'
+        'database': 'connected',
+        'ready': schema_ready()
     })
 
+@app.route('/api/health/live', methods=['GET'])
+def liveness():
+    return jsonify({'status': 'alive', 'timestamp': datetime.now().isoformat()})
+
+@app.route('/api/health/ready', methods=['GET'])
+def readiness():
+    # The rules need no model; ready once the schema is set up
+    ready = schema_ready()
+    return jsonify({
+        'status': 'ready' if ready else 'database not set up',
+        'ready': ready,
+        'timestamp': datetime.now().isoformat()
+    }), 200 if ready else 503
+
 if __name__ == '__main__':
     # Setup database on startup
     setup_database()
+    # The debug reloader runs this module in a watcher process and again in
+    # the server process it spawns; background work belongs to the server
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        start_background_work()
     print("Fraud Detection API Server Starting...")
     print("Database initialized successfully!")
     print("Server running on http://localhost:5000")
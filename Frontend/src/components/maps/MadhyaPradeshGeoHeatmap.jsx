@@ -199,6 +199,18 @@ const MadhyaPradeshGeoHeatmap = ({ refreshTrigger }) => {
       // Try to fetch geo data from API first
       try {
         const geoData = await getFraudGeoData();
+        if (Array.isArray(geoData) && geoData.length > 0) {
+          // Precomputed per-city aggregates; transactions are paged per city on demand
+          setMapData(geoData.map(cityData => ({
+            city: cityData.city,
+            coordinates: cityData.coordinates,
+            count: cityData.count,
+            totalAmount: cityData.total_amount,
+            avgRiskScore: cityData.avg_risk_score,
+            transactions: []
+          })));
+          return;
+        }
         if (geoData && geoData.districts && geoData.districts.length > 0) {
           // Transform API response to match component format
           const transformedData = geoData.districts.map(district => ({
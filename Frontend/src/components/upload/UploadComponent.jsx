@@ -1,11 +1,18 @@
 import React, { useState } from 'react';
-import { uploadFile } from '../../services/api';
+import { uploadFile, submitUploadJob, getJobStatus } from '../../services/api';
+
+// Files at least this large are scored as a background job and polled
+const JOB_UPLOAD_BYTES = 50 * 1024 * 1024;
+const JOB_POLL_MS = 1000;
+
+const sleep = (ms) => new Promise((resolve) => setTimeout(resolve, ms));
 
 const UploadComponent = ({ onUploadSuccess }) => {
   const [selectedFile, setSelectedFile] = useState(null);
   const [uploading, setUploading] = useState(false);
   const [uploadResult, setUploadResult] = useState(null);
   const [error, setError] = useState(null);
+  const [jobProgress, setJobProgress] = useState(null);
 
   const handleFileSelect = (event) => {
     const file = event.target.files[0];
@@ -17,11 +24,14 @@ const UploadComponent = ({ onUploadSuccess }) => {
         'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
       ];
       
-      if (validTypes.includes(file.type) || file.name.endsWith('.csv') || file.name.endsWith('.xlsx')) {
+      const validExtensions = ['.csv', '.csv.gz', '.csv.zst', '.parquet', '.arrow', '.feather', '.xlsx', '.xls'];
+      const name = file.name.toLowerCase();
+      
+      if (validTypes.includes(file.type) || validExtensions.some((ext) => name.endsWith(ext))) {
         setSelectedFile(file);
         setError(null);
       } else {
-        setError('Please select a valid CSV or Excel file');
+        setError('Please select a valid CSV, Parquet, Arrow or Excel file');
         setSelectedFile(null);
       }
     }
@@ -34,14 +44,30 @@ const UploadComponent = ({ onUploadSuccess }) => {
     setError(null);
 
     try {
-      const result = await uploadFile(selectedFile);
+      const result = selectedFile.size >= JOB_UPLOAD_BYTES
+        ? await runUploadJob(selectedFile)
+        : await uploadFile(selectedFile);
       setUploadResult(result);
       onUploadSuccess && onUploadSuccess(result);
     } catch (err) {
-      setError(err.response?.data?.error || 'Upload failed. Please try again.');
+      setError(err.response?.data?.detail || err.response?.data?.error || err.message || 'Upload failed. Please try again.');
     } finally {
       setUploading(false);
+      setJobProgress(null);
+    }
+  };
+
+  const runUploadJob = async (file) => {
+    let job = await submitUploadJob(file);
+    while (job.status === 'queued' || job.status === 'running') {
+      await sleep(JOB_POLL_MS);
+      job = await getJobStatus(job.job_id);
+      setJobProgress(job);
+    }
+    if (job.status === 'failed') {
+      throw new Error(job.error || 'Processing failed. Please try again.');
     }
+    return job.result;
   };
 
   const formatFileSize = (bytes) => {
@@ -66,17 +92,17 @@ const UploadComponent = ({ onUploadSuccess }) => {
         <div className="mb-4">
           <label htmlFor="file-upload" className="cursor-pointer">
             <span className="mt-2 block text-sm font-medium text-gray-900">
-              Upload CSV or Excel file
+              Upload a transactions file
             </span>
             <span className="mt-1 block text-xs text-gray-500">
-              Supported formats: .csv, .xlsx, .xls
+              Supported formats: .csv (plain, .gz, .zst), .parquet, .arrow/.feather, .xlsx, .xls
             </span>
           </label>
           <input
             id="file-upload"
             name="file-upload"
             type="file"
-            accept=".csv,.xlsx,.xls"
+            accept=".csv,.gz,.zst,.parquet,.arrow,.feather,.xlsx,.xls"
             className="sr-only"
             onChange={handleFileSelect}
           />
@@ -118,6 +144,18 @@ const UploadComponent = ({ onUploadSuccess }) => {
         </div>
       )}
 
+      {jobProgress && (
+        <div className="mt-4 p-4 bg-blue-50 border border-blue-200 rounded-lg">
+          <p className="text-sm text-blue-700">
+            {jobProgress.status === 'queued'
+              ? 'Waiting for a worker...'
+              : `Scored ${jobProgress.rows_done.toLocaleString()} rows`}
+            {jobProgress.rows_per_second ? ` (${Math.round(jobProgress.rows_per_second).toLocaleString()} rows/s)` : ''}
+            {jobProgress.fraudulent_count > 0 ? `, ${jobProgress.fraudulent_count.toLocaleString()} flagged so far` : ''}
+          </p>
+        </div>
+      )}
+
       {error && (
         <div className="mt-4 p-4 bg-red-50 border border-red-200 rounded-lg">
           <p className="text-red-700 text-sm">{error}</p>
@@ -48,6 +48,26 @@ export const uploadFile = async (file) => {
   return response.data;
 };
 
+// Queue a large file for background scoring (matches /predict-csv/jobs endpoint)
+export const submitUploadJob = async (file) => {
+  const formData = new FormData();
+  formData.append('file', file);
+  
+  const response = await api.post('/predict-csv/jobs', formData, {
+    headers: {
+      'Content-Type': 'multipart/form-data',
+    },
+  });
+  
+  return response.data;
+};
+
+// Poll a background scoring job (matches /jobs/{job_id} endpoint)
+export const getJobStatus = async (jobId) => {
+  const response = await api.get(`/jobs/${jobId}`);
+  return response.data;
+};
+
 // Get fraudulent transactions (matches /fraudulent-transactions endpoint)
 export const getFraudulentTransactions = async (limit = 100) => {
   const response = await api.get(`/fraudulent-transactions?limit=${limit}`);
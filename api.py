@@ -1,16 +1,34 @@
-from fastapi import FastAPI, File, UploadFile, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, File, UploadFile, HTTPException, Query
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 import pandas as pd
 import numpy as np
-from sklearn.preprocessing import LabelEncoder
-import joblib
-import io
-from typing import List, Dict
-from datetime import datetime
-import uvicorn
-import sqlite3
+import os
+import asyncio
+import contextvars
+import functools
+import threading
+import warnings
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from typing import List, Dict, Optional, Tuple, Union
+from datetime import date, datetime
+from pydantic import BaseModel
 import database_setup as db
+import geo
+import metrics
+from micro_batching import MicroBatcher
+from parallel_scoring import ShardedScorer
+from forest_arrays import load_model, serving_model_path, FOREST_ARRAYS_DIR
+from ingestion import read_transactions, iter_transaction_chunks, IDENTIFIER_COLUMNS, UploadParseError
+import result_cache
+import model_registry
+from model_registry import ModelVersion, ModelWatcher
+from jobs import JobRunner, JOB_CHUNK_SIZE, job_status
+from velocity import VELOCITY_FEATURES, VelocityStore, add_velocity_features, uses_velocity
+from serialization import (
+    MEDIA_TYPES, NDJSON, iter_response, ndjson_headers, validate_format
+)
+from preprocessing import load_category_mappings, CATEGORY_MAPPINGS_FILE
 
 app = FastAPI(
     title="Credit Card Fraud Detection API",
@@ -25,122 +43,862 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],  # Allows all methods
     allow_headers=["*"],  # Allows all headers
+    # Summary fields of NDJSON responses travel in these headers
+    expose_headers=[
+        "X-Total-Transactions", "X-Fraudulent-Transactions", "X-Count", "X-Next-Cursor",
+        "X-Timestamp", "X-Result-Cache", "Server-Timing"
+    ],
 )
 
-# Initialize database
-db.setup_database()
-
-# Load the pre-trained model and expected columns
-try:
-    model = joblib.load('credit_fraud.pkl')
-    expected_columns = joblib.load('expected_columns.pkl')
-    print("Model loaded successfully!")
-    print(f"Expected columns: {expected_columns}")
-except FileNotFoundError as e:
-    print(f"Error: {e}")
-    print("Please run the training script first to generate the model files.")
-    model = None
-    expected_columns = []
-
-def preprocess_data(df: pd.DataFrame) -> pd.DataFrame:
-    """Preprocess the incoming data to match training format"""
-    if model is None:
+# Request latency histograms, and a Server-Timing stage breakdown for
+# requests sent with an X-Profile header (see metrics.py)
+app.add_middleware(metrics.ASGIMetricsMiddleware)
+
+MODEL_FILE = 'credit_fraud.pkl'
+
+# The fitted sklearn forest in MODEL_FILE is served by default; it predicts
+# fastest. With MODEL_SOURCE=arrays the exported forest arrays (see
+# forest_arrays.py) are memory-mapped instead, so startup is fast and every
+# worker process shares the same model pages, at a lower predict throughput.
+# Either falls back to the other when it does not exist.
+MODEL_ARRAYS_DIR = os.environ.get('MODEL_ARRAYS_DIR', FOREST_ARRAYS_DIR)
+MODEL_PATH = serving_model_path(MODEL_FILE, MODEL_ARRAYS_DIR)
+
+# Models are scored on the bare float32 matrix built by FeatureSchema, in
+# expected_columns order; a pickled forest fitted on a DataFrame would
+# otherwise warn on every batch
+warnings.filterwarnings('ignore', message='X does not have valid feature names')
+
+def load_local_model() -> ModelVersion:
+    """The model artifacts in the working directory, served without a registry
+
+    The version is a fingerprint of the artifacts, so result cache keys
+    change whenever they do.
+    """
+    version = 'local-' + result_cache.artifact_digest(
+        [MODEL_PATH, 'expected_columns.pkl', CATEGORY_MAPPINGS_FILE]
+    )
+    import joblib
+    return ModelVersion(
+        version,
+        load_model(MODEL_PATH),
+        joblib.load('expected_columns.pkl'),
+        # Category codes fitted at training time (shared with train_model.py)
+        load_category_mappings(),
+        MODEL_PATH,
+    )
+
+# The serving model: the active version of the registry (model_registry.py),
+# else the local artifacts. A new version activated in the registry is
+# loaded in the background and swapped in without a restart; each request
+# scores with the version that was current when it started.
+models = ModelWatcher(fallback=load_local_model)
+
+# Startup work is kept out of import: warm_up() sets up the database schema
+# and loads the serving model. MODEL_WARM_UP picks when the model is loaded:
+# 'background' (default) starts the process right away and loads it on a
+# thread, 'startup' finishes loading before serving, and 'lazy' waits for
+# the first request that needs it. GET /health/live answers as soon as the
+# process runs; GET /health/ready once warm-up is done.
+MODEL_WARM_UP = os.environ.get('MODEL_WARM_UP', 'background')
+if MODEL_WARM_UP not in ('background', 'startup', 'lazy'):
+    raise ValueError(f"MODEL_WARM_UP must be 'background', 'startup' or 'lazy', got {MODEL_WARM_UP!r}")
+
+database_ready = False
+# Why the last model load failed, while no model is loaded
+model_load_error = None
+_model_load_lock = threading.Lock()
+
+def load_serving_model() -> Optional[ModelVersion]:
+    """Load the serving model unless it already is; None when there is none"""
+    global model_load_error
+    with _model_load_lock:
+        if models.current is None:
+            try:
+                models.load()
+                model_load_error = None
+                print(f"Model {models.current.version} loaded successfully from {models.current.source}!")
+                print(f"Expected columns: {models.current.expected_columns}")
+            except FileNotFoundError as e:
+                model_load_error = str(e)
+                print(f"Error: {e}")
+                print("Please run the training script first to generate the model files.")
+    return models.current
+
+def prepare_database():
+    """Set up (or migrate) the database schema and mark it ready"""
+    global database_ready
+    db.setup_database()
+    database_ready = True
+
+def warm_up():
+    """Set up the database schema and load the serving model
+
+    The explicit hook for scripts and tests that import the app without
+    running its startup events.
+    """
+    prepare_database()
+    load_serving_model()
+
+def loaded_model(version: Optional[str] = None) -> Optional[ModelVersion]:
+    """A model version by name, or the current one, loading it on first use
+
+    Covers requests that arrive before warm-up and inference worker
+    processes, which never run it.
+    """
+    current = models.current or load_serving_model()
+    return models.get(version) if version else current
+
+def serving_model() -> ModelVersion:
+    """The current model version, or a 500 when none is loaded"""
+    current = loaded_model()
+    if current is None:
+        raise HTTPException(
+            status_code=500, 
+            detail="Model not loaded. Please ensure the model file exists."
+        )
+    return current
+
+# A transaction is labelled fraudulent when its fraud probability is above
+# FRAUD_THRESHOLD; the default 0.5 gives the same labels as model.predict
+FRAUD_THRESHOLD = float(os.environ.get('FRAUD_THRESHOLD', '0.5'))
+FRAUD_CLASS = 1
+
+# Riskiest rows kept with every cached /predict-csv result, so a repeat
+# upload asking for top_k up to this many is answered from the cache
+RESULT_CACHE_RISKIEST_ROWS = int(os.environ.get('RESULT_CACHE_RISKIEST_ROWS', '100'))
+
+# Micro-batching for /predict: concurrent requests are stacked into one
+# model call of up to PREDICT_MAX_BATCH_SIZE transactions, waiting
+# at most PREDICT_MAX_WAIT_MS for the batch to fill
+PREDICT_MAX_BATCH_SIZE = int(os.environ.get('PREDICT_MAX_BATCH_SIZE', '64'))
+PREDICT_MAX_WAIT_MS = float(os.environ.get('PREDICT_MAX_WAIT_MS', '5'))
+
+# Blocking work is kept off the event loop: CSV parsing runs on the default
+# thread pool, preprocessing + model.predict on the inference pool
+# (INFERENCE_EXECUTOR=thread|process, INFERENCE_WORKERS workers) and all
+# database writes on a single dedicated writer thread.
+INFERENCE_EXECUTOR = os.environ.get('INFERENCE_EXECUTOR', 'thread')
+INFERENCE_WORKERS = int(os.environ.get('INFERENCE_WORKERS', str(os.cpu_count() or 1)))
+
+if INFERENCE_EXECUTOR not in ('thread', 'process'):
+    raise ValueError(f"INFERENCE_EXECUTOR must be 'thread' or 'process', got {INFERENCE_EXECUTOR!r}")
+
+inference_executor = None
+db_writer = None
+
+def get_db_writer():
+    """Create the single database writer thread on first use"""
+    global db_writer
+    if db_writer is None:
+        db_writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix='db-writer')
+    return db_writer
+
+def get_inference_executor():
+    """Create the inference pool on first use"""
+    global inference_executor
+    if inference_executor is None:
+        if INFERENCE_EXECUTOR == 'process':
+            inference_executor = ProcessPoolExecutor(max_workers=INFERENCE_WORKERS)
+        else:
+            inference_executor = ThreadPoolExecutor(
+                max_workers=INFERENCE_WORKERS, thread_name_prefix='inference'
+            )
+    return inference_executor
+
+def in_context(func, *args, **kwargs):
+    """Bind a call to a copy of the current context for another thread
+
+    Stage timings made on the worker thread then reach the request being
+    profiled.
+    """
+    return functools.partial(contextvars.copy_context().run, func, *args, **kwargs)
+
+async def run_blocking(func, *args, **kwargs):
+    """Run blocking I/O or parsing on the default thread pool"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, in_context(func, *args, **kwargs))
+
+async def run_inference(func, *args):
+    """Run CPU-bound scoring on the inference pool.
+
+    ``func`` must be a module-level function so it can be sent to a
+    process pool.
+    """
+    loop = asyncio.get_running_loop()
+    if INFERENCE_EXECUTOR == 'thread':
+        return await loop.run_in_executor(get_inference_executor(), in_context(func, *args))
+    return await loop.run_in_executor(get_inference_executor(), func, *args)
+
+async def run_db_write(func, *args):
+    """Run a database write on the dedicated writer thread"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_db_writer(), in_context(func, *args))
+
+def db_write_sync(func, *args):
+    """Run a database write on the writer thread from a worker thread and wait for it"""
+    return get_db_writer().submit(func, *args).result()
+
+# Sharded scoring: with SCORING_WORKERS > 1, frames of at least
+# SHARDED_SCORING_MIN_ROWS rows are split across that many worker processes,
+# each loading the serving model from its source. Only used with the thread
+# executor, since process-pool inference workers cannot fan out further.
+SCORING_WORKERS = int(os.environ.get('SCORING_WORKERS', '0'))
+SHARDED_SCORING_MIN_ROWS = int(os.environ.get('SHARDED_SCORING_MIN_ROWS', '200000'))
+
+sharded_scorer = None
+_sharded_scorer_lock = threading.Lock()
+
+def get_sharded_scorer(current: ModelVersion):
+    """The sharded scoring pool for a model version, if sharding is enabled
+
+    Started on first use. A new model version gets a new pool; the old one
+    is shut down in the background once its in-flight shards finish.
+    """
+    global sharded_scorer
+    if SCORING_WORKERS <= 1 or INFERENCE_EXECUTOR != 'thread':
+        return None
+    with _sharded_scorer_lock:
+        if sharded_scorer is None or sharded_scorer.model_path != current.source:
+            if sharded_scorer is not None:
+                threading.Thread(target=sharded_scorer.shutdown, daemon=True).start()
+            sharded_scorer = ShardedScorer(current.source, n_workers=SCORING_WORKERS)
+    return sharded_scorer
+
+# Per-account velocity features (velocity.py). For a model trained with them,
+# each scored batch reads its features from this store and is then folded
+# in, in arrival order. The store lives in this process (not the inference
+# workers) and starts empty: every uvicorn worker has its own, and its
+# features read lower than training's until a window of traffic has passed
+# through it. Uploads answered from the result cache are not scored, so
+# they are not folded in either; a repeated upload does not advance the
+# windows. Models are trained without the features unless train_model.py
+# is run with --velocity; models without them skip the store.
+velocity_store = VelocityStore()
+
+def with_velocity_features(df: pd.DataFrame, current: ModelVersion) -> pd.DataFrame:
+    """The frame to score: ``df`` plus its velocity features if the model uses them"""
+    if not uses_velocity(current.expected_columns):
+        return df
+    return add_velocity_features(df, velocity_store)
+
+class Transaction(BaseModel):
+    """A single transaction submitted for real-time scoring"""
+    step: int
+    type: str
+    amount: float
+    oldbalanceOrg: float
+    newbalanceOrig: float
+    oldbalanceDest: float
+    newbalanceDest: float
+    isFlaggedFraud: int = 0
+    nameOrig: Optional[str] = None
+    nameDest: Optional[str] = None
+
+def preprocess_data(df: pd.DataFrame, current: Optional[ModelVersion] = None) -> np.ndarray:
+    """Build the float32 feature matrix a model version scores
+
+    Uses the version's compiled FeatureSchema (preprocessing.py): only the
+    expected columns are read, in training order, and the input frame is
+    left untouched.
+    """
+    current = current or loaded_model()
+    if current is None:
         raise ValueError("Model not loaded. Cannot preprocess data.")
+    return current.schema.matrix(df)
+
+def fraud_probabilities(proba: np.ndarray, model) -> np.ndarray:
+    """Pick the fraud-class column out of a predict_proba result"""
+    return proba[:, list(model.classes_).index(FRAUD_CLASS)]
+
+def score_frame(df: pd.DataFrame, version: Optional[str] = None) -> np.ndarray:
+    """Preprocess a parsed frame and return each row's fraud probability
+
+    Runs on the inference pool, with the named model version (the current
+    one by default). The version travels by name so process-pool workers
+    can load it themselves. Labels are derived from the probabilities with
+    ``is_fraud``, so the model is evaluated once per row. Large frames are
+    fanned out to the sharded scorer when it is enabled.
+    """
+    current = loaded_model(version)
+    with metrics.stage('preprocess', len(df)):
+        X = preprocess_data(df, current)
+    scorer = get_sharded_scorer(current) if len(df) >= SHARDED_SCORING_MIN_ROWS else None
+    with metrics.stage('predict', len(df)):
+        if scorer is not None:
+            proba = scorer.predict_proba(X)
+        else:
+            proba = current.model.predict_proba(X)
+        return fraud_probabilities(proba, current.model)
+
+# Shadow mode: with SHADOW_MODEL_VERSION set to a registry version, a
+# SHADOW_SAMPLE_RATE sample of every scored upload (at most SHADOW_MAX_ROWS
+# rows) is also scored with that version on a background thread, and label
+# disagreements are counted in cybershield_shadow_rows_total and logged.
+# Responses never wait for it; samples are dropped while SHADOW_MAX_PENDING
+# comparisons are already queued.
+SHADOW_MODEL_VERSION = os.environ.get('SHADOW_MODEL_VERSION') or None
+SHADOW_SAMPLE_RATE = float(os.environ.get('SHADOW_SAMPLE_RATE', '0.1'))
+SHADOW_MAX_ROWS = int(os.environ.get('SHADOW_MAX_ROWS', '10000'))
+SHADOW_MAX_PENDING = 4
+
+shadow_executor = None
+_shadow_slots = threading.BoundedSemaphore(SHADOW_MAX_PENDING)
+_shadow_rng = np.random.default_rng()
+
+def get_shadow_executor():
+    global shadow_executor
+    if shadow_executor is None:
+        shadow_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='shadow')
+    return shadow_executor
+
+def compare_shadow(sample: pd.DataFrame, primary: np.ndarray, primary_version: str):
+    """Score a sample with the shadow version and record where it disagrees"""
+    try:
+        shadow = score_frame(sample, SHADOW_MODEL_VERSION)
+        disagree = int((is_fraud(shadow) != is_fraud(primary)).sum())
+        metrics.observe_shadow(primary_version, SHADOW_MODEL_VERSION, len(sample) - disagree, disagree)
+        if disagree:
+            print(f"Shadow {SHADOW_MODEL_VERSION} disagrees with {primary_version} on "
+                  f"{disagree} of {len(sample)} sampled rows "
+                  f"(mean |dp| {np.abs(shadow - primary).mean():.4f})")
+    except Exception as e:
+        print(f"Shadow scoring with {SHADOW_MODEL_VERSION} failed: {e}")
+    finally:
+        _shadow_slots.release()
+
+def submit_shadow(df: pd.DataFrame, probabilities: np.ndarray, current: ModelVersion):
+    """Queue a sample of a scored frame for the shadow model, without waiting"""
+    if not SHADOW_MODEL_VERSION or SHADOW_MODEL_VERSION == current.version or len(df) == 0:
+        return
+    if not _shadow_slots.acquire(blocking=False):
+        return
+    size = min(SHADOW_MAX_ROWS, max(1, int(len(df) * SHADOW_SAMPLE_RATE)))
+    rows = np.unique(_shadow_rng.integers(0, len(df), size))
+    # A positional take copies the rows, so later changes to ``df`` don't race
+    get_shadow_executor().submit(compare_shadow, df.iloc[rows], probabilities[rows], current.version)
+
+def is_fraud(probabilities: np.ndarray) -> np.ndarray:
+    """0/1 fraud labels for the given fraud probabilities"""
+    return (probabilities > FRAUD_THRESHOLD).astype('int64')
+
+def add_predictions(df: pd.DataFrame, probabilities: np.ndarray) -> pd.DataFrame:
+    """Attach the fraud label and its confidence (0-100, as stored) to a frame"""
+    df['isFraudPrediction'] = is_fraud(probabilities)
+    df['prediction_confidence'] = probabilities * 100
+    return df
+
+def riskiest_rows(df: pd.DataFrame, probabilities: np.ndarray, k: int) -> pd.DataFrame:
+    """The ``k`` rows with the highest fraud probability, riskiest first
+
+    Uses a partial sort: argpartition finds the top ``k`` in linear time and
+    only those ``k`` are then sorted.
+    """
+    k = min(k, len(df))
+    if k == 0:
+        return df.iloc[:0]
+    top = np.argpartition(-probabilities, k - 1)[:k]
+    top = top[np.argsort(-probabilities[top], kind='stable')]
+    return df.iloc[top]
+
+def upload_columns(current: Optional[ModelVersion] = None) -> List[str]:
+    """Columns parsed from uploads: the model features plus the stored account ids"""
+    expected_columns = [
+        col for col in (current or loaded_model()).expected_columns if col not in VELOCITY_FEATURES
+    ]
+    return expected_columns + [col for col in IDENTIFIER_COLUMNS if col not in expected_columns]
+
+async def score_upload_in_chunks(source, filename: str, chunk_size: int, current: ModelVersion,
+                                 top_k: Optional[int] = None, store: bool = True) -> Dict:
+    """Score an upload stream chunk by chunk, writing fraud hits as it goes.
+
+    Only one chunk of ``chunk_size`` rows is parsed and preprocessed at a
+    time, so peak memory depends on the chunk size rather than the file size.
+    A chunk's database write overlaps with scoring the next chunk. The
+    returned summary has the same shape as the non-streaming response, with
+    the fraud hits as one DataFrame; with ``top_k`` a running top-k is kept
+    across chunks. Without ``store`` nothing is written to the database.
+    """
+    total_transactions = 0
+    fraudulent_frames = []
+    riskiest = None
+    pending_write = None
+    
+    reader = iter_transaction_chunks(source, filename, upload_columns(current), chunk_size)
+    while True:
+        with metrics.stage('parse'):
+            chunk = await run_blocking(next, reader, None)
+        if chunk is None:
+            break
+        metrics.count_rows('parse', len(chunk))
+        
+        scored = await run_blocking(with_velocity_features, chunk, current)
+        with metrics.stage('inference', len(chunk)):
+            probabilities = await run_inference(score_frame, scored, current.version)
+        add_predictions(chunk, probabilities)
+        submit_shadow(scored, probabilities, current)
+        
+        if top_k:
+            candidates = chunk if riskiest is None else pd.concat([riskiest, chunk])
+            riskiest = riskiest_rows(
+                candidates, candidates['prediction_confidence'].to_numpy(), top_k
+            )
+        
+        # Keep only the fraudulent rows of this chunk
+        fraudulent_chunk = chunk[chunk['isFraudPrediction'] == 1]
+        
+        # Persist this chunk's hits; wait for the previous write first so at
+        # most one chunk is held for the writer
+        if pending_write is not None:
+            await pending_write
+        if store:
+            pending_write = asyncio.ensure_future(
+                run_db_write(db.append_fraudulent_transactions, fraudulent_chunk)
+            )
+        
+        fraudulent_frames.append(fraudulent_chunk)
+        total_transactions += len(chunk)
     
-    # Create a copy to avoid modifying the original
-    data = df.copy()
+    fraudulent_df = pd.concat(fraudulent_frames) if fraudulent_frames else pd.DataFrame()
     
-    # Drop columns that were not used in training
-    if 'nameOrig' in data.columns:
-        data.drop('nameOrig', axis=1, inplace=True)
-    if 'nameDest' in data.columns:
-        data.drop('nameDest', axis=1, inplace=True)
+    if pending_write is not None:
+        await pending_write
+    if store:
+        await run_db_write(db.log_processing, filename, total_transactions, len(fraudulent_df), current.version)
     
-    # Convert categorical columns to numerical (if present)
-    catCols = [col for col in data.columns if data[col].dtype == "O"]
-    lb_make = LabelEncoder()
+    result = {
+        "total_transactions": total_transactions,
+        "fraudulent_transactions": len(fraudulent_df),
+        "fraudulent_data": fraudulent_df,
+        "timestamp": datetime.now().isoformat()
+    }
+    if top_k:
+        result["riskiest_transactions"] = pd.DataFrame() if riskiest is None else riskiest
+    return result
+
+async def score_upload(source, filename: str, current: ModelVersion,
+                       top_k: Optional[int] = None, store: bool = True) -> Dict:
+    """Parse, score and (with ``store``) store a whole upload in one pass"""
+    # Parse the spooled upload directly, without decoding it to text first
+    with metrics.stage('parse'):
+        df = await run_blocking(read_transactions, source, filename, upload_columns(current))
+    metrics.count_rows('parse', len(df))
     
-    for col in catCols:
-        if col in data.columns:
-            data[col] = lb_make.fit_transform(data[col])
+    # Store original data for response
+    original_df = df.copy()
     
-    # Add missing columns with default values
-    for col in expected_columns:
-        if col not in data.columns:
-            if col == 'isFlaggedFraud':
-                data[col] = 0  # Default value
-            else:
-                data[col] = 0  # Default value for other missing columns
+    # Preprocess the data and compute fraud probabilities off the event loop
+    df = await run_blocking(with_velocity_features, df, current)
+    with metrics.stage('inference', len(df)):
+        probabilities = await run_inference(score_frame, df, current.version)
+    submit_shadow(df, probabilities, current)
+    
+    # Add labels and confidence to original dataframe
+    add_predictions(original_df, probabilities)
+    
+    # Filter only fraudulent transactions
+    fraudulent_df = original_df[original_df['isFraudPrediction'] == 1]
+    
+    # Prepare response data; the frames are encoded as the response streams
+    result = {
+        "total_transactions": len(df),
+        "fraudulent_transactions": len(fraudulent_df),
+        "fraudulent_data": fraudulent_df,
+        "timestamp": datetime.now().isoformat()
+    }
+    if top_k:
+        result["riskiest_transactions"] = riskiest_rows(original_df, probabilities, top_k)
+    
+    # Store results in database straight from the fraud frame
+    if store:
+        await run_db_write(db.insert_fraudulent_frame, fraudulent_df, filename, len(df), current.version)
+    
+    return result
+
+def score_transactions(transactions: List[Dict]) -> List[float]:
+    """Fraud probabilities for a stacked batch of transaction dicts, in one model call"""
+    data = pd.DataFrame(transactions)
+    return score_frame(data).tolist()
+
+def cache_result(cache_key: str, result: Dict):
+    """Store a result in the result cache if it fits (blocking)"""
+    with metrics.stage('cache_encode'):
+        payload = result_cache.encode_result(result)
+    if len(payload) <= result_cache.RESULT_CACHE_MAX_BYTES:
+        db_write_sync(db.store_cached_result, cache_key, payload, result_cache.RESULT_CACHE_MAX_BYTES)
+
+def run_scoring_job(job: Dict, path: str, report) -> Dict:
+    """Score a spooled upload chunk by chunk on a job worker thread
+
+    Mirrors score_upload_in_chunks: each chunk is scored on the inference
+    pool and its fraud hits appended through the writer thread, with
+    progress reported after every chunk. Returns the summary kept on the
+    job; the full result also goes to the result cache. An upload whose
+    fraud rows are already stored (same content hash) is scored again but
+    not stored twice.
+    """
+    # Score with the version the job was queued under (its cache key uses it)
+    version = job['options'].get('model_version')
+    current = loaded_model(version)
+    content_hash = job['options'].get('content_hash')
+    # Rows of an upload already stored under another cache key are not stored again
+    store = content_hash is None or db_write_sync(db.claim_upload, content_hash)
+    try:
+        summary, fraudulent_frames = score_spooled_upload(job, path, report, current, store)
+    except BaseException:
+        if content_hash is not None and store:
+            db_write_sync(db.release_upload, content_hash)
+        raise
+    cache_key = job['options'].get('cache_key')
+    if cache_key:
+        fraudulent_df = pd.concat(fraudulent_frames) if fraudulent_frames else pd.DataFrame()
+        cache_result(cache_key, dict(summary, fraudulent_data=fraudulent_df))
+    return summary
+
+def score_spooled_upload(job: Dict, path: str, report, current: ModelVersion, store: bool):
+    """The scoring loop of run_scoring_job; returns the summary and the fraud frames"""
+    total_transactions = 0
+    fraudulent_frames = []
+    fraudulent_count = 0
+    with open(path, 'rb') as source:
+        for chunk in iter_transaction_chunks(source, job['filename'], upload_columns(current), JOB_CHUNK_SIZE):
+            scored = with_velocity_features(chunk, current)
+            probabilities = get_inference_executor().submit(score_frame, scored, current.version).result()
+            add_predictions(chunk, probabilities)
+            submit_shadow(scored, probabilities, current)
+            fraudulent_chunk = chunk[chunk['isFraudPrediction'] == 1]
+            if store:
+                db_write_sync(db.append_fraudulent_transactions, fraudulent_chunk)
+            
+            fraudulent_frames.append(fraudulent_chunk)
+            total_transactions += len(chunk)
+            fraudulent_count += len(fraudulent_chunk)
+            report(total_transactions, fraudulent_count)
     
-    # Reorder columns to match training data
-    data = data[expected_columns]
+    if store:
+        db_write_sync(db.log_processing, job['filename'], total_transactions, fraudulent_count, current.version)
+    summary = {
+        "total_transactions": total_transactions,
+        "fraudulent_transactions": fraudulent_count,
+        "timestamp": datetime.now().isoformat()
+    }
+    return summary, fraudulent_frames
+
+# Background scoring jobs for large uploads (see jobs.py)
+job_runner = JobRunner('predict-csv', run_scoring_job, db_write=db_write_sync)
+
+def table_response(envelope: Dict, records_key: str, response_format: str,
+                   headers: Optional[Dict[str, str]] = None) -> StreamingResponse:
+    """Stream a result envelope as JSON, NDJSON or columnar JSON
+
+    The table under ``records_key`` is encoded in chunks straight from its
+    columns (see serialization.py). NDJSON bodies hold only that table; the
+    envelope's scalar fields are sent as ``X-...`` headers instead.
+    """
+    headers = dict(headers or {})
+    if response_format == NDJSON:
+        headers.update(ndjson_headers(envelope, records_key))
+    return StreamingResponse(
+        iter_response(envelope, records_key, response_format),
+        media_type=MEDIA_TYPES[response_format],
+        headers=headers
+    )
+
+predict_batcher = MicroBatcher(
+    score_transactions,
+    max_batch_size=PREDICT_MAX_BATCH_SIZE,
+    max_wait_ms=PREDICT_MAX_WAIT_MS,
+    executor=get_inference_executor
+)
+
+@app.on_event("startup")
+def start_warm_up():
+    # Runs first: the job runner and requests need the schema
+    prepare_database()
+    if MODEL_WARM_UP == 'startup':
+        load_serving_model()
+    elif MODEL_WARM_UP == 'background':
+        threading.Thread(target=load_serving_model, name='warm-up', daemon=True).start()
+
+@app.on_event("startup")
+def start_retention():
+    # Archiving old days runs on its own thread, off the writer thread
+    db.start_retention()
+
+@app.on_event("shutdown")
+def stop_retention():
+    db.stop_retention()
+
+@app.on_event("startup")
+async def start_predict_batcher():
+    await predict_batcher.start()
+
+@app.on_event("shutdown")
+async def stop_predict_batcher():
+    await predict_batcher.stop()
+
+@app.on_event("startup")
+def start_job_runner():
+    job_runner.start()
+
+@app.on_event("shutdown")
+def stop_job_runner():
+    # Before the executors go away: running jobs still use them
+    job_runner.stop()
+
+@app.on_event("startup")
+def start_model_watcher():
+    models.start()
+
+@app.on_event("shutdown")
+def stop_model_watcher():
+    models.stop()
+
+@app.on_event("shutdown")
+def shutdown_executors():
+    global db_writer, inference_executor, shadow_executor
+    for executor in (shadow_executor, db_writer, inference_executor):
+        if executor is not None:
+            executor.shutdown(wait=True)
+    db_writer = inference_executor = shadow_executor = None
+
+@app.on_event("shutdown")
+def shutdown_sharded_scorer():
+    global sharded_scorer
+    if sharded_scorer is not None:
+        sharded_scorer.shutdown()
+        sharded_scorer = None
+
+@app.post("/predict")
+async def predict(transactions: Union[Transaction, List[Transaction]]):
+    """Score one transaction or a small list in real time
+
+    Concurrent requests are micro-batched into a single model call. Nothing
+    is written to the database on this path, but transactions with account
+    ids update the velocity store when the model uses it.
+    """
+    current = serving_model()
     
-    return data
+    if isinstance(transactions, Transaction):
+        transactions = [transactions]
+    if not transactions:
+        raise HTTPException(status_code=400, detail="No transactions provided")
+    
+    try:
+        records = [dict(t) for t in transactions]
+        if uses_velocity(current.expected_columns):
+            records = (await run_blocking(with_velocity_features, pd.DataFrame(records), current)).to_dict('records')
+        probabilities = await predict_batcher.submit(records)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error scoring transactions: {str(e)}")
+    
+    predictions = is_fraud(np.asarray(probabilities)).tolist()
+    return {
+        "predictions": predictions,
+        "probabilities": probabilities,
+        "fraudulent_transactions": sum(predictions),
+        "timestamp": datetime.now().isoformat()
+    }
+
+async def upload_cache_key(file: UploadFile, current: ModelVersion) -> Tuple[str, str]:
+    """Content hash of an upload, and its result cache key under a model version
+
+    The key only covers what changes the stored rows; response options such
+    as ``top_k`` are applied to the cached result.
+    """
+    with metrics.stage('hash'):
+        content_hash = await run_blocking(result_cache.hash_upload, file.file)
+    return content_hash, result_cache.cache_key(content_hash, current.version, threshold=FRAUD_THRESHOLD)
+
+def answers_top_k(result: Dict, top_k: Optional[int]) -> bool:
+    """Whether a (cached) result holds enough riskiest rows for ``top_k``"""
+    if not top_k:
+        return True
+    riskiest = result.get("riskiest_transactions")
+    return riskiest is not None and len(riskiest) >= min(top_k, result["total_transactions"])
+
+def with_top_k(result: Dict, top_k: Optional[int]) -> Dict:
+    """The response for ``top_k``: the first ``top_k`` riskiest rows, or none"""
+    response = dict(result)
+    riskiest = response.pop("riskiest_transactions", None)
+    if top_k:
+        response["riskiest_transactions"] = riskiest.iloc[:top_k]
+    return response
 
 @app.post("/predict-csv")
-async def predict_csv(file: UploadFile = File(...)):
-    """Process a CSV file, detect fraud, and store results in database"""
-    if model is None:
-        raise HTTPException(
-            status_code=500, 
-            detail="Model not loaded. Please ensure the model file exists."
-        )
+async def predict_csv(file: UploadFile = File(...), chunk_size: Optional[int] = None,
+                      top_k: Optional[int] = None,
+                      response_format: str = Query('json', alias='format')):
+    """Process an uploaded file, detect fraud, and store results in database
+
+    Accepts CSV (optionally gzip or zstd compressed), Parquet, Arrow IPC and
+    Excel uploads; the format comes from the file extension or, failing
+    that, the file's leading bytes. Only the model's feature columns and the
+    account ids are parsed. Pass ``chunk_size`` to stream the upload in
+    bounded row chunks instead of loading the whole file into memory at once.
+    Pass ``top_k`` to also get the ``top_k`` riskiest transactions of the
+    upload, highest probability first, as ``riskiest_transactions``.
+
+    A file already scored by the same model is answered from the result
+    cache without being parsed, scored or stored again (``X-Result-Cache:
+    hit``), whatever its ``top_k``. A file that has to be scored again (a
+    larger ``top_k`` than the cache holds, a new model) is not stored again.
+
+    The response is streamed; ``format`` picks its shape: ``json`` (default),
+    ``ndjson`` (one fraudulent transaction per line, summary counts in
+    ``X-Total-Transactions``/``X-Fraudulent-Transactions`` headers) or
+    ``columnar`` (``fraudulent_data`` as ``{column: [values]}``).
+    """
+    current = serving_model()
     
+    if chunk_size is not None and chunk_size <= 0:
+        raise HTTPException(status_code=400, detail="chunk_size must be a positive integer")
+    if top_k is not None and top_k <= 0:
+        raise HTTPException(status_code=400, detail="top_k must be a positive integer")
     try:
-        # Read the CSV file
-        contents = await file.read()
-        csv_data = io.StringIO(contents.decode('utf-8'))
-        df = pd.read_csv(csv_data)
-        
-        # Store original data for response
-        original_df = df.copy()
-        
-        # Preprocess the data
-        processed_df = preprocess_data(df)
-        
-        # Make predictions
-        predictions = model.predict(processed_df)
-        
-        # Add predictions to original dataframe
-        original_df['isFraudPrediction'] = predictions
-        
-        # Filter only fraudulent transactions
-        fraudulent_df = original_df[original_df['isFraudPrediction'] == 1]
-        
-        # Convert to JSON
-        fraudulent_transactions = fraudulent_df.to_dict(orient='records')
+        validate_format(response_format)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if top_k and response_format == NDJSON:
+        raise HTTPException(status_code=400, detail="top_k is not supported with format=ndjson")
+    
+    try:
+        headers = {}
+        content_hash = cache_key = None
+        ranked = top_k
+        store = True
+        if result_cache.enabled():
+            content_hash, cache_key = await upload_cache_key(file, current)
+            payload = await run_db_write(db.fetch_cached_result, cache_key)
+            if payload is not None:
+                cached = await run_blocking(result_cache.decode_result, payload)
+                if answers_top_k(cached, top_k):
+                    return table_response(with_top_k(cached, top_k), "fraudulent_data",
+                                          response_format, {"X-Result-Cache": "hit"})
+            headers["X-Result-Cache"] = "miss"
+            # Cached results keep enough riskiest rows for most top_k requests
+            ranked = max(top_k or 0, RESULT_CACHE_RISKIEST_ROWS)
+            # A file scored before (e.g. for a larger top_k) is not stored twice
+            store = await run_db_write(db.claim_upload, content_hash)
         
-        # Prepare response data
-        result = {
-            "total_transactions": len(df),
-            "fraudulent_transactions": len(fraudulent_df),
-            "fraudulent_data": fraudulent_transactions,
-            "timestamp": datetime.now().isoformat()
-        }
+        try:
+            if chunk_size:
+                # Stream the spooled upload straight into the chunked reader
+                result = await score_upload_in_chunks(file.file, file.filename, chunk_size, current,
+                                                      ranked, store)
+            else:
+                result = await score_upload(file.file, file.filename, current, ranked, store)
+        except BaseException:
+            if content_hash is not None and store:
+                await run_db_write(db.release_upload, content_hash)
+            raise
         
-        # Store results in database
-        db.insert_fraudulent_transactions(result, file.filename)
+        if cache_key is not None:
+            await run_blocking(cache_result, cache_key, result)
         
-        return JSONResponse(result)
+        return table_response(with_top_k(result, top_k), "fraudulent_data", response_format, headers)
         
+    except UploadParseError as e:
+        # Unreadable or unsupported uploads; scoring errors are server errors
+        raise HTTPException(status_code=400, detail=f"Error reading file: {str(e)}")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing file: {str(e)}")
 
+@app.post("/predict-csv/jobs", status_code=202)
+async def submit_predict_csv_job(file: UploadFile = File(...)):
+    """Queue an upload for background scoring and return its job id at once
+
+    The file is spooled to disk and scored in chunks by the local job
+    workers, like ``/predict-csv?chunk_size=...``. Poll ``status_url`` for
+    progress; the finished job's ``result`` has the summary counts, and the
+    fraud hits are in /fraudulent-transactions.
+    """
+    current = serving_model()
+    
+    try:
+        options = {"model_version": current.version}
+        if result_cache.enabled():
+            options['content_hash'], options['cache_key'] = await upload_cache_key(file, current)
+            payload = await run_db_write(db.fetch_cached_result, options['cache_key'])
+            if payload is not None:
+                # Already scored: record a finished job with the cached summary
+                cached = await run_blocking(result_cache.decode_result, payload)
+                cached.pop('fraudulent_data', None)
+                cached.pop('riskiest_transactions', None)
+                job_id = await run_blocking(job_runner.complete, file.filename, cached, options)
+                return {"job_id": job_id, "status": "done", "status_url": f"/jobs/{job_id}"}
+        
+        job_id = await run_blocking(job_runner.submit, file.file, file.filename, options)
+        return {"job_id": job_id, "status": "queued", "status_url": f"/jobs/{job_id}"}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error queueing file: {str(e)}")
+
+@app.get("/jobs/{job_id}")
+def get_job_status(job_id: str):
+    """Status of a background scoring job: rows done so far and throughput"""
+    job = db.get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    return job_status(job)
+
 @app.get("/fraudulent-transactions")
-async def get_fraudulent_transactions(limit: int = 100):
-    """Get fraudulent transactions from database"""
+def get_fraudulent_transactions(limit: int = 100, cursor: Optional[str] = None,
+                                response_format: str = Query('json', alias='format')):
+    """Get fraudulent transactions from database
+
+    Pass the returned ``next_cursor`` as ``cursor`` to fetch the next page.
+    ``format`` is ``json`` (default), ``ndjson`` (next cursor in the
+    ``X-Next-Cursor`` header) or ``columnar``, as for /predict-csv.
+    """
     try:
-        transactions = db.get_fraudulent_transactions(limit)
-        return JSONResponse({
+        validate_format(response_format)
+        if cursor is not None:
+            db.decode_cursor(cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    try:
+        transactions, next_cursor = db.get_fraudulent_transactions_page(limit, cursor)
+        return table_response({
             "count": len(transactions),
             "transactions": transactions,
+            "next_cursor": next_cursor,
             "timestamp": datetime.now().isoformat()
-        })
+        }, "transactions", response_format)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error retrieving transactions: {str(e)}")
 
+@app.get("/fraudulent-transactions/history")
+def get_archived_transactions(start: Optional[date] = None, end: Optional[date] = None,
+                              city: Optional[str] = None, limit: int = 1000,
+                              response_format: str = Query('json', alias='format')):
+    """Get fraudulent transactions from the Parquet archive, newest first
+
+    Days past the retention period live only in the archive; ``start`` and
+    ``end`` (inclusive ISO dates) bound the archived days read and ``city``
+    names a map city. ``format`` is as for /fraudulent-transactions.
+    """
+    try:
+        validate_format(response_format)
+        if city is not None and city not in geo.CITY_INDEX:
+            raise ValueError(f"Unknown city: {city}")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    try:
+        transactions = db.get_archived_transactions(
+            start, end, None if city is None else geo.CITY_INDEX[city], limit
+        )
+        return table_response({
+            "count": len(transactions),
+            "transactions": transactions,
+            "timestamp": datetime.now().isoformat()
+        }, "transactions", response_format)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error retrieving archived transactions: {str(e)}")
+
 @app.get("/processing-logs")
-async def get_processing_logs(limit: int = 10):
+def get_processing_logs(limit: int = 10):
     """Get processing logs from database"""
     try:
         logs = db.get_processing_logs(limit)
@@ -156,24 +914,79 @@ async def get_processing_logs(limit: int = 10):
 async def clear_data():
     """Clear all data from database (for testing purposes)"""
     try:
-        conn = sqlite3.connect('fraud_detection.db')
-        cursor = conn.cursor()
-        
-        cursor.execute('DELETE FROM fraudulent_transactions')
-        cursor.execute('DELETE FROM processing_logs')
-        
-        conn.commit()
-        conn.close()
+        await run_db_write(db.clear_data)
         
         return {"message": "All data cleared successfully"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error clearing data: {str(e)}")
 
+@app.get("/metrics")
+def get_metrics():
+    """Stage timings, row counters and request latency in Prometheus text format"""
+    return Response(metrics.render(), media_type=metrics.CONTENT_TYPE)
+
+@app.get("/models")
+def get_models():
+    """Published model versions, the registry's active one and the one served here"""
+    current = models.current
+    return {
+        "serving": current.version if current is not None else None,
+        "active": model_registry.active_version(models.registry_dir),
+        "shadow": SHADOW_MODEL_VERSION,
+        "versions": model_registry.list_versions(models.registry_dir),
+    }
+
+@app.post("/models/{version}/activate")
+async def activate_model(version: str):
+    """Activate a published version and swap to it in this worker right away
+
+    Other workers pick it up within MODEL_POLL_SECONDS.
+    """
+    try:
+        await run_blocking(model_registry.activate_version, version, models.registry_dir)
+        await run_blocking(models.reload)
+    except (FileNotFoundError, ValueError):
+        raise HTTPException(status_code=404, detail=f"Model version {version} not found")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error loading model version: {str(e)}")
+    return {"serving": models.current.version, "timestamp": datetime.now().isoformat()}
+
+def readiness() -> Dict:
+    """Whether this process can serve scoring requests, and why not"""
+    current = models.current
+    if not database_ready:
+        status = "starting"
+    elif current is None and model_load_error is not None:
+        status = "model not loaded"
+    elif current is None and MODEL_WARM_UP != 'lazy':
+        status = "loading model"
+    else:
+        # With lazy warm-up the first request loads the model
+        status = "ready"
+    return {
+        "status": status,
+        "ready": status == "ready",
+        "model_version": current.version if current is not None else None,
+        "timestamp": datetime.now().isoformat()
+    }
+
 @app.get("/health")
 async def health_check():
-    """Health check endpoint"""
-    status = "healthy" if model is not None else "model not loaded"
-    return {"status": status, "timestamp": datetime.now().isoformat()}
+    """Health check endpoint: liveness plus the readiness report"""
+    report = readiness()
+    return dict(report, status="healthy" if report["ready"] else report["status"], live=True)
+
+@app.get("/health/live")
+async def liveness():
+    """Liveness: the process is up and serving requests"""
+    return {"status": "alive", "timestamp": datetime.now().isoformat()}
+
+@app.get("/health/ready")
+async def readiness_check():
+    """Readiness: 200 once the schema is set up and a model is loaded, else 503"""
+    report = readiness()
+    return JSONResponse(report, status_code=200 if report["ready"] else 503)
 
 if __name__ == "__main__":
+    import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
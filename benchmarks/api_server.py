@@ -0,0 +1,36 @@
+"""Helpers for benchmarks that drive a real API server in a subprocess"""
+import os
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+
+import requests
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PORT = 8765
+BASE_URL = f'http://127.0.0.1:{PORT}'
+
+@contextmanager
+def running_api(db_path, **env_overrides):
+    """Run ``uvicorn api:app`` against ``db_path`` until the block exits"""
+    env = dict(os.environ, FRAUD_DB_PATH=db_path, **env_overrides)
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'uvicorn', 'api:app', '--port', str(PORT), '--log-level', 'warning'],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL
+    )
+    try:
+        # Ready, not just live: the model is loaded after startup
+        for _ in range(300):
+            try:
+                if requests.get(f'{BASE_URL}/health/ready', timeout=1).ok:
+                    break
+            except requests.ConnectionError:
+                pass
+            time.sleep(0.1)
+        else:
+            raise RuntimeError("API server did not start")
+        yield BASE_URL
+    finally:
+        server.terminate()
+        server.wait()
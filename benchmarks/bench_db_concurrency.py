@@ -0,0 +1,125 @@
+"""Concurrent-reader load test for the database layer.
+
+Simulates dashboard polling: reader threads alternate between
+get_fraudulent_transactions(100) and get_processing_logs(10) while one
+writer keeps ingesting batches. Compares opening a fresh connection per
+call (the original behaviour) with the pooled connection manager and
+reports p50/p99 read latency.
+
+Run from the repository root:
+    python benchmarks/bench_db_concurrency.py
+"""
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database_setup as db
+
+READER_THREADS = 8
+READS_PER_THREAD = 100
+SEED_ROWS = 2_000
+WRITE_BATCH_ROWS = 100
+
+def make_fraud_frame(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'step': rng.integers(1, 744, rows),
+        'type': np.where(rng.random(rows) < 0.5, 'TRANSFER', 'CASH_OUT'),
+        'amount': rng.exponential(100000, rows).round(2),
+        'isFlaggedFraud': 0,
+    })
+
+def read_per_call_connection(query, limit):
+    """The original pattern: connect, run one statement, close"""
+    conn = sqlite3.connect(db.DATABASE_PATH)
+    cursor = conn.cursor()
+    cursor.execute(query, (limit,))
+    columns = [description[0] for description in cursor.description]
+    rows = [dict(zip(columns, row)) for row in cursor.fetchall()]
+    conn.close()
+    return rows
+
+def legacy_transactions(limit):
+    return read_per_call_connection(
+        'SELECT * FROM fraudulent_transactions ORDER BY detected_at DESC LIMIT ?', limit
+    )
+
+def legacy_logs(limit):
+    return read_per_call_connection(
+        'SELECT * FROM processing_logs ORDER BY processed_at DESC LIMIT ?', limit
+    )
+
+def run_load(get_transactions, get_logs):
+    latencies = []
+    lock = threading.Lock()
+    stop_writer = threading.Event()
+    batch = make_fraud_frame(WRITE_BATCH_ROWS, seed=1)
+    
+    def reader():
+        local = []
+        for i in range(READS_PER_THREAD):
+            start = time.perf_counter()
+            if i % 2:
+                get_logs(10)
+            else:
+                get_transactions(100)
+            local.append(time.perf_counter() - start)
+        with lock:
+            latencies.extend(local)
+    
+    def writer():
+        while not stop_writer.is_set():
+            db.insert_fraudulent_frame(batch, 'load.csv', len(batch))
+            time.sleep(0.1)
+    
+    writer_thread = threading.Thread(target=writer)
+    writer_thread.start()
+    readers = [threading.Thread(target=reader) for _ in range(READER_THREADS)]
+    start = time.perf_counter()
+    for thread in readers:
+        thread.start()
+    for thread in readers:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    stop_writer.set()
+    writer_thread.join()
+    
+    latencies_ms = np.array(latencies) * 1000
+    return {
+        'p50_ms': np.percentile(latencies_ms, 50),
+        'p99_ms': np.percentile(latencies_ms, 99),
+        'reads_per_s': len(latencies) / elapsed,
+    }
+
+def run_mode(get_transactions, get_logs):
+    """Run the load against a freshly seeded database"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db.configure(path=os.path.join(tmp, 'fraud_detection.db'))
+        db.setup_database()
+        db.insert_fraudulent_frame(make_fraud_frame(SEED_ROWS), 'seed.csv', SEED_ROWS)
+        try:
+            return run_load(get_transactions, get_logs)
+        finally:
+            db.close_connections()
+
+def main():
+    results = {
+        'connection per call': run_mode(legacy_transactions, legacy_logs),
+        'pooled': run_mode(db.get_fraudulent_transactions, db.get_processing_logs),
+    }
+    
+    print(f"\n{READER_THREADS} readers x {READS_PER_THREAD} reads, one writer")
+    print(f"{'mode':>20} {'p50 (ms)':>10} {'p99 (ms)':>10} {'reads/s':>10}")
+    for mode, stats in results.items():
+        print(f"{mode:>20} {stats['p50_ms']:>10.2f} {stats['p99_ms']:>10.2f} {stats['reads_per_s']:>10,.0f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""Benchmark fraudulent transaction ingestion: the original per-row
+INSERT + datetime.now() loop vs. the bulk executemany path with WAL pragmas.
+
+Each run uses a fresh database in a temporary directory.
+Run from the repository root:
+    python benchmarks/bench_db_insert.py
+"""
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import date, datetime
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database_setup as db
+
+ROW_COUNTS = [1_000, 100_000, 1_000_000]
+
+def make_fraud_frame(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    types = np.array(['TRANSFER', 'CASH_OUT'], dtype=object)
+    return pd.DataFrame({
+        'step': rng.integers(1, 744, rows),
+        'type': types[rng.integers(0, len(types), rows)],
+        'amount': rng.exponential(100000, rows).round(2),
+        'oldbalanceOrg': rng.exponential(200000, rows).round(2),
+        'newbalanceOrig': np.zeros(rows),
+        'oldbalanceDest': rng.exponential(100000, rows).round(2),
+        'newbalanceDest': rng.exponential(100000, rows).round(2),
+        'isFlaggedFraud': 0,
+        'isFraudPrediction': 1,
+    })
+
+def insert_rowwise(fraudulent_df, filename):
+    """The original ingestion path, including the to_dict() conversion,
+    writing to today's partition"""
+    fraudulent_data = fraudulent_df.to_dict(orient='records')
+    conn = sqlite3.connect('fraud_detection.db')
+    cursor = conn.cursor()
+    cursor.execute('''
+    INSERT INTO processing_logs (filename, total_transactions, fraudulent_count, processed_at)
+    VALUES (?, ?, ?, ?)
+    ''', (filename, len(fraudulent_data), len(fraudulent_data), datetime.now()))
+    for transaction in fraudulent_data:
+        cursor.execute(f'''
+        INSERT INTO {db.partition_name(date.today())} 
+        (step, type, amount, oldbalanceOrg, newbalanceOrig, oldbalanceDest, newbalanceDest, isFlaggedFraud, detected_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (
+            transaction.get('step', 0),
+            transaction.get('type', ''),
+            transaction.get('amount', 0),
+            transaction.get('oldbalanceOrg', 0),
+            transaction.get('newbalanceOrig', 0),
+            transaction.get('oldbalanceDest', 0),
+            transaction.get('newbalanceDest', 0),
+            transaction.get('isFlaggedFraud', 0),
+            datetime.now()
+        ))
+    conn.commit()
+    conn.close()
+
+def insert_bulk(fraudulent_df, filename):
+    db.insert_fraudulent_frame(fraudulent_df, filename, len(fraudulent_df))
+
+def rows_per_second(insert, fraudulent_df, wal):
+    with tempfile.TemporaryDirectory() as tmp:
+        cwd = os.getcwd()
+        os.chdir(tmp)
+        try:
+            db.configure(path=os.path.join(tmp, 'fraud_detection.db'))
+            db.setup_database()
+            with db.transaction() as cursor:
+                db._ensure_partition(cursor, date.today())
+                db._refresh_transactions_view(cursor)
+            if not wal:
+                db.close_connections()
+                sqlite3.connect('fraud_detection.db').execute('PRAGMA journal_mode=DELETE').close()
+            start = time.perf_counter()
+            insert(fraudulent_df, 'bench.csv')
+            elapsed = time.perf_counter() - start
+        finally:
+            db.close_connections()
+            os.chdir(cwd)
+    return len(fraudulent_df) / elapsed
+
+def main():
+    results = []
+    for rows in ROW_COUNTS:
+        fraudulent_df = make_fraud_frame(rows)
+        rowwise = rows_per_second(insert_rowwise, fraudulent_df, wal=False)
+        bulk = rows_per_second(insert_bulk, fraudulent_df, wal=True)
+        results.append((rows, rowwise, bulk))
+    
+    print(f"\n{'rows':>10} {'per-row (rows/s)':>18} {'bulk (rows/s)':>16} {'speedup':>8}")
+    for rows, rowwise, bulk in results:
+        print(f"{rows:>10} {rowwise:>18,.0f} {bulk:>16,.0f} {bulk / rowwise:>7.1f}x")
+
+if __name__ == "__main__":
+    main()
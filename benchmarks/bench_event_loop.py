@@ -0,0 +1,88 @@
+"""Check that the API stays responsive while a large CSV is being scored.
+
+Starts the API in a subprocess, measures /health latency while idle, then
+polls /health continuously while a large upload goes through /predict-csv
+and reports the latency distribution seen during the upload.
+
+Run from the repository root:
+    python benchmarks/bench_event_loop.py [--rows 300000] [--executor thread]
+"""
+import argparse
+import os
+import tempfile
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import requests
+
+from api_server import running_api
+
+POLL_INTERVAL = 0.02
+
+def write_csv(path, rows, seed=0):
+    rng = np.random.default_rng(seed)
+    types = np.array(['CASH_IN', 'CASH_OUT', 'DEBIT', 'PAYMENT', 'TRANSFER'], dtype=object)
+    amount = rng.exponential(100000, rows).round(2)
+    old_balance = rng.exponential(200000, rows).round(2)
+    pd.DataFrame({
+        'step': rng.integers(1, 744, rows),
+        'type': types[rng.integers(0, len(types), rows)],
+        'amount': amount,
+        'oldbalanceOrg': old_balance,
+        'newbalanceOrig': np.maximum(old_balance - amount, 0),
+        'oldbalanceDest': rng.exponential(100000, rows).round(2),
+        'newbalanceDest': rng.exponential(100000, rows).round(2),
+        'isFlaggedFraud': 0,
+    }).to_csv(path, index=False)
+
+def health_latency(session, base_url):
+    start = time.perf_counter()
+    session.get(f'{base_url}/health').raise_for_status()
+    return (time.perf_counter() - start) * 1000
+
+def summarise(latencies):
+    latencies = np.array(latencies)
+    return f"n={len(latencies):>4}  p50={np.percentile(latencies, 50):7.2f} ms  " \
+           f"p99={np.percentile(latencies, 99):7.2f} ms  max={latencies.max():7.2f} ms"
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=300_000)
+    parser.add_argument('--executor', choices=['thread', 'process'], default='thread')
+    parser.add_argument('--chunk-size', type=int, default=None)
+    args = parser.parse_args()
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = os.path.join(tmp, 'upload.csv')
+        write_csv(csv_path, args.rows)
+        
+        with running_api(os.path.join(tmp, 'fraud.db'), INFERENCE_EXECUTOR=args.executor) as base_url:
+            session = requests.Session()
+            idle = [health_latency(session, base_url) for _ in range(50)]
+            
+            upload_seconds = []
+            def upload():
+                start = time.perf_counter()
+                params = {'chunk_size': args.chunk_size} if args.chunk_size else {}
+                with open(csv_path, 'rb') as f:
+                    requests.post(
+                        f'{base_url}/predict-csv', params=params, files={'file': ('upload.csv', f)}
+                    ).raise_for_status()
+                upload_seconds.append(time.perf_counter() - start)
+            
+            uploader = threading.Thread(target=upload)
+            uploader.start()
+            busy = []
+            while uploader.is_alive():
+                busy.append(health_latency(session, base_url))
+                time.sleep(POLL_INTERVAL)
+            uploader.join()
+    
+    print(f"\n{args.rows:,} row upload took {upload_seconds[0]:.2f} s ({args.executor} executor)")
+    print(f"/health idle:          {summarise(idle)}")
+    print(f"/health during upload: {summarise(busy)}")
+
+if __name__ == "__main__":
+    main()
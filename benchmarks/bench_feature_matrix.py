@@ -0,0 +1,98 @@
+"""Feature matrix construction: the old preprocess_data vs FeatureSchema.
+
+The old path copied the parsed frame, dropped the account ids, encoded the
+categorical columns in the copy, added missing columns one at a time and
+reindexed, leaving a mixed-dtype DataFrame that the forest converted to
+float32 again before predicting. FeatureSchema.matrix writes the expected
+columns straight into one float32 array.
+
+For each layout (the full PaySim columns, an upload missing
+isFlaggedFraud, and one with unknown and missing transaction types) both
+paths are timed end to end up to the float32 matrix the forest predicts
+on, and their peak traced allocations are measured with tracemalloc. The
+matrices must be identical.
+
+Run from the repository root:
+    python benchmarks/bench_feature_matrix.py [--rows 1000000]
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+
+import paysim
+from preprocessing import DEFAULT_CATEGORY_MAPPINGS, FeatureSchema, encode_categoricals
+
+EXPECTED_COLUMNS = [
+    'step', 'type', 'amount', 'oldbalanceOrg', 'newbalanceOrig',
+    'oldbalanceDest', 'newbalanceDest', 'isFlaggedFraud',
+]
+REPEATS = 5
+
+def legacy_matrix(df):
+    """The previous api.preprocess_data, then sklearn's float32 conversion"""
+    data = df.copy()
+    if 'nameOrig' in data.columns:
+        data.drop('nameOrig', axis=1, inplace=True)
+    if 'nameDest' in data.columns:
+        data.drop('nameDest', axis=1, inplace=True)
+    encode_categoricals(data, DEFAULT_CATEGORY_MAPPINGS)
+    for col in EXPECTED_COLUMNS:
+        if col not in data.columns:
+            if col == 'isFlaggedFraud':
+                data[col] = 0
+            else:
+                data[col] = 0
+    data = data[EXPECTED_COLUMNS]
+    return np.ascontiguousarray(data, dtype=np.float32)
+
+def measure(func, df):
+    timings = []
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        func(df)
+        timings.append(time.perf_counter() - start)
+    tracemalloc.start()
+    func(df)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return min(timings), peak
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    full = paysim.generate(args.rows, seed=args.seed).reset_index(drop=True)
+    odd_types = full.copy()
+    odd_types.loc[::97, 'type'] = 'REFUND'
+    odd_types.loc[::89, 'type'] = None
+    layouts = {
+        'all columns': full,
+        'no isFlaggedFraud': full.drop(columns=['isFlaggedFraud']),
+        'odd types': odd_types,
+    }
+    schema = FeatureSchema(EXPECTED_COLUMNS, DEFAULT_CATEGORY_MAPPINGS)
+    per_million = 1_000_000 / args.rows
+    matrix_mb = args.rows * len(EXPECTED_COLUMNS) * 4 / 1e6
+    print(f"{args.rows:,} rows; the float32 result itself is {matrix_mb:.1f} MB. "
+          f"Times are per million rows.")
+    print(f"{'layout':>18} {'path':>14} {'ms/1M rows':>11} {'peak alloc (MB)':>16}")
+    for name, df in layouts.items():
+        np.testing.assert_array_equal(schema.matrix(df), legacy_matrix(df))
+        for label, func in (('preprocess_data', legacy_matrix), ('FeatureSchema', schema.matrix)):
+            seconds, peak = measure(func, df)
+            print(f"{name:>18} {label:>14} {seconds * 1000 * per_million:>11.1f} {peak / 1e6:>16.1f}")
+    print("Matrices are identical for every layout")
+
+if __name__ == "__main__":
+    main()
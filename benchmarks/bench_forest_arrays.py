@@ -0,0 +1,98 @@
+"""Startup, memory and throughput of the memory-mapped forest export.
+
+Loads the model in fresh subprocesses, once by unpickling credit_fraud.pkl
+and once by mapping the exported forest arrays, and reports load time and
+peak RSS for each. Then checks that ArrayForest returns exactly the same
+probabilities and labels as the pickled model and compares predict
+throughput.
+
+Run from the repository root (after `python forest_arrays.py`):
+    python benchmarks/bench_forest_arrays.py [--rows 200000]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+import warnings
+
+import joblib
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from forest_arrays import ArrayForest, FOREST_ARRAYS_DIR
+from bench_parallel_scoring import make_features, MODEL_PATH
+
+ARRAYS_PATH = os.path.join(ROOT, FOREST_ARRAYS_DIR)
+
+# Run in a fresh interpreter: import the loader, load the model, score one
+# row so lazily touched pages are counted, then report timings and peak RSS
+LOAD_SCRIPT = """
+import json, resource, sys, time, warnings
+warnings.filterwarnings('ignore')
+started = time.perf_counter()
+sys.path.insert(0, {root!r})
+from forest_arrays import load_model
+import numpy as np
+imported = time.perf_counter()
+model = load_model({path!r})
+loaded = time.perf_counter()
+model.predict(np.zeros((1, model.n_features_in_), dtype=np.float32))
+print(json.dumps({{
+    'import_s': imported - started,
+    'load_s': loaded - imported,
+    'first_predict_s': time.perf_counter() - loaded,
+    'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+}}))
+"""
+
+def measure_load(path):
+    """Load time and peak RSS of a fresh process loading ``path``"""
+    output = subprocess.run(
+        [sys.executable, '-c', LOAD_SCRIPT.format(root=ROOT, path=path)],
+        check=True, capture_output=True, text=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def time_call(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return time.perf_counter() - start, result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=200_000)
+    parser.add_argument('--repeat', type=int, default=3, help="fresh processes per loader")
+    args = parser.parse_args()
+
+    if not os.path.isdir(ARRAYS_PATH):
+        sys.exit(f"{ARRAYS_PATH} not found; run `python forest_arrays.py` first")
+
+    print(f"{'loader':>8} {'import s':>9} {'load s':>8} {'1st pred s':>11} {'peak RSS MB':>12}")
+    for name, path in [('pickle', MODEL_PATH), ('mmap', ARRAYS_PATH)]:
+        runs = [measure_load(path) for _ in range(args.repeat)]
+        best = {key: min(run[key] for run in runs) for key in runs[0]}
+        print(f"{name:>8} {best['import_s']:>9.3f} {best['load_s']:>8.3f} "
+              f"{best['first_predict_s']:>11.3f} {best['peak_rss_mb']:>12.1f}")
+
+    warnings.filterwarnings('ignore', message='X does not have valid feature names')
+    X = make_features(args.rows)
+    # NaNs exercise the missing-value routing as well
+    X[::97, 3] = np.nan
+    model = joblib.load(MODEL_PATH)
+    forest = ArrayForest(ARRAYS_PATH)
+
+    sklearn_s, expected = time_call(model.predict_proba, X)
+    arrays_s, proba = time_call(forest.predict_proba, X)
+    assert np.array_equal(proba, expected), "ArrayForest probabilities differ from the pickled model"
+    assert np.array_equal(forest.predict(X), model.predict(X)), "ArrayForest labels differ"
+
+    print(f"\npredict_proba on {args.rows:,} rows (identical results)")
+    print(f"{'sklearn':>8} {sklearn_s:>8.2f}s  {args.rows / sklearn_s:>12,.0f} rows/s")
+    print(f"{'mmap':>8} {arrays_s:>8.2f}s  {args.rows / arrays_s:>12,.0f} rows/s")
+
+if __name__ == "__main__":
+    main()
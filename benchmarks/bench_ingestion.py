@@ -0,0 +1,120 @@
+"""Upload size and parse time per ingestion format.
+
+Writes one synthetic PaySim-shaped dump as plain, gzip and zstd CSV, Parquet
+and Arrow IPC, then reports the bytes each upload transfers and how long
+ingestion.read_transactions takes to parse it down to the columns the API
+uses. The previous API path (decode the whole body to text, then parse every
+column with read_csv) is timed as the baseline. Every format must parse to
+the same values (up to CSV float round-tripping).
+
+Run from the repository root:
+    python benchmarks/bench_ingestion.py [--rows 1000000]
+"""
+import argparse
+import gzip
+import io
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from ingestion import read_transactions, IDENTIFIER_COLUMNS
+
+FEATURE_COLUMNS = [
+    'step', 'type', 'amount', 'oldbalanceOrg', 'newbalanceOrig',
+    'oldbalanceDest', 'newbalanceDest', 'isFlaggedFraud'
+]
+REPEATS = 3
+
+def make_dump(rows, seed=0):
+    """Random frame with the full PaySim column set, in file order"""
+    rng = np.random.default_rng(seed)
+    types = np.array(['CASH_IN', 'CASH_OUT', 'DEBIT', 'PAYMENT', 'TRANSFER'], dtype=object)
+    amount = rng.exponential(100000, rows).round(2)
+    old_balance = rng.exponential(200000, rows).round(2)
+    return pd.DataFrame({
+        'step': rng.integers(1, 744, rows),
+        'type': types[rng.integers(0, len(types), rows)],
+        'amount': amount,
+        'nameOrig': np.char.add('C', rng.integers(1e8, 1e10, rows).astype(str)).astype(object),
+        'oldbalanceOrg': old_balance,
+        'newbalanceOrig': np.maximum(old_balance - amount, 0).round(2),
+        'nameDest': np.char.add('M', rng.integers(1e8, 1e10, rows).astype(str)).astype(object),
+        'oldbalanceDest': rng.exponential(100000, rows).round(2),
+        'newbalanceDest': rng.exponential(100000, rows).round(2),
+        'isFraud': (rng.random(rows) < 0.001).astype(int),
+        'isFlaggedFraud': 0,
+    })
+
+def encode_uploads(df):
+    """Serialized upload bodies keyed by (label, filename)"""
+    import pyarrow as pa
+    import pyarrow.feather
+    csv = df.to_csv(index=False).encode()
+    uploads = {
+        ('csv', 'dump.csv'): csv,
+        ('csv.gz', 'dump.csv.gz'): gzip.compress(csv, compresslevel=6),
+    }
+    try:
+        import zstandard
+        uploads[('csv.zst', 'dump.csv.zst')] = zstandard.ZstdCompressor(level=3).compress(csv)
+    except ImportError:
+        uploads[('csv.zst', 'dump.csv.zst')] = pa.compress(csv, 'zstd', asbytes=True)
+
+    buffer = io.BytesIO()
+    df.to_parquet(buffer, index=False, compression='snappy')
+    uploads[('parquet', 'dump.parquet')] = buffer.getvalue()
+
+    buffer = io.BytesIO()
+    pyarrow.feather.write_feather(pa.Table.from_pandas(df, preserve_index=False), buffer,
+                                  compression='uncompressed')
+    uploads[('arrow', 'dump.arrow')] = buffer.getvalue()
+
+    buffer = io.BytesIO()
+    pyarrow.feather.write_feather(pa.Table.from_pandas(df, preserve_index=False), buffer,
+                                  compression='zstd')
+    uploads[('arrow+zstd', 'dump.feather')] = buffer.getvalue()
+    return uploads
+
+def legacy_parse(body):
+    """The previous API path: decode to text, parse every column"""
+    return pd.read_csv(io.StringIO(body.decode('utf-8')))
+
+def best_time(func, *args):
+    timings = []
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        result = func(*args)
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    columns = FEATURE_COLUMNS + IDENTIFIER_COLUMNS
+    uploads = encode_uploads(make_dump(args.rows))
+    csv_body = uploads[('csv', 'dump.csv')]
+
+    baseline, reference = best_time(legacy_parse, csv_body)
+    reference = reference[[col for col in reference.columns if col in columns]]
+
+    print(f"{args.rows:,} rows")
+    print(f"{'format':>12} {'MB sent':>8} {'vs csv':>7} {'parse s':>8} {'speedup':>8}")
+    print(f"{'legacy csv':>12} {len(csv_body) / 1e6:>8.1f} {1.0:>6.2f}x {baseline:>8.2f} {1.0:>7.2f}x")
+    for (label, filename), body in uploads.items():
+        elapsed, parsed = best_time(lambda: read_transactions(io.BytesIO(body), filename, columns))
+        pd.testing.assert_frame_equal(
+            parsed.reset_index(drop=True), reference, check_dtype=False, check_exact=False, rtol=1e-12
+        )
+        print(f"{label:>12} {len(body) / 1e6:>8.1f} {len(body) / len(csv_body):>6.2f}x "
+              f"{elapsed:>8.2f} {baseline / elapsed:>7.2f}x")
+
+if __name__ == "__main__":
+    main()
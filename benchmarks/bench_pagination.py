@@ -0,0 +1,79 @@
+"""Measure dashboard page reads as fraudulent_transactions grows.
+
+Compares the original unindexed ORDER BY detected_at DESC LIMIT query with
+the indexed keyset path, for the first page and for a page deep into the
+history (reached through a cursor). Batches are an hour apart, so larger
+tables span several daily partitions.
+
+Run from the repository root:
+    python benchmarks/bench_pagination.py
+"""
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database_setup as db
+
+TABLE_SIZES = [10_000, 100_000, 1_000_000]
+BATCH_ROWS = 10_000
+PAGE_SIZE = 100
+REPEATS = 20
+
+def seed(rows):
+    rng = np.random.default_rng(0)
+    start = datetime(2024, 1, 1)
+    with db.transaction() as cursor:
+        for batch, offset in enumerate(range(0, rows, BATCH_ROWS)):
+            size = min(BATCH_ROWS, rows - offset)
+            frame = pd.DataFrame({
+                'step': rng.integers(1, 744, size),
+                'type': np.where(rng.random(size) < 0.5, 'TRANSFER', 'CASH_OUT'),
+                'amount': rng.exponential(100000, size).round(2),
+            })
+            db._insert_fraudulent_rows(cursor, frame, start + timedelta(hours=batch))
+
+def best_ms(func):
+    timings = []
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings) * 1000
+
+def unindexed_first_page():
+    # The unary + keeps SQLite from using the detected_at indexes
+    return db._fetch_dicts(
+        'SELECT * FROM fraudulent_transactions ORDER BY +detected_at DESC LIMIT ?',
+        (PAGE_SIZE,)
+    )
+
+def main():
+    print(f"{'rows':>10} {'unindexed (ms)':>15} {'keyset first (ms)':>18} {'keyset deep (ms)':>17}")
+    for rows in TABLE_SIZES:
+        with tempfile.TemporaryDirectory() as tmp:
+            # Seeded days are in the past; keep them all live
+            db.configure(path=os.path.join(tmp, 'fraud_detection.db'), retention_days=0)
+            db.setup_database()
+            seed(rows)
+            
+            # A cursor pointing at the middle of the history
+            middle = db._fetch_dicts(
+                'SELECT id, detected_at FROM fraudulent_transactions WHERE id = ?', (rows // 2,)
+            )[0]
+            deep_cursor = db.encode_cursor(middle)
+            
+            unindexed = best_ms(unindexed_first_page)
+            first = best_ms(lambda: db.get_fraudulent_transactions_page(PAGE_SIZE))
+            deep = best_ms(lambda: db.get_fraudulent_transactions_page(PAGE_SIZE, deep_cursor))
+            db.close_connections()
+        print(f"{rows:>10} {unindexed:>15.2f} {first:>18.2f} {deep:>17.2f}")
+
+if __name__ == "__main__":
+    main()
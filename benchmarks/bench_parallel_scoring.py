@@ -0,0 +1,72 @@
+"""Scaling benchmark for sharded parallel inference.
+
+Scores one large preprocessed feature matrix with the single-process model
+and with ShardedScorer at 1/2/4/8 workers, checks that every run returns the
+same predictions in the same row order, and reports wall time and speedup.
+
+Run from the repository root:
+    python benchmarks/bench_parallel_scoring.py [--rows 2000000]
+"""
+import argparse
+import os
+import sys
+import time
+import warnings
+
+import joblib
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from parallel_scoring import ShardedScorer
+
+MODEL_PATH = os.path.join(ROOT, 'credit_fraud.pkl')
+WORKER_COUNTS = [1, 2, 4, 8]
+
+def make_features(rows, seed=0):
+    """Random matrix in the expected_columns layout (type already encoded)"""
+    rng = np.random.default_rng(seed)
+    amount = rng.exponential(100000, rows)
+    old_balance = rng.exponential(200000, rows)
+    return np.column_stack([
+        rng.integers(1, 744, rows),
+        rng.integers(0, 5, rows),
+        amount,
+        old_balance,
+        np.maximum(old_balance - amount, 0),
+        rng.exponential(100000, rows),
+        rng.exponential(100000, rows),
+        np.zeros(rows),
+    ]).astype(np.float32)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=2_000_000)
+    args = parser.parse_args()
+    
+    warnings.filterwarnings('ignore', message='X does not have valid feature names')
+    X = make_features(args.rows)
+    model = joblib.load(MODEL_PATH)
+    
+    start = time.perf_counter()
+    expected = model.predict(X)
+    baseline = time.perf_counter() - start
+    
+    print(f"{args.rows:,} rows on {os.cpu_count()} CPUs")
+    print(f"{'workers':>8} {'seconds':>9} {'speedup':>8}")
+    print(f"{'inline':>8} {baseline:>9.2f} {1.0:>7.2f}x")
+    for workers in WORKER_COUNTS:
+        scorer = ShardedScorer(MODEL_PATH, n_workers=workers)
+        try:
+            scorer.predict(X[:1000])  # start the workers and load the model
+            start = time.perf_counter()
+            predictions = scorer.predict(X)
+            elapsed = time.perf_counter() - start
+        finally:
+            scorer.shutdown()
+        assert np.array_equal(predictions, expected), "sharded predictions differ from inline predict"
+        print(f"{workers:>8} {elapsed:>9.2f} {baseline / elapsed:>7.2f}x")
+
+if __name__ == "__main__":
+    main()
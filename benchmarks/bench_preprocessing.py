@@ -0,0 +1,64 @@
+"""Benchmark per-batch categorical encoding: per-batch LabelEncoder vs. the
+persisted category mappings.
+
+Run from the repository root:
+    python benchmarks/bench_preprocessing.py
+"""
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.preprocessing import LabelEncoder
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from preprocessing import DEFAULT_CATEGORY_MAPPINGS, encode_categoricals
+
+BATCH_SIZES = [10_000, 100_000, 1_000_000]
+REPEATS = 5
+
+def make_batch(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    types = np.array(DEFAULT_CATEGORY_MAPPINGS['type'], dtype=object)
+    return pd.DataFrame({
+        'step': rng.integers(1, 744, rows),
+        'type': types[rng.integers(0, len(types), rows)],
+        'amount': rng.exponential(100000, rows).round(2),
+    })
+
+def encode_per_batch(df):
+    """The previous behaviour: refit a LabelEncoder on every batch"""
+    lb_make = LabelEncoder()
+    df['type'] = lb_make.fit_transform(df['type'])
+    return df
+
+def encode_persisted(df):
+    return encode_categoricals(df, DEFAULT_CATEGORY_MAPPINGS)
+
+def best_time(func, batch):
+    timings = []
+    for _ in range(REPEATS):
+        data = batch.copy()
+        start = time.perf_counter()
+        func(data)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+def main():
+    print(f"{'rows':>10} {'per-batch fit (ms)':>20} {'persisted (ms)':>16} {'speedup':>8}")
+    for rows in BATCH_SIZES:
+        batch = make_batch(rows)
+        before = best_time(encode_per_batch, batch)
+        after = best_time(encode_persisted, batch)
+        print(f"{rows:>10} {before * 1000:>20.2f} {after * 1000:>16.2f} {before / after:>7.1f}x")
+    
+    # A batch holding only TRANSFER rows shows why per-batch fitting is wrong
+    transfers = pd.DataFrame({'type': ['TRANSFER'] * 3})
+    print("\nTRANSFER-only batch codes")
+    print(f"  per-batch fit: {encode_per_batch(transfers.copy())['type'].tolist()}")
+    print(f"  persisted:     {encode_persisted(transfers.copy())['type'].tolist()}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""Response encoding time and peak memory for a large fraud result set.
+
+Encodes a /predict-csv style result holding 100k fraudulent rows the old way
+(to_dict(orient='records') rendered by JSONResponse) and with the streamed
+encoders in serialization.py, in each response format, with orjson and with
+the standard json fallback. Streamed bodies are consumed chunk by chunk, as
+the server writes them to the socket. Every JSON body must decode to the
+same records as the old response.
+
+Run from the repository root:
+    python benchmarks/bench_serialization.py [--rows 100000]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+from fastapi.responses import JSONResponse
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import serialization
+from serialization import COLUMNAR, FORMATS, iter_response
+
+def make_result(rows, seed=0):
+    """A /predict-csv result envelope with ``rows`` fraudulent transactions"""
+    rng = np.random.default_rng(seed)
+    types = np.array(['TRANSFER', 'CASH_OUT'], dtype=object)
+    fraudulent_df = pd.DataFrame({
+        'step': rng.integers(1, 744, rows),
+        'type': types[rng.integers(0, len(types), rows)],
+        'amount': rng.exponential(100000, rows).round(2),
+        'nameOrig': np.char.add('C', rng.integers(1e8, 1e10, rows).astype(str)).astype(object),
+        'oldbalanceOrg': rng.exponential(200000, rows).round(2),
+        'newbalanceOrig': np.zeros(rows),
+        'nameDest': np.char.add('C', rng.integers(1e8, 1e10, rows).astype(str)).astype(object),
+        'oldbalanceDest': rng.exponential(100000, rows).round(2),
+        'newbalanceDest': rng.exponential(100000, rows).round(2),
+        'isFlaggedFraud': 0,
+        'isFraudPrediction': 1,
+        'prediction_confidence': rng.integers(50, 101, rows) * 1.0,
+    })
+    return {
+        "total_transactions": rows * 30,
+        "fraudulent_transactions": rows,
+        "fraudulent_data": fraudulent_df,
+        "timestamp": datetime.now().isoformat()
+    }
+
+def legacy_body(result):
+    """The previous response: every row as a dict, rendered as one string"""
+    result = dict(result, fraudulent_data=result["fraudulent_data"].to_dict(orient='records'))
+    return JSONResponse(result).body
+
+def streamed_body(result, fmt):
+    """Consume the streamed body; only the total size is kept"""
+    return sum(len(chunk) for chunk in iter_response(result, "fraudulent_data", fmt))
+
+def measure(func, *args):
+    start = time.perf_counter()
+    func(*args)
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    func(*args)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak
+
+def check_equivalence(result, expected):
+    for fmt in FORMATS:
+        body = b''.join(iter_response(result, "fraudulent_data", fmt))
+        if fmt == 'ndjson':
+            records = [json.loads(line) for line in body.splitlines()]
+        else:
+            records = json.loads(body)["fraudulent_data"]
+            if fmt == COLUMNAR:
+                records = pd.DataFrame(records).to_dict(orient='records')
+        assert records == expected, f"{fmt} body differs from the previous response"
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=100_000)
+    args = parser.parse_args()
+
+    result = make_result(args.rows)
+    expected = json.loads(legacy_body(result))["fraudulent_data"]
+    check_equivalence(result, expected)
+
+    print(f"{args.rows:,} fraudulent rows")
+    print(f"{'encoder':>22} {'seconds':>8} {'peak MB':>8} {'body MB':>8}")
+    elapsed, peak = measure(legacy_body, result)
+    print(f"{'to_dict + JSONResponse':>22} {elapsed:>8.2f} {peak / 1e6:>8.1f} "
+          f"{len(legacy_body(result)) / 1e6:>8.1f}")
+
+    orjson = serialization.orjson
+    backends = [('orjson', orjson), ('json', None)] if orjson is not None else [('json', None)]
+    for backend, module in backends:
+        serialization.orjson = module
+        for fmt in FORMATS:
+            elapsed, peak = measure(streamed_body, result, fmt)
+            size = streamed_body(result, fmt)
+            print(f"{fmt + ' / ' + backend:>22} {elapsed:>8.2f} {peak / 1e6:>8.1f} {size / 1e6:>8.1f}")
+    serialization.orjson = orjson
+
+if __name__ == "__main__":
+    main()
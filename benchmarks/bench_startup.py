@@ -0,0 +1,104 @@
+"""Service startup: import time of both entry points, and time to ready.
+
+Each entry point is imported in a fresh interpreter from the repository
+root, against a temporary database that is already set up, ``--runs``
+times; the median is reported.
+
+- ``api``: ``import api``. This used to set up the database and load the
+  model as a side effect; both now happen in warm_up().
+- ``api + warm_up()``: the same plus the explicit warm-up hook, i.e. all
+  the work the old import did before the first request.
+- ``flask_app``: ``import flask_app`` (the rule-based server).
+
+The heavy modules each import pulls in are listed, so ML dependencies
+leaking into the Flask server show up. Finally, setup_database is timed on
+a database already at SCHEMA_VERSION against re-running the schema DDL,
+which every import used to do.
+
+Run from the repository root:
+    python benchmarks/bench_startup.py [--runs 5]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import database_setup as db
+
+HEAVY_MODULES = ['numpy', 'pandas', 'pyarrow', 'sklearn', 'joblib', 'fastapi', 'uvicorn', 'flask', 'api']
+REPEATS = 20
+
+CHILD = '''
+import json, sys, time
+sys.path[:0] = {paths!r}
+start = time.perf_counter()
+import {module}
+imported = time.perf_counter() - start
+{after}
+ready = time.perf_counter() - start
+print(json.dumps({{
+    'import': imported, 'ready': ready,
+    'modules': [name for name in {heavy!r} if name in sys.modules],
+}}))
+'''
+
+ENTRY_POINTS = [
+    ('api', 'api', '', [ROOT]),
+    ('api + warm_up()', 'api', 'api.warm_up()', [ROOT]),
+    ('flask_app', 'flask_app', '', [ROOT, os.path.join(ROOT, 'Frontend')]),
+]
+
+def run_child(module, after, paths, env):
+    code = CHILD.format(module=module, after=after, paths=paths, heavy=HEAVY_MODULES)
+    output = subprocess.run(
+        [sys.executable, '-W', 'ignore', '-c', code], cwd=ROOT, env=env,
+        capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def best_ms(func):
+    timings = []
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings) * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'fraud_detection.db')
+        env = dict(os.environ, FRAUD_DB_PATH=db_path, FRAUD_ARCHIVE_DIR=os.path.join(tmp, 'archive'))
+        db.configure(path=db_path, archive_dir=os.path.join(tmp, 'archive'))
+        db.setup_database()
+
+        print(f"{'entry point':>16} {'import (ms)':>12} {'ready (ms)':>11}  heavy modules loaded")
+        for label, module, after, paths in ENTRY_POINTS:
+            runs = [run_child(module, after, paths, env) for _ in range(args.runs)]
+            imported = statistics.median(run['import'] for run in runs) * 1000
+            ready = statistics.median(run['ready'] for run in runs) * 1000
+            print(f"{label:>16} {imported:>12.0f} {ready:>11.0f}  {', '.join(runs[-1]['modules'])}")
+
+        def rerun_ddl():
+            with db.connection() as conn:
+                conn.execute('PRAGMA user_version = 0')
+            db.setup_database()
+
+        current = best_ms(db.setup_database)
+        every_time = best_ms(rerun_ddl)
+        db.close_connections()
+    print(f"\nsetup_database on a set-up database: {current:.2f} ms "
+          f"(re-running the schema DDL as every import did: {every_time:.2f} ms)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""Training wall time, peak memory and metrics: the previous script vs now.
+
+Writes a synthetic PaySim CSV (benchmarks/paysim.py) and trains on it
+twice, each in its own process so peak memory is measured separately:
+
+- ``legacy``: the previous train_model.py. It parsed every column with
+  default dtypes and fitted the forest on one core.
+- ``current``: train_model.train_model, which uses compact dtypes and all
+  cores. Velocity features are off, so both fit the same columns.
+
+Both use the same split and seeds, so the evaluation metrics must match.
+The model artifacts are written to a temporary directory. Finally the
+current model is grown by ``--add-trees`` trees on a second "day" of data,
+to time warm-start refits against a full retrain.
+
+Run from the repository root:
+    python benchmarks/bench_training.py [--rows 1000000]
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+def legacy_train(file_path):
+    """The previous pipeline: default dtypes, single-threaded forest"""
+    import pandas as pd
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.model_selection import train_test_split
+    from preprocessing import categorical_columns, fit_category_mappings, encode_categoricals
+
+    df = pd.read_csv(file_path)
+    df.drop(['nameOrig', 'nameDest'], axis=1, inplace=True)
+    encode_categoricals(df, fit_category_mappings(df, categorical_columns(df)))
+    X = df.drop('isFraud', axis=1)
+    y = df.isFraud
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.25, random_state=27)
+    rfc = RandomForestClassifier(n_estimators=10, random_state=42)
+    rfc.fit(X_train, y_train)
+    return rfc, X_test, y_test
+
+def current_train(file_path, add_trees=0):
+    import train_model
+    with contextlib.redirect_stdout(io.StringIO()):
+        return train_model.train_model(file_path, add_trees=add_trees, publish=False, velocity=False)
+
+def run_child(mode, file_path, add_trees):
+    """Train in this process and print one JSON line of timings and metrics"""
+    from sklearn.metrics import confusion_matrix, f1_score, precision_score, recall_score
+    from train_model import peak_memory_mb
+
+    start = time.perf_counter()
+    if mode == 'legacy':
+        rfc, X_test, y_test = legacy_train(file_path)
+    else:
+        rfc, X_test, y_test = current_train(file_path, add_trees)
+    elapsed = time.perf_counter() - start
+    predictions = rfc.predict(X_test)
+    print(json.dumps({
+        'seconds': elapsed,
+        'peak_mb': peak_memory_mb(),
+        'trees': len(rfc.estimators_),
+        'precision': precision_score(y_test, predictions),
+        'recall': recall_score(y_test, predictions),
+        'f1': f1_score(y_test, predictions),
+        'confusion_matrix': confusion_matrix(y_test, predictions).tolist(),
+    }))
+
+def write_data(path, rows, seed):
+    """Write the CSV from another process: peak RSS survives fork and exec on
+    Linux, so this process must stay small for the children's peaks to count"""
+    subprocess.run([sys.executable, os.path.join(ROOT, 'benchmarks', 'paysim.py'),
+                    '--rows', str(rows), '--seed', str(seed), '--out', path],
+                   check=True, capture_output=True)
+    return path
+
+def spawn(mode, file_path, workdir, add_trees=0):
+    command = [sys.executable, os.path.abspath(__file__), '--child', mode,
+               '--data', file_path, '--add-trees', str(add_trees)]
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([ROOT, os.environ.get('PYTHONPATH', '')]))
+    output = subprocess.run(command, cwd=workdir, env=env, capture_output=True, text=True, check=True)
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--add-trees', type=int, default=5)
+    parser.add_argument('--child', choices=['legacy', 'current'])
+    parser.add_argument('--data')
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.child, args.data, args.add_trees)
+        return
+
+    with tempfile.TemporaryDirectory() as workdir:
+        data = write_data(os.path.join(workdir, 'train.csv'), args.rows, seed=0)
+        results = {
+            'legacy': spawn('legacy', data, workdir),
+            'current': spawn('current', data, workdir),
+        }
+        day = write_data(os.path.join(workdir, 'day.csv'), max(args.rows // 30, 10_000), seed=1)
+        results[f'+{args.add_trees} trees'] = spawn('current', day, workdir, args.add_trees)
+
+    for key in ('precision', 'recall', 'f1', 'confusion_matrix'):
+        assert results['legacy'][key] == results['current'][key], \
+            f"{key} differs: {results['legacy'][key]} vs {results['current'][key]}"
+
+    print(f"{args.rows:,} rows, {os.cpu_count()} CPU(s)")
+    print(f"{'pipeline':>12} {'seconds':>8} {'peak MB':>8} {'trees':>6} {'precision':>9} {'recall':>7} {'f1':>7}")
+    for name, result in results.items():
+        peak = f"{result['peak_mb']:>8.0f}" if result['peak_mb'] is not None else f"{'n/a':>8}"
+        print(f"{name:>12} {result['seconds']:>8.2f} {peak} {result['trees']:>6} "
+              f"{result['precision']:>9.4f} {result['recall']:>7.4f} {result['f1']:>7.4f}")
+    print("Note: the warm-start row is evaluated on the new day's held-out split")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""Load test for the micro-batched /predict endpoint.
+
+Starts the API twice in a subprocess against a throwaway database, once
+with PREDICT_MAX_BATCH_SIZE=1 (every request scored on its own, the
+per-request baseline) and once with micro-batching enabled, then fires
+single-transaction requests from concurrent clients and reports
+throughput and p50/p99 latency.
+
+Run from the repository root:
+    python benchmarks/load_predict.py [--requests 2000] [--concurrency 32]
+"""
+import argparse
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import requests
+
+from api_server import running_api
+
+TYPES = ['CASH_IN', 'CASH_OUT', 'DEBIT', 'PAYMENT', 'TRANSFER']
+
+def make_transaction(rng):
+    amount = float(round(rng.exponential(100000), 2))
+    old_balance = float(round(rng.exponential(200000), 2))
+    return {
+        'step': int(rng.integers(1, 744)),
+        'type': TYPES[rng.integers(0, len(TYPES))],
+        'amount': amount,
+        'oldbalanceOrg': old_balance,
+        'newbalanceOrig': max(old_balance - amount, 0.0),
+        'oldbalanceDest': float(round(rng.exponential(100000), 2)),
+        'newbalanceDest': float(round(rng.exponential(100000), 2)),
+    }
+
+def run_load(base_url, total_requests, concurrency):
+    rng = np.random.default_rng(0)
+    payloads = [make_transaction(rng) for _ in range(total_requests)]
+    local = threading.local()
+    
+    def send(payload):
+        if not hasattr(local, 'session'):
+            local.session = requests.Session()
+        start = time.perf_counter()
+        response = local.session.post(f'{base_url}/predict', json=payload)
+        response.raise_for_status()
+        return time.perf_counter() - start
+    
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        latencies = np.array(list(pool.map(send, payloads))) * 1000
+    elapsed = time.perf_counter() - start
+    return {
+        'throughput': total_requests / elapsed,
+        'p50_ms': np.percentile(latencies, 50),
+        'p99_ms': np.percentile(latencies, 99),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--max-batch-size', type=int, default=64)
+    parser.add_argument('--max-wait-ms', type=float, default=5)
+    args = parser.parse_args()
+    
+    modes = {
+        'per-request': {'PREDICT_MAX_BATCH_SIZE': '1'},
+        'micro-batched': {
+            'PREDICT_MAX_BATCH_SIZE': str(args.max_batch_size),
+            'PREDICT_MAX_WAIT_MS': str(args.max_wait_ms),
+        },
+    }
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for mode, env in modes.items():
+            with running_api(os.path.join(tmp, f'{mode}.db'), **env) as base_url:
+                run_load(base_url, min(200, args.requests), args.concurrency)  # warm-up
+                results[mode] = run_load(base_url, args.requests, args.concurrency)
+    
+    print(f"\n{args.requests} requests, {args.concurrency} concurrent clients")
+    print(f"{'mode':>14} {'req/s':>10} {'p50 (ms)':>10} {'p99 (ms)':>10}")
+    for mode, stats in results.items():
+        print(f"{mode:>14} {stats['throughput']:>10,.0f} {stats['p50_ms']:>10.2f} {stats['p99_ms']:>10.2f}")
+
+if __name__ == "__main__":
+    main()
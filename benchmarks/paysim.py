@@ -0,0 +1,110 @@
+"""Deterministic synthetic transactions in the PaySim schema.
+
+Rows have the columns of the Kaggle PaySim dump that train_model.py and the
+upload endpoints expect, in file order: step, type, amount, nameOrig,
+oldbalanceOrg, newbalanceOrig, nameDest, oldbalanceDest, newbalanceDest,
+isFraud, isFlaggedFraud. The shape follows the real dump closely enough for
+parsing, scoring and storage to behave the same:
+
+- type frequencies match PaySim (CASH_OUT and PAYMENT dominate)
+- fraud only occurs on TRANSFER and CASH_OUT and empties the origin account
+- merchants (``M...``) are the destination of payments and keep no balance
+- isFlaggedFraud marks fraudulent transfers above 200,000
+
+Output depends only on (rows, fraud_rate, seed, chunk_rows), so every run
+of a benchmark sees the same data. Large files are written chunk by chunk.
+
+Write a CSV from the repository root:
+    python benchmarks/paysim.py --rows 1000000 --out paysim_1m.csv
+"""
+import argparse
+import os
+from typing import Iterator
+
+import numpy as np
+import pandas as pd
+
+# PaySim transaction type frequencies
+TYPES = np.array(['CASH_OUT', 'PAYMENT', 'CASH_IN', 'TRANSFER', 'DEBIT'], dtype=object)
+TYPE_WEIGHTS = np.array([0.3517, 0.3381, 0.2199, 0.0838, 0.0065])
+FRAUD_TYPES = ('TRANSFER', 'CASH_OUT')
+FRAUD_RATE = 0.0013
+FLAGGED_AMOUNT = 200000
+STEPS = 743
+CHUNK_ROWS = 1_000_000
+
+def _names(rng, prefix, rows):
+    return np.char.add(prefix, rng.integers(10 ** 8, 10 ** 10, rows).astype(str)).astype(object)
+
+def generate_chunk(rows: int, fraud_rate: float = FRAUD_RATE, seed: int = 0,
+                   start: int = 0) -> pd.DataFrame:
+    """``rows`` transactions; ``start`` picks the chunk within a larger file"""
+    rng = np.random.default_rng([seed, start])
+    types = TYPES[rng.choice(len(TYPES), rows, p=TYPE_WEIGHTS)]
+
+    # Fraud: a random subset of rows, turned into transfers or cash-outs
+    is_fraud = rng.random(rows) < fraud_rate
+    n_fraud = int(is_fraud.sum())
+    types[is_fraud] = np.array(FRAUD_TYPES, dtype=object)[rng.integers(0, 2, n_fraud)]
+
+    amount = rng.lognormal(11, 1.4, rows).round(2)
+    old_balance = np.where(rng.random(rows) < 0.3, 0.0, rng.lognormal(10.5, 1.8, rows)).round(2)
+    is_credit = types == 'CASH_IN'
+    new_balance = np.where(is_credit, old_balance + amount, np.maximum(old_balance - amount, 0)).round(2)
+    # Fraud moves the whole balance out of the origin account
+    amount[is_fraud] = np.where(old_balance[is_fraud] > 0, old_balance[is_fraud], amount[is_fraud])
+    new_balance[is_fraud] = 0.0
+
+    is_merchant = types == 'PAYMENT'
+    old_dest = np.where(is_merchant, 0.0, rng.lognormal(11, 2, rows)).round(2)
+    new_dest = np.where(is_merchant | is_fraud, old_dest, old_dest + amount).round(2)
+    name_dest = np.where(is_merchant, _names(rng, 'M', rows), _names(rng, 'C', rows))
+
+    frame = pd.DataFrame({
+        'step': rng.integers(1, STEPS + 1, rows),
+        'type': types,
+        'amount': amount,
+        'nameOrig': _names(rng, 'C', rows),
+        'oldbalanceOrg': old_balance,
+        'newbalanceOrig': new_balance,
+        'nameDest': name_dest,
+        'oldbalanceDest': old_dest,
+        'newbalanceDest': new_dest,
+        'isFraud': is_fraud.astype(np.int64),
+        'isFlaggedFraud': (is_fraud & (types == 'TRANSFER') & (amount > FLAGGED_AMOUNT)).astype(np.int64),
+    })
+    frame.index += start
+    return frame
+
+def iter_chunks(rows: int, fraud_rate: float = FRAUD_RATE, seed: int = 0,
+                chunk_rows: int = CHUNK_ROWS) -> Iterator[pd.DataFrame]:
+    """The file as consecutive chunks of at most ``chunk_rows`` rows"""
+    for start in range(0, rows, chunk_rows):
+        yield generate_chunk(min(chunk_rows, rows - start), fraud_rate, seed, start)
+
+def generate(rows: int, fraud_rate: float = FRAUD_RATE, seed: int = 0,
+             chunk_rows: int = CHUNK_ROWS) -> pd.DataFrame:
+    """The whole file as one DataFrame"""
+    return pd.concat(list(iter_chunks(rows, fraud_rate, seed, chunk_rows)))
+
+def write_csv(path: str, rows: int, fraud_rate: float = FRAUD_RATE, seed: int = 0,
+              chunk_rows: int = CHUNK_ROWS) -> str:
+    """Write the file to ``path`` without holding more than one chunk in memory"""
+    with open(path, 'w', newline='') as f:
+        for i, chunk in enumerate(iter_chunks(rows, fraud_rate, seed, chunk_rows)):
+            chunk.to_csv(f, index=False, header=(i == 0))
+    return path
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--fraud-rate', type=float, default=FRAUD_RATE)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--out', default='paysim.csv')
+    args = parser.parse_args()
+
+    write_csv(args.out, args.rows, args.fraud_rate, args.seed)
+    print(f"Wrote {args.rows:,} rows to {args.out} ({os.path.getsize(args.out) / 1e6:.1f} MB)")
+
+if __name__ == "__main__":
+    main()
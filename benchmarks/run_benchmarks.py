@@ -0,0 +1,230 @@
+"""End-to-end stage timings on synthetic PaySim data, checked against a baseline.
+
+For each size a deterministic PaySim-shaped CSV (benchmarks/paysim.py) is
+written to a temporary directory and pushed through the serving stages one
+at a time, each timed on its own:
+
+- ``csv_parse``: ingestion.read_transactions with the API's upload columns
+- ``preprocess_data``: api.preprocess_data
+- ``model_predict``: the loaded model's predict on the preprocessed frame
+- ``detect_fraud``: the Flask rule engine
+- ``insert_fraudulent_transactions``: storing the model's hits in a fresh
+  database
+- ``fraud_stats`` / ``fraud_geo``: GET /api/fraud-stats and
+  /api/fraud-geo-data on the Flask app, against that database
+
+Each stage reports the best of ``--repeat`` runs. Results are written as
+JSON. Given ``--baseline``, a stage more than ``--tolerance`` slower than
+the stored timing (and slower by at least MIN_REGRESSION_SECONDS, so
+sub-millisecond noise is ignored) is reported as a regression and the
+script exits with status 1. ``--save-baseline`` stores this run as the new
+baseline. Timings are only comparable on the same machine.
+
+10M rows needs several GB of memory and is not run by default.
+
+Run from the repository root:
+    python benchmarks/run_benchmarks.py [--sizes 10k,1m,10m] \
+        [--output bench_results.json] [--baseline benchmarks/baseline.json]
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'Frontend'))
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+
+import numpy as np
+
+import api
+import database_setup as db
+import flask_app
+import paysim
+from ingestion import read_transactions
+
+SIZES = {'10k': 10_000, '100k': 100_000, '1m': 1_000_000, '10m': 10_000_000}
+DEFAULT_SIZES = '10k,1m'
+DEFAULT_BASELINE = os.path.join(ROOT, 'benchmarks', 'baseline.json')
+TOLERANCE = 0.25
+MIN_REGRESSION_SECONDS = 0.005
+
+def best_time(func, repeat, setup=None):
+    """Best wall time of ``func`` over ``repeat`` runs, and its last result"""
+    timings = []
+    result = None
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        gc.collect()
+        start = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+def fresh_database(directory):
+    """Point database_setup at an empty database in ``directory``"""
+    path = os.path.join(directory, 'bench.db')
+    db.close_connections()
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+    db.configure(path=path)
+    db.setup_database()
+
+def get_endpoint(client, url):
+    response = client.get(url)
+    assert response.status_code == 200, f"{url}: {response.status_code} {response.get_data()[:200]}"
+    return response.get_data()
+
+def run_size(label, rows, args, directory):
+    """Time every stage on ``rows`` rows; returns the JSON entry for this size"""
+    csv_path = paysim.write_csv(os.path.join(directory, f'paysim_{label}.csv'), rows,
+                                args.fraud_rate, args.seed)
+    timings = {}
+
+    def parse():
+        with open(csv_path, 'rb') as source:
+            return read_transactions(source, 'paysim.csv', api.upload_columns())
+    timings['csv_parse'], df = best_time(parse, args.repeat)
+
+    timings['preprocess_data'], X = best_time(lambda: api.preprocess_data(df), args.repeat)
+    timings['model_predict'], predictions = best_time(lambda: api.models.current.model.predict(X), args.repeat)
+    timings['detect_fraud'], rule_hits = best_time(lambda: flask_app.detect_fraud(df), args.repeat)
+
+    fraudulent_data = df[np.asarray(predictions) == 1].copy()
+    fraudulent_data['isFraudPrediction'] = 1
+    # predict gives labels only; hits are stored as certain
+    fraudulent_data['prediction_confidence'] = 100.0
+    transactions = {
+        'total_transactions': rows,
+        'fraudulent_data': fraudulent_data.to_dict(orient='records'),
+    }
+    timings['insert_fraudulent_transactions'], _ = best_time(
+        lambda: db.insert_fraudulent_transactions(transactions, 'paysim.csv'),
+        args.repeat, setup=lambda: fresh_database(directory)
+    )
+
+    client = flask_app.app.test_client()
+    timings['fraud_stats'], _ = best_time(lambda: get_endpoint(client, '/api/fraud-stats'), args.repeat)
+    timings['fraud_geo'], _ = best_time(lambda: get_endpoint(client, '/api/fraud-geo-data'), args.repeat)
+
+    os.remove(csv_path)
+    return {
+        'rows': rows,
+        'model_fraud_rows': len(fraudulent_data),
+        'rule_fraud_rows': len(rule_hits),
+        'stages': {
+            stage: {'seconds': round(seconds, 6), 'rows_per_second': round(rows / seconds, 1)}
+            for stage, seconds in timings.items()
+        },
+    }
+
+def compare(results, baseline, tolerance):
+    """Rows of (size, stage, baseline s, current s, ratio, regressed)"""
+    rows = []
+    for label, entry in results['results'].items():
+        base_entry = baseline.get('results', {}).get(label)
+        if not base_entry or base_entry['rows'] != entry['rows']:
+            continue
+        for stage, timing in entry['stages'].items():
+            base = base_entry['stages'].get(stage)
+            if base is None:
+                continue
+            ratio = timing['seconds'] / base['seconds'] if base['seconds'] else float('inf')
+            regressed = (ratio > 1 + tolerance
+                         and timing['seconds'] - base['seconds'] > MIN_REGRESSION_SECONDS)
+            rows.append((label, stage, base['seconds'], timing['seconds'], ratio, regressed))
+    return rows
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', default=DEFAULT_SIZES,
+                        help=f"comma-separated sizes out of {', '.join(SIZES)}")
+    parser.add_argument('--fraud-rate', type=float, default=paysim.FRAUD_RATE)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--output', default='bench_results.json')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--tolerance', type=float, default=TOLERANCE)
+    parser.add_argument('--save-baseline', action='store_true',
+                        help="store this run as the baseline instead of comparing")
+    args = parser.parse_args()
+
+    labels = [label.strip().lower() for label in args.sizes.split(',') if label.strip()]
+    unknown = [label for label in labels if label not in SIZES]
+    if unknown:
+        parser.error(f"unknown sizes {unknown}; choose from {', '.join(SIZES)}")
+    if api.load_serving_model() is None:
+        sys.exit("Model not loaded; run from the repository root")
+
+    results = {
+        'meta': {
+            'timestamp': datetime.now().isoformat(),
+            'commit': git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'seed': args.seed,
+            'fraud_rate': args.fraud_rate,
+            'repeat': args.repeat,
+        },
+        'results': {},
+    }
+    with tempfile.TemporaryDirectory() as directory:
+        fresh_database(directory)
+        try:
+            for label in labels:
+                print(f"Running {label} ({SIZES[label]:,} rows)...", flush=True)
+                results['results'][label] = run_size(label, SIZES[label], args, directory)
+        finally:
+            db.close_connections()
+
+    print(f"{'size':>5} {'stage':>31} {'seconds':>9} {'rows/s':>12}")
+    for label, entry in results['results'].items():
+        for stage, timing in entry['stages'].items():
+            print(f"{label:>5} {stage:>31} {timing['seconds']:>9.4f} {timing['rows_per_second']:>12,.0f}")
+
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {args.output}")
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --save-baseline to create one")
+        return
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    comparison = compare(results, baseline, args.tolerance)
+    print(f"\nAgainst baseline {baseline['meta'].get('commit')} (tolerance {args.tolerance:.0%})")
+    print(f"{'size':>5} {'stage':>31} {'baseline':>9} {'current':>9} {'ratio':>6}")
+    for label, stage, base, current, ratio, regressed in comparison:
+        flag = '  REGRESSION' if regressed else ''
+        print(f"{label:>5} {stage:>31} {base:>9.4f} {current:>9.4f} {ratio:>5.2f}x{flag}")
+    regressions = [row for row in comparison if row[-1]]
+    if regressions:
+        print(f"{len(regressions)} stage(s) regressed")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
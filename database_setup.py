@@ -1,16 +1,265 @@
+import base64
+import json
+import os
+import queue
 import sqlite3
+import threading
+import time
+import traceback
+import uuid
+import numpy as np
 import pandas as pd
-from datetime import datetime
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+from itertools import repeat
+
+import geo
+import metrics
+
+# Database location and how long a connection waits on a locked database
+# before giving up. Both can be overridden with configure().
+DATABASE_PATH = os.environ.get('FRAUD_DB_PATH', 'fraud_detection.db')
+BUSY_TIMEOUT_SECONDS = float(os.environ.get('FRAUD_DB_BUSY_TIMEOUT', '30'))
+
+# Fraudulent transactions are stored in one table per day of detected_at
+# (fraudulent_transactions_YYYYMMDD). Days older than RETENTION_DAYS are
+# written to ARCHIVE_DIR as Parquet and their table is dropped; 0 keeps
+# every day live. Both can be overridden with configure().
+RETENTION_DAYS = int(os.environ.get('FRAUD_RETENTION_DAYS', '90'))
+ARCHIVE_DIR = os.environ.get('FRAUD_ARCHIVE_DIR', 'fraud_archive')
+# Retention runs on its own thread (start_retention), never inside an
+# insert: every RETENTION_INTERVAL_SECONDS, and as soon as an insert opens
+# a new day's partition
+RETENTION_INTERVAL_SECONDS = float(os.environ.get('FRAUD_RETENTION_INTERVAL', '3600'))
+PARTITION_PREFIX = 'fraudulent_transactions_'
+PARTITION_GLOB = PARTITION_PREFIX + '[0-9]' * 8
+# SQLite allows at most 500 SELECTs in one compound query, which bounds the
+# days the fraudulent_transactions compatibility view can cover
+VIEW_MAX_PARTITIONS = 500
+# Rows read from a partition per Parquet row group while archiving it
+ARCHIVE_CHUNK_ROWS = 100_000
+
+# Column types of the Parquet archives, by table
+ARCHIVE_COLUMNS = {
+    'fraudulent_transactions': {
+        'id': 'int64', 'step': 'int64', 'type': 'string', 'amount': 'float64',
+        'oldbalanceOrg': 'float64', 'newbalanceOrig': 'float64',
+        'oldbalanceDest': 'float64', 'newbalanceDest': 'float64',
+        'isFlaggedFraud': 'int64', 'prediction_confidence': 'float64',
+        'detected_at': 'string', 'processed': 'int64', 'city': 'int64',
+    },
+    'processing_logs': {
+        'id': 'int64', 'filename': 'string', 'total_transactions': 'int64',
+        'fraudulent_count': 'int64', 'processed_at': 'string', 'model_version': 'string',
+    },
+}
+
+# Columns stored for each fraudulent transaction, with the value used when
+# a record does not carry that field
+TRANSACTION_COLUMNS = {
+    'step': 0,
+    'type': '',
+    'amount': 0,
+    'oldbalanceOrg': 0,
+    'newbalanceOrig': 0,
+    'oldbalanceDest': 0,
+    'newbalanceDest': 0,
+    'isFlaggedFraud': 0,
+    'prediction_confidence': None,
+}
+
+# Connection pragmas tuned for bulk ingestion: WAL lets readers run alongside
+# the writer, NORMAL sync is durable in WAL mode without an fsync per commit,
+# and a negative cache_size is in KiB (64 MiB page cache).
+CONNECTION_PRAGMAS = [
+    'PRAGMA journal_mode=WAL',
+    'PRAGMA synchronous=NORMAL',
+    'PRAGMA cache_size=-65536',
+    'PRAGMA temp_store=MEMORY',
+]
+
+# Connections are pooled and reused across calls instead of reconnecting for
+# every statement. At most POOL_SIZE idle connections are kept; bumping the
+# generation makes the pool drop connections opened under old settings.
+POOL_SIZE = int(os.environ.get('FRAUD_DB_POOL_SIZE', '8'))
+_pool = queue.LifoQueue()
+_generation = 0
+
+def configure(path=None, busy_timeout=None, pool_size=None, retention_days=None, archive_dir=None):
+    """Point the connection pool at another database, busy timeout or size,
+    and set the fraud history retention and archive directory.
+
+    Idle connections are closed right away; connections in use are closed
+    when they are returned to the pool.
+    """
+    global DATABASE_PATH, BUSY_TIMEOUT_SECONDS, POOL_SIZE, RETENTION_DAYS, ARCHIVE_DIR, _generation
+    if path is not None:
+        DATABASE_PATH = path
+    if busy_timeout is not None:
+        BUSY_TIMEOUT_SECONDS = float(busy_timeout)
+    if pool_size is not None:
+        POOL_SIZE = int(pool_size)
+    if retention_days is not None:
+        RETENTION_DAYS = int(retention_days)
+    if archive_dir is not None:
+        ARCHIVE_DIR = archive_dir
+    _generation += 1
+    close_connections()
+
+class _PooledConnection(sqlite3.Connection):
+    """sqlite3 connection that remembers the pool generation it belongs to"""
+    generation = 0
+
+def _open_connection():
+    """Open a new connection with the busy timeout and pragmas applied"""
+    # Pooled connections move between threads, but only one holds each at a time
+    conn = sqlite3.connect(
+        DATABASE_PATH, timeout=BUSY_TIMEOUT_SECONDS,
+        check_same_thread=False, factory=_PooledConnection
+    )
+    for pragma in CONNECTION_PRAGMAS:
+        conn.execute(pragma)
+    conn.generation = _generation
+    return conn
+
+@contextmanager
+def connection():
+    """Borrow a connection from the pool for the duration of the block"""
+    try:
+        conn = _pool.get_nowait()
+    except queue.Empty:
+        conn = _open_connection()
+    try:
+        yield conn
+    finally:
+        if conn.in_transaction:
+            conn.rollback()
+        if conn.generation == _generation and _pool.qsize() < POOL_SIZE:
+            _pool.put(conn)
+        else:
+            conn.close()
+
+def close_connections():
+    """Close every idle pooled connection"""
+    while True:
+        try:
+            _pool.get_nowait().close()
+        except queue.Empty:
+            return
+
+@contextmanager
+def transaction():
+    """Yield a cursor on a pooled connection and commit on success"""
+    with connection() as conn:
+        cursor = conn.cursor()
+        try:
+            yield cursor
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cursor.close()
+
+# Bumped whenever the tables or indexes change; stored in the database's
+# user_version, so setup only runs its DDL on databases that are behind
+SCHEMA_VERSION = 4
+
+def schema_version():
+    """The schema version recorded in the database (0 before any setup)"""
+    with connection() as conn:
+        return conn.execute('PRAGMA user_version').fetchone()[0]
+
+def schema_ready():
+    """Whether the database has been set up for this version of the code"""
+    return schema_version() >= SCHEMA_VERSION
 
 def setup_database():
-    """Setup SQLite database with tables for fraudulent transactions"""
-    conn = sqlite3.connect('fraud_detection.db')
-    cursor = conn.cursor()
-    
-    # Create table for fraudulent transactions
+    """Setup SQLite database with tables for fraudulent transactions
+
+    The tables are created or migrated once per database: a database
+    already at SCHEMA_VERSION costs one PRAGMA read. Retention is not run
+    here; servers start it on its own thread with start_retention().
+    """
+    if not schema_ready():
+        with transaction() as cursor:
+            # One write transaction, so processes starting together do not
+            # migrate the same tables twice
+            cursor.execute('BEGIN IMMEDIATE')
+            if cursor.execute('PRAGMA user_version').fetchone()[0] < SCHEMA_VERSION:
+                _create_tables(cursor)
+                _partition_legacy_table(cursor)
+                _create_indexes(cursor)
+                _refresh_transactions_view(cursor)
+                _create_statistics_tables(cursor)
+                _create_result_cache_table(cursor)
+                _create_jobs_table(cursor)
+                cursor.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+        print("Database setup completed successfully!")
+
+def _create_tables(cursor):
+    """Create the tables if they do not exist yet"""
+    # Create table for processing logs
     cursor.execute('''
-    CREATE TABLE IF NOT EXISTS fraudulent_transactions (
+    CREATE TABLE IF NOT EXISTS processing_logs (
         id INTEGER PRIMARY KEY AUTOINCREMENT,
+        filename TEXT,
+        total_transactions INTEGER,
+        fraudulent_count INTEGER,
+        processed_at TIMESTAMP,
+        model_version TEXT
+    )
+    ''')
+    
+    # Logs created before model versioning get the column added
+    log_columns = {row[1] for row in cursor.execute('PRAGMA table_info(processing_logs)')}
+    if 'model_version' not in log_columns:
+        cursor.execute('ALTER TABLE processing_logs ADD COLUMN model_version TEXT')
+    
+    # Transaction ids stay unique across the daily partitions
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS id_sequences (
+        name TEXT PRIMARY KEY,
+        last_id INTEGER NOT NULL
+    )
+    ''')
+    cursor.execute('''
+    INSERT OR IGNORE INTO id_sequences (name, last_id) VALUES ('fraudulent_transactions', 0)
+    ''')
+
+def _create_indexes(cursor):
+    """Add the indexes used by the dashboard reads (safe to re-run)"""
+    cursor.execute('''
+    CREATE INDEX IF NOT EXISTS idx_processing_logs_processed_at
+    ON processing_logs (processed_at)
+    ''')
+
+def partition_name(day):
+    """Table holding the fraudulent transactions detected on ``day``"""
+    return f"{PARTITION_PREFIX}{day.strftime('%Y%m%d')}"
+
+def _table_exists(cursor, name):
+    return cursor.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (name,)
+    ).fetchone() is not None
+
+def _partitions(cursor):
+    """(day, table) for every live fraudulent transaction partition, oldest first"""
+    names = cursor.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'table' AND name GLOB ?", (PARTITION_GLOB,)
+    ).fetchall()
+    return sorted(
+        (datetime.strptime(name[-8:], '%Y%m%d').date(), name) for name, in names
+    )
+
+def _ensure_partition(cursor, day):
+    """Create the partition for ``day`` if needed; returns (table, created)"""
+    table = partition_name(day)
+    if _table_exists(cursor, table):
+        return table, False
+    cursor.execute(f'''
+    CREATE TABLE {table} (
+        id INTEGER PRIMARY KEY,
         step INTEGER,
         type TEXT,
         amount REAL,
@@ -21,91 +270,962 @@ def setup_database():
         isFlaggedFraud INTEGER,
         prediction_confidence REAL,
         detected_at TIMESTAMP,
-        processed BOOLEAN DEFAULT FALSE
+        processed BOOLEAN DEFAULT FALSE,
+        city INTEGER
     )
     ''')
+    # detected_at also carries the rowid, so it serves the
+    # ORDER BY detected_at DESC, id DESC keyset scans directly
+    cursor.execute(f'CREATE INDEX idx_{table}_detected_at ON {table} (detected_at)')
+    # Serves the per-city drill-down pages, newest first
+    cursor.execute(f'CREATE INDEX idx_{table}_city ON {table} (city, detected_at)')
+    return table, True
+
+def _refresh_transactions_view(cursor):
+    """(Re)create fraudulent_transactions as a view over the live partitions.
+
+    Keeps ad hoc SQL against the old single table working. It covers the
+    newest VIEW_MAX_PARTITIONS days; the read helpers query the partitions
+    directly instead.
+    """
+    tables = [table for _, table in _partitions(cursor)][-VIEW_MAX_PARTITIONS:]
+    if tables:
+        body = ' UNION ALL '.join(f'SELECT * FROM {table}' for table in tables)
+    else:
+        columns = ', '.join(f'NULL AS {column}' for column in ARCHIVE_COLUMNS['fraudulent_transactions'])
+        body = f'SELECT {columns} WHERE 0'
+    cursor.execute('DROP VIEW IF EXISTS fraudulent_transactions')
+    cursor.execute(f'CREATE VIEW fraudulent_transactions AS {body}')
+
+def _partition_legacy_table(cursor):
+    """Move rows from the old single fraudulent_transactions table into
+    daily partitions, then drop it"""
+    if not _table_exists(cursor, 'fraudulent_transactions'):
+        return
+    # Rows stored before cities were assigned at insert get them now
+    columns = {row[1] for row in cursor.execute('PRAGMA table_info(fraudulent_transactions)')}
+    city = f'COALESCE(city, {geo.CITY_SQL})' if 'city' in columns else geo.CITY_SQL
+    names = [column for column in ARCHIVE_COLUMNS['fraudulent_transactions'] if column != 'city']
     
-    # Create table for processing logs
+    days = cursor.execute(
+        'SELECT DISTINCT substr(detected_at, 1, 10) FROM fraudulent_transactions'
+    ).fetchall()
+    for day, in days:
+        try:
+            partition_day = date.fromisoformat(day)
+        except (TypeError, ValueError):
+            # Rows without a usable timestamp are kept in today's partition
+            partition_day = date.today()
+        table, _ = _ensure_partition(cursor, partition_day)
+        cursor.execute(f'''
+        INSERT INTO {table} ({', '.join(names)}, city)
+        SELECT {', '.join(names)}, {city} FROM fraudulent_transactions
+        WHERE substr(detected_at, 1, 10) IS ?
+        ''', (day,))
+    
+    # New ids continue after the old AUTOINCREMENT sequence
+    last_id = max(
+        cursor.execute("SELECT COALESCE(MAX(seq), 0) FROM sqlite_sequence WHERE name = 'fraudulent_transactions'").fetchone()[0],
+        cursor.execute('SELECT COALESCE(MAX(id), 0) FROM fraudulent_transactions').fetchone()[0],
+    )
     cursor.execute('''
-    CREATE TABLE IF NOT EXISTS processing_logs (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        filename TEXT,
-        total_transactions INTEGER,
-        fraudulent_count INTEGER,
-        processed_at TIMESTAMP
+    UPDATE id_sequences SET last_id = MAX(last_id, ?) WHERE name = 'fraudulent_transactions'
+    ''', (last_id,))
+    cursor.execute('DROP TABLE fraudulent_transactions')
+
+# Amount buckets for the fraud statistics: a transaction falls in the first
+# bucket whose upper bound it is below, or in the last one
+AMOUNT_RANGES = ['0-1K', '1K-10K', '10K-50K', '50K-100K', '100K+']
+AMOUNT_RANGE_BOUNDS = [1000, 10000, 50000, 100000]
+
+def amount_range_buckets(amounts):
+    """Vectorized bucket index into AMOUNT_RANGES for each amount.
+
+    Missing amounts land in the last bucket, as they fail every bound check.
+    """
+    amounts = np.asarray(amounts, dtype=float)
+    return np.searchsorted(AMOUNT_RANGE_BOUNDS, amounts, side='right')
+
+def _create_statistics_tables(cursor):
+    """Create the fraud rollup tables and backfill them from existing rows"""
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS fraud_stats_by_step (
+        step INTEGER PRIMARY KEY,
+        fraud_count INTEGER NOT NULL,
+        total_amount REAL NOT NULL
+    )
+    ''')
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS fraud_stats_by_type (
+        type TEXT PRIMARY KEY,
+        fraud_count INTEGER NOT NULL,
+        total_amount REAL NOT NULL
+    )
+    ''')
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS fraud_stats_by_amount_range (
+        bucket INTEGER PRIMARY KEY,
+        amount_range TEXT NOT NULL,
+        fraud_count INTEGER NOT NULL,
+        confidence_sum REAL NOT NULL,
+        confidence_count INTEGER NOT NULL
+    )
+    ''')
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS fraud_stats_by_city (
+        city INTEGER PRIMARY KEY,
+        fraud_count INTEGER NOT NULL,
+        total_amount REAL NOT NULL,
+        confidence_sum REAL NOT NULL,
+        confidence_count INTEGER NOT NULL
+    )
+    ''')
+    # One row covering every transaction, whatever columns it is missing
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS fraud_stats_total (
+        id INTEGER PRIMARY KEY CHECK (id = 0),
+        fraud_count INTEGER NOT NULL,
+        total_amount REAL NOT NULL
     )
     ''')
     
-    conn.commit()
-    conn.close()
-    print("Database setup completed successfully!")
+    # Databases created before the rollups existed get them built once
+    rollups_empty = cursor.execute('SELECT COUNT(*) FROM fraud_stats_by_type').fetchone()[0] == 0
+    has_transactions = cursor.execute('SELECT 1 FROM fraudulent_transactions LIMIT 1').fetchone()
+    if rollups_empty and has_transactions:
+        rebuild_fraud_statistics(cursor)
+    elif has_transactions:
+        if not cursor.execute('SELECT 1 FROM fraud_stats_by_city LIMIT 1').fetchone():
+            _rebuild_city_statistics(cursor)
+        if not cursor.execute('SELECT 1 FROM fraud_stats_total').fetchone():
+            _rebuild_total_statistics(cursor)
 
-def insert_fraudulent_transactions(transactions, filename):
-    """Insert fraudulent transactions into database"""
-    conn = sqlite3.connect('fraud_detection.db')
-    cursor = conn.cursor()
+def rebuild_fraud_statistics(cursor):
+    """Recompute every rollup table from fraudulent_transactions"""
+    cursor.execute('DELETE FROM fraud_stats_by_step')
+    cursor.execute('DELETE FROM fraud_stats_by_type')
+    cursor.execute('DELETE FROM fraud_stats_by_amount_range')
     
-    # Log the processing
     cursor.execute('''
-    INSERT INTO processing_logs (filename, total_transactions, fraudulent_count, processed_at)
-    VALUES (?, ?, ?, ?)
-    ''', (filename, transactions['total_transactions'], len(transactions['fraudulent_data']), datetime.now()))
+    INSERT INTO fraud_stats_by_step (step, fraud_count, total_amount)
+    SELECT step, COUNT(*), TOTAL(amount) FROM fraudulent_transactions
+    WHERE step IS NOT NULL GROUP BY step
+    ''')
+    cursor.execute('''
+    INSERT INTO fraud_stats_by_type (type, fraud_count, total_amount)
+    SELECT type, COUNT(*), TOTAL(amount) FROM fraudulent_transactions
+    WHERE type IS NOT NULL GROUP BY type
+    ''')
+    
+    bucket_case = 'CASE ' + ' '.join(
+        f'WHEN amount < {bound} THEN {bucket}' for bucket, bound in enumerate(AMOUNT_RANGE_BOUNDS)
+    ) + f' ELSE {len(AMOUNT_RANGE_BOUNDS)} END'
+    rows = cursor.execute(f'''
+    SELECT {bucket_case} AS bucket, COUNT(*), TOTAL(prediction_confidence), COUNT(prediction_confidence)
+    FROM fraudulent_transactions GROUP BY bucket
+    ''').fetchall()
+    cursor.executemany('''
+    INSERT INTO fraud_stats_by_amount_range (bucket, amount_range, fraud_count, confidence_sum, confidence_count)
+    VALUES (?, ?, ?, ?, ?)
+    ''', [(bucket, AMOUNT_RANGES[bucket], count, total, n) for bucket, count, total, n in rows])
+    _rebuild_city_statistics(cursor)
+    _rebuild_total_statistics(cursor)
+
+def _rebuild_city_statistics(cursor):
+    cursor.execute('DELETE FROM fraud_stats_by_city')
+    cursor.execute('''
+    INSERT INTO fraud_stats_by_city (city, fraud_count, total_amount, confidence_sum, confidence_count)
+    SELECT city, COUNT(*), TOTAL(amount), TOTAL(prediction_confidence), COUNT(prediction_confidence)
+    FROM fraudulent_transactions WHERE city IS NOT NULL GROUP BY city
+    ''')
+
+def _rebuild_total_statistics(cursor):
+    cursor.execute('DELETE FROM fraud_stats_total')
+    cursor.execute('''
+    INSERT INTO fraud_stats_total (id, fraud_count, total_amount)
+    SELECT 0, COUNT(*), TOTAL(amount) FROM fraudulent_transactions
+    ''')
+
+def _update_fraud_statistics(cursor, columns, cities):
+    """Fold one inserted batch into the rollup tables.
+
+    Runs on the insert's cursor, so the rollups commit or roll back together
+    with the rows they summarise.
+    """
+    # float arrays turn missing values (None) into NaN
+    batch = pd.DataFrame({
+        'step': np.asarray(columns['step'], dtype=float),
+        'type': columns['type'],
+        'amount': np.asarray(columns['amount'], dtype=float),
+        'confidence': np.asarray(columns['prediction_confidence'], dtype=float),
+        'city': cities,
+    })
+    batch['bucket'] = amount_range_buckets(batch['amount'])
+    
+    by_step = batch.groupby('step')['amount'].agg(['size', 'sum'])
+    cursor.executemany('''
+    INSERT INTO fraud_stats_by_step (step, fraud_count, total_amount) VALUES (?, ?, ?)
+    ON CONFLICT(step) DO UPDATE SET
+        fraud_count = fraud_count + excluded.fraud_count,
+        total_amount = total_amount + excluded.total_amount
+    ''', zip(by_step.index.astype('int64').tolist(), by_step['size'].tolist(), by_step['sum'].tolist()))
     
-    # Insert each fraudulent transaction
-    for transaction in transactions['fraudulent_data']:
+    by_type = batch.groupby('type')['amount'].agg(['size', 'sum'])
+    cursor.executemany('''
+    INSERT INTO fraud_stats_by_type (type, fraud_count, total_amount) VALUES (?, ?, ?)
+    ON CONFLICT(type) DO UPDATE SET
+        fraud_count = fraud_count + excluded.fraud_count,
+        total_amount = total_amount + excluded.total_amount
+    ''', zip(by_type.index.tolist(), by_type['size'].tolist(), by_type['sum'].tolist()))
+    
+    by_bucket = batch.groupby('bucket')['confidence'].agg(['size', 'sum', 'count'])
+    cursor.executemany('''
+    INSERT INTO fraud_stats_by_amount_range (bucket, amount_range, fraud_count, confidence_sum, confidence_count)
+    VALUES (?, ?, ?, ?, ?)
+    ON CONFLICT(bucket) DO UPDATE SET
+        fraud_count = fraud_count + excluded.fraud_count,
+        confidence_sum = confidence_sum + excluded.confidence_sum,
+        confidence_count = confidence_count + excluded.confidence_count
+    ''', [
+        (bucket, AMOUNT_RANGES[bucket], size, total, count)
+        for bucket, size, total, count in zip(
+            by_bucket.index.tolist(), by_bucket['size'].tolist(),
+            by_bucket['sum'].tolist(), by_bucket['count'].tolist()
+        )
+    ])
+    
+    by_city = batch.groupby('city').agg(
+        size=('amount', 'size'), amount=('amount', 'sum'),
+        confidence=('confidence', 'sum'), confidence_count=('confidence', 'count'),
+    )
+    cursor.executemany('''
+    INSERT INTO fraud_stats_by_city (city, fraud_count, total_amount, confidence_sum, confidence_count)
+    VALUES (?, ?, ?, ?, ?)
+    ON CONFLICT(city) DO UPDATE SET
+        fraud_count = fraud_count + excluded.fraud_count,
+        total_amount = total_amount + excluded.total_amount,
+        confidence_sum = confidence_sum + excluded.confidence_sum,
+        confidence_count = confidence_count + excluded.confidence_count
+    ''', zip(by_city.index.tolist(), by_city['size'].tolist(), by_city['amount'].tolist(),
+           by_city['confidence'].tolist(), by_city['confidence_count'].tolist()))
+    
+    cursor.execute('''
+    INSERT INTO fraud_stats_total (id, fraud_count, total_amount) VALUES (0, ?, ?)
+    ON CONFLICT(id) DO UPDATE SET
+        fraud_count = fraud_count + excluded.fraud_count,
+        total_amount = total_amount + excluded.total_amount
+    ''', (len(batch), float(batch['amount'].sum())))
+
+def _create_result_cache_table(cursor):
+    """Create the upload result cache (see result_cache.py)"""
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS result_cache (
+        cache_key TEXT PRIMARY KEY,
+        payload BLOB NOT NULL,
+        size_bytes INTEGER NOT NULL,
+        created_at TIMESTAMP,
+        last_used_at REAL NOT NULL,
+        hits INTEGER NOT NULL DEFAULT 0
+    )
+    ''')
+    cursor.execute('''
+    CREATE INDEX IF NOT EXISTS idx_result_cache_last_used_at
+    ON result_cache (last_used_at)
+    ''')
+    # Uploads whose fraud rows are stored, by content hash, so scoring the
+    # same file again under another cache key does not store them twice
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS stored_uploads (
+        content_hash TEXT PRIMARY KEY,
+        stored_at TIMESTAMP
+    )
+    ''')
+
+def claim_upload(content_hash):
+    """Claim storing an upload's fraud rows; False if they are already stored"""
+    with transaction() as cursor:
         cursor.execute('''
-        INSERT INTO fraudulent_transactions 
-        (step, type, amount, oldbalanceOrg, newbalanceOrig, oldbalanceDest, newbalanceDest, isFlaggedFraud, detected_at)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (
-            transaction.get('step', 0),
-            transaction.get('type', ''),
-            transaction.get('amount', 0),
-            transaction.get('oldbalanceOrg', 0),
-            transaction.get('newbalanceOrig', 0),
-            transaction.get('oldbalanceDest', 0),
-            transaction.get('newbalanceDest', 0),
-            transaction.get('isFlaggedFraud', 0),
-            datetime.now()
-        ))
-    
-    conn.commit()
-    conn.close()
+        INSERT OR IGNORE INTO stored_uploads (content_hash, stored_at) VALUES (?, ?)
+        ''', (content_hash, datetime.now().isoformat(" ")))
+        return cursor.rowcount == 1
+
+def release_upload(content_hash):
+    """Drop a claim whose upload failed before its rows were stored"""
+    with transaction() as cursor:
+        cursor.execute('DELETE FROM stored_uploads WHERE content_hash = ?', (content_hash,))
     return True
 
-def get_fraudulent_transactions(limit=100):
-    """Retrieve fraudulent transactions from database"""
-    conn = sqlite3.connect('fraud_detection.db')
-    cursor = conn.cursor()
+@metrics.timed('db.fetch_cached_result')
+def fetch_cached_result(cache_key):
+    """Return a cached result payload and mark it as just used, or None"""
+    with transaction() as cursor:
+        cursor.execute('SELECT payload FROM result_cache WHERE cache_key = ?', (cache_key,))
+        row = cursor.fetchone()
+        if row is None:
+            return None
+        cursor.execute('''
+        UPDATE result_cache SET last_used_at = ?, hits = hits + 1 WHERE cache_key = ?
+        ''', (time.time(), cache_key))
+    return row[0]
+
+@metrics.timed('db.store_cached_result')
+def store_cached_result(cache_key, payload, max_bytes):
+    """Cache a result payload, then evict least recently used entries so the
+    cache holds at most ``max_bytes`` of payloads"""
+    with transaction() as cursor:
+        cursor.execute('''
+        INSERT OR REPLACE INTO result_cache (cache_key, payload, size_bytes, created_at, last_used_at)
+        VALUES (?, ?, ?, ?, ?)
+        ''', (cache_key, payload, len(payload), datetime.now().isoformat(" "), time.time()))
+        # Keep the most recently used entries whose running total fits
+        cursor.execute('''
+        DELETE FROM result_cache WHERE cache_key IN (
+            SELECT cache_key FROM (
+                SELECT cache_key,
+                       SUM(size_bytes) OVER (ORDER BY last_used_at DESC, cache_key) AS running_bytes
+                FROM result_cache
+            ) WHERE running_bytes > ?
+        )
+        ''', (max_bytes,))
+    return True
+
+def _create_jobs_table(cursor):
+    """Create the background scoring job table (see jobs.py)"""
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS jobs (
+        id TEXT PRIMARY KEY,
+        kind TEXT NOT NULL,
+        filename TEXT,
+        status TEXT NOT NULL,
+        options TEXT,
+        rows_done INTEGER NOT NULL DEFAULT 0,
+        fraudulent_count INTEGER NOT NULL DEFAULT 0,
+        result TEXT,
+        error TEXT,
+        created_at TIMESTAMP,
+        started_at TIMESTAMP,
+        updated_at TIMESTAMP,
+        finished_at TIMESTAMP,
+        owner TEXT,
+        heartbeat TIMESTAMP
+    )
+    ''')
     
+    # Jobs created before runners claimed them get the ownership columns added
+    job_columns = {row[1] for row in cursor.execute('PRAGMA table_info(jobs)')}
+    for column, column_type in (('owner', 'TEXT'), ('heartbeat', 'TIMESTAMP')):
+        if column not in job_columns:
+            cursor.execute(f'ALTER TABLE jobs ADD COLUMN {column} {column_type}')
     cursor.execute('''
-    SELECT * FROM fraudulent_transactions 
-    ORDER BY detected_at DESC 
-    LIMIT ?
-    ''', (limit,))
+    CREATE INDEX IF NOT EXISTS idx_jobs_kind_status ON jobs (kind, status)
+    ''')
+
+def _now():
+    return datetime.now().isoformat(" ")
+
+def create_job(job_id, kind, filename, options=None, status='queued', result=None, owner=None):
+    """Record a new job; ``options`` and ``result`` are stored as JSON
+
+    A queued job belongs to ``owner``, the runner that will claim it, until
+    that runner's heartbeat goes stale.
+    """
+    now = _now()
+    finished_at = now if status in ('done', 'failed') else None
+    with transaction() as cursor:
+        cursor.execute('''
+        INSERT INTO jobs (id, kind, filename, status, options, result, created_at, updated_at,
+                          finished_at, owner, heartbeat)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (job_id, kind, filename, status, json.dumps(options or {}),
+              None if result is None else json.dumps(result), now, now, finished_at, owner, now))
+    return True
+
+def claim_job(job_id, owner):
+    """Atomically move a queued job to running under ``owner``
+
+    Returns False when the job is no longer queued, e.g. because a runner
+    in another worker process claimed it first.
+    """
+    now = _now()
+    with transaction() as cursor:
+        cursor.execute('''
+        UPDATE jobs SET status = 'running', owner = ?, heartbeat = ?, started_at = ?, updated_at = ?
+        WHERE id = ? AND status = 'queued'
+        ''', (owner, now, now, now, job_id))
+        return cursor.rowcount == 1
+
+def update_job_progress(job_id, rows_done, fraudulent_count, owner=None):
+    """Record how far a running job has got
+
+    With ``owner`` the row is only updated while that runner still owns the
+    running job; returns whether it was.
+    """
+    now = _now()
+    with transaction() as cursor:
+        cursor.execute('''
+        UPDATE jobs SET rows_done = ?, fraudulent_count = ?, updated_at = ?, heartbeat = ?
+        WHERE id = ? AND (? IS NULL OR (owner = ? AND status = 'running'))
+        ''', (rows_done, fraudulent_count, now, now, job_id, owner, owner))
+        return cursor.rowcount == 1
+
+def finish_job(job_id, status, result=None, error=None, owner=None):
+    """Mark a job done or failed, with its result summary or error
+
+    With ``owner`` the job is only finished while that runner still owns
+    it; returns whether it was.
+    """
+    now = _now()
+    with transaction() as cursor:
+        cursor.execute('''
+        UPDATE jobs SET status = ?, result = ?, error = ?, updated_at = ?, finished_at = ?
+        WHERE id = ? AND (? IS NULL OR (owner = ? AND status = 'running'))
+        ''', (status, None if result is None else json.dumps(result), error, now, now,
+              job_id, owner, owner))
+        return cursor.rowcount == 1
+
+def touch_jobs(owner):
+    """Refresh the heartbeat of every queued or running job ``owner`` holds"""
+    with transaction() as cursor:
+        cursor.execute('''
+        UPDATE jobs SET heartbeat = ? WHERE owner = ? AND status IN ('queued', 'running')
+        ''', (_now(), owner))
+    return True
+
+def recover_jobs(kind, owner, stale_before, error, reclaim_own=False):
+    """Take over the jobs of ``kind`` left behind by stopped runners
+
+    A job is left behind when its heartbeat is older than ``stale_before``
+    (its runner died; jobs from before heartbeats have none) or, with
+    ``reclaim_own``, when ``owner`` holds it from an earlier start. Such
+    running jobs are marked failed with ``error``; such queued jobs are
+    handed to ``owner``. Jobs whose runner is still alive, in this process
+    or another, are left alone. Returns ``(failed, adopted)`` job dicts.
+    """
+    now = _now()
+    stale_before = stale_before.isoformat(" ")
+    with transaction() as cursor:
+        # One write transaction, so two runners cannot both take a job over
+        cursor.execute('BEGIN IMMEDIATE')
+        cursor.execute('''
+        SELECT * FROM jobs
+        WHERE kind = ? AND status IN ('queued', 'running')
+          AND ((? AND owner = ?) OR heartbeat IS NULL OR heartbeat < ?)
+        ORDER BY created_at
+        ''', (kind, reclaim_own, owner, stale_before))
+        columns = [description[0] for description in cursor.description]
+        jobs = [_decode_job(dict(zip(columns, row))) for row in cursor.fetchall()]
+        failed = [job for job in jobs if job['status'] == 'running']
+        adopted = [job for job in jobs if job['status'] == 'queued']
+        cursor.executemany('''
+        UPDATE jobs SET status = 'failed', error = ?, updated_at = ?, finished_at = ? WHERE id = ?
+        ''', [(error, now, now, job['id']) for job in failed])
+        cursor.executemany('''
+        UPDATE jobs SET owner = ?, heartbeat = ? WHERE id = ?
+        ''', [(owner, now, job['id']) for job in adopted])
+    return failed, adopted
+
+def _decode_job(job):
+    job['options'] = json.loads(job['options']) if job['options'] else {}
+    job['result'] = json.loads(job['result']) if job['result'] else None
+    return job
+
+def get_job(job_id):
+    """Return one job as a dict, or None"""
+    jobs = _fetch_dicts('SELECT * FROM jobs WHERE id = ?', (job_id,))
+    return _decode_job(jobs[0]) if jobs else None
+
+def get_jobs(kind, statuses):
+    """Jobs of one kind in any of ``statuses``, oldest first"""
+    placeholders = ', '.join('?' * len(statuses))
+    jobs = _fetch_dicts(f'''
+    SELECT * FROM jobs WHERE kind = ? AND status IN ({placeholders}) ORDER BY created_at
+    ''', (kind, *statuses))
+    return [_decode_job(job) for job in jobs]
+
+@metrics.timed('db.get_fraud_statistics')
+def get_fraud_statistics():
+    """Read the precomputed fraud rollups.
+
+    Cost depends on the number of steps, types and amount buckets, not on
+    how many transactions have been stored.
+    """
+    return {
+        'by_step': _fetch_dicts('''
+        SELECT step, fraud_count, total_amount FROM fraud_stats_by_step ORDER BY step
+        '''),
+        'by_type': _fetch_dicts('''
+        SELECT type, fraud_count, total_amount FROM fraud_stats_by_type ORDER BY type
+        '''),
+        'by_amount_range': _fetch_dicts('''
+        SELECT amount_range, fraud_count, confidence_sum, confidence_count
+        FROM fraud_stats_by_amount_range ORDER BY bucket
+        '''),
+        'total': (_fetch_dicts('''
+        SELECT fraud_count, total_amount FROM fraud_stats_total
+        ''') or [{'fraud_count': 0, 'total_amount': 0.0}])[0],
+    }
+
+@metrics.timed('db.get_fraud_geo_statistics')
+def get_fraud_geo_statistics():
+    """Read the per-city fraud rollup (city is an index into geo.CITIES)"""
+    return _fetch_dicts('''
+    SELECT city, fraud_count, total_amount, confidence_sum, confidence_count
+    FROM fraud_stats_by_city ORDER BY city
+    ''')
+
+def _as_columns(fraudulent):
+    """Normalise fraudulent transactions to (row count, {column: values}).
+
+    Accepts a DataFrame, a mapping of column name to array, or the list of
+    record dicts the API used to build with ``to_dict(orient='records')``.
+    """
+    if isinstance(fraudulent, list):
+        columns = {
+            col: [transaction.get(col, default) for transaction in fraudulent]
+            for col, default in TRANSACTION_COLUMNS.items()
+        }
+        return len(fraudulent), columns
+    
+    if isinstance(fraudulent, pd.DataFrame):
+        row_count = len(fraudulent)
+    else:
+        row_count = max((len(values) for values in fraudulent.values()), default=0)
+    columns = {}
+    for col, default in TRANSACTION_COLUMNS.items():
+        if col in fraudulent:
+            # tolist() yields native Python values that sqlite3 can bind
+            values = fraudulent[col]
+            columns[col] = values.tolist() if hasattr(values, 'tolist') else list(values)
+        else:
+            columns[col] = [default] * row_count
+    return row_count, columns
+
+def _allocate_ids(cursor, count):
+    """Reserve ``count`` consecutive transaction ids; returns them as an array.
+
+    The upsert takes the write lock first, so concurrent writers never get
+    overlapping ranges.
+    """
+    cursor.execute('''
+    INSERT INTO id_sequences (name, last_id) VALUES ('fraudulent_transactions', ?)
+    ON CONFLICT(name) DO UPDATE SET last_id = last_id + excluded.last_id
+    ''', (count,))
+    last_id = cursor.execute(
+        "SELECT last_id FROM id_sequences WHERE name = 'fraudulent_transactions'"
+    ).fetchone()[0]
+    return np.arange(last_id - count + 1, last_id + 1, dtype=np.int64)
+
+# Set when this process creates a new day's partition, so the retention
+# thread checks whether older days have passed the retention period
+_retention_wake = threading.Event()
+_retention_stopping = threading.Event()
+_retention_thread = None
+
+def _insert_fraudulent_rows(cursor, fraudulent, detected_at=None):
+    """Bulk insert fraudulent transactions using an open cursor.
+
+    All rows of the batch share one ``detected_at`` timestamp and go into
+    that day's partition with a single executemany call. Ids are allocated
+    up front, so each row's map city is computed for the whole batch before
+    it is written. Returns the number of rows inserted.
+    """
+    row_count, columns = _as_columns(fraudulent)
+    if row_count == 0:
+        return 0
+    
+    detected_at = detected_at or datetime.now()
+    ids = _allocate_ids(cursor, row_count)
+    table, created = _ensure_partition(cursor, detected_at.date())
+    if created:
+        _refresh_transactions_view(cursor)
+        _retention_wake.set()
+    cities = geo.city_indexes(ids, columns['amount'], columns['step'])
+    # Format the shared timestamp once, exactly as sqlite3's datetime adapter
+    # would, instead of adapting a datetime object for every row
+    detected_at = detected_at.isoformat(" ")
+    with metrics.stage('db.insert_rows', row_count):
+        cursor.executemany(f'''
+        INSERT INTO {table} 
+        (id, step, type, amount, oldbalanceOrg, newbalanceOrig, oldbalanceDest, newbalanceDest, isFlaggedFraud, prediction_confidence, detected_at, city)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', zip(ids.tolist(), *columns.values(), repeat(detected_at, row_count), cities.tolist()))
+    
+    with metrics.stage('db.update_rollups', row_count):
+        _update_fraud_statistics(cursor, columns, cities)
+    return row_count
+
+def _insert_processing_log(cursor, filename, total_transactions, fraudulent_count, model_version=None):
+    """Insert a processing log entry using an open cursor"""
+    cursor.execute('''
+    INSERT INTO processing_logs (filename, total_transactions, fraudulent_count, processed_at, model_version)
+    VALUES (?, ?, ?, ?, ?)
+    ''', (filename, total_transactions, fraudulent_count, datetime.now(), model_version))
+
+@metrics.timed('db.insert_fraudulent_transactions')
+def insert_fraudulent_transactions(transactions, filename):
+    """Insert fraudulent transactions into database"""
+    with transaction() as cursor:
+        # Log the processing
+        _insert_processing_log(cursor, filename, transactions['total_transactions'],
+                               len(transactions['fraudulent_data']), transactions.get('model_version'))
+        
+        # Insert all fraudulent transactions in one batch
+        _insert_fraudulent_rows(cursor, transactions['fraudulent_data'])
+    
+    return True
+
+@metrics.timed('db.insert_fraudulent_frame')
+def insert_fraudulent_frame(fraudulent_df, filename, total_transactions, model_version=None):
+    """Bulk insert fraudulent transactions straight from a DataFrame.
+
+    ``fraudulent_df`` may also be a mapping of column name to array. This
+    avoids building a list of per-row dicts before writing.
+    """
+    with transaction() as cursor:
+        fraudulent_count = _insert_fraudulent_rows(cursor, fraudulent_df)
+        _insert_processing_log(cursor, filename, total_transactions, fraudulent_count, model_version)
+    
+    return True
+
+@metrics.timed('db.append_fraudulent_transactions')
+def append_fraudulent_transactions(fraudulent_data):
+    """Insert one chunk of fraudulent transactions without logging the upload.
+
+    Used by chunked scoring, which writes hits as each chunk is scored and
+    records the processing log once the whole file is done. Accepts a
+    DataFrame, column arrays or a list of record dicts.
+    """
+    with transaction() as cursor:
+        _insert_fraudulent_rows(cursor, fraudulent_data)
+    
+    return True
+
+@metrics.timed('db.log_processing')
+def log_processing(filename, total_transactions, fraudulent_count, model_version=None):
+    """Record a processing log entry for an upload and the model that scored it"""
+    with transaction() as cursor:
+        _insert_processing_log(cursor, filename, total_transactions, fraudulent_count, model_version)
     
+    return True
+
+def _rows_as_dicts(cursor):
+    """Fetch the rest of a cursor's rows as dicts and close it"""
     columns = [description[0] for description in cursor.description]
-    transactions = [dict(zip(columns, row)) for row in cursor.fetchall()]
+    rows = cursor.fetchall()
+    cursor.close()
+    return [dict(zip(columns, row)) for row in rows]
+
+def _fetch_dicts(query, params=()):
+    """Run a read query on a pooled connection and return row dicts"""
+    with connection() as conn:
+        return _rows_as_dicts(conn.execute(query, params))
+
+def encode_cursor(transaction):
+    """Build the opaque page cursor pointing just past ``transaction``"""
+    position = json.dumps([transaction['detected_at'], transaction['id']])
+    return base64.urlsafe_b64encode(position.encode()).decode()
+
+def decode_cursor(cursor):
+    """Return the (detected_at, id) position encoded in a page cursor"""
+    try:
+        detected_at, transaction_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return detected_at, int(transaction_id)
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+@metrics.timed('db.get_fraudulent_transactions_page')
+def get_fraudulent_transactions_page(limit=100, cursor=None, city=None):
+    """Retrieve one page of fraudulent transactions, newest first.
+
+    Uses keyset pagination on (detected_at, id) across the daily partitions,
+    newest day first: days after the cursor's are skipped, and each
+    partition read is an index range scan starting after the cursor, so the
+    cost does not grow with the history or with how deep the page is.
+    ``city`` (an index into geo.CITIES) limits the page to one map city.
+    Archived days are not included (see get_archived_transactions).
+    Returns (transactions, next_cursor), where next_cursor is None on the
+    last page.
+    """
+    conditions, params = [], []
+    if city is not None:
+        conditions.append('city = ?')
+        params.append(city)
+    cursor_day = None
+    if cursor is not None:
+        detected_at, transaction_id = decode_cursor(cursor)
+        conditions.append('(detected_at, id) < (?, ?)')
+        params.extend((detected_at, transaction_id))
+        cursor_day = str(detected_at)[:10]
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
     
-    conn.close()
+    transactions = []
+    with connection() as conn:
+        # One read snapshot, so retention dropping a day cannot race the page
+        conn.execute('BEGIN')
+        for day, table in reversed(_partitions(conn)):
+            if cursor_day is not None and day.isoformat() > cursor_day:
+                continue
+            transactions.extend(_rows_as_dicts(conn.execute(f'''
+            SELECT * FROM {table} 
+            {where}
+            ORDER BY detected_at DESC, id DESC 
+            LIMIT ?
+            ''', (*params, limit - len(transactions)))))
+            if len(transactions) == limit:
+                break
+    
+    next_cursor = encode_cursor(transactions[-1]) if len(transactions) == limit else None
+    return transactions, next_cursor
+
+def get_fraudulent_transactions(limit=100, cursor=None):
+    """Retrieve fraudulent transactions from database"""
+    transactions, _ = get_fraudulent_transactions_page(limit, cursor)
     return transactions
 
+@metrics.timed('db.get_processing_logs')
 def get_processing_logs(limit=10):
     """Retrieve processing logs from database"""
-    conn = sqlite3.connect('fraud_detection.db')
-    cursor = conn.cursor()
-    
-    cursor.execute('''
+    return _fetch_dicts('''
     SELECT * FROM processing_logs 
     ORDER BY processed_at DESC 
     LIMIT ?
     ''', (limit,))
+
+def clear_data():
+    """Delete all stored transactions, processing logs and cached results.
+
+    Parquet archives written by retention are left in place.
+    """
+    with transaction() as cursor:
+        cursor.execute('BEGIN IMMEDIATE')
+        for _, table in _partitions(cursor):
+            cursor.execute(f'DROP TABLE {table}')
+        _refresh_transactions_view(cursor)
+        cursor.execute('DELETE FROM processing_logs')
+        cursor.execute('DELETE FROM fraud_stats_by_step')
+        cursor.execute('DELETE FROM fraud_stats_by_type')
+        cursor.execute('DELETE FROM fraud_stats_by_amount_range')
+        cursor.execute('DELETE FROM fraud_stats_by_city')
+        cursor.execute('DELETE FROM fraud_stats_total')
+        # Cached results would otherwise skip re-inserting the cleared rows
+        cursor.execute('DELETE FROM result_cache')
+        cursor.execute('DELETE FROM stored_uploads')
+        # Jobs still queued or running keep their rows so they can finish
+        cursor.execute("DELETE FROM jobs WHERE status IN ('done', 'failed')")
     
-    columns = [description[0] for description in cursor.description]
-    logs = [dict(zip(columns, row)) for row in cursor.fetchall()]
+    return True
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise RuntimeError("Archiving fraud history needs the pyarrow package") from None
+    return pyarrow
+
+def _archive_schema(pa, table):
+    return pa.schema([
+        (column, getattr(pa, type_name)()) for column, type_name in ARCHIVE_COLUMNS[table].items()
+    ])
+
+def _archive_frame(frame, table):
+    """``frame`` with the archive's integer columns as nullable Int64
+
+    SQLite hands back an integer column holding NULLs as floats (or
+    objects); pyarrow refuses to cast those NaNs to int64, which would fail
+    the whole day. Nullable integers keep the NULLs as nulls.
+    """
+    integers = {
+        column: pd.to_numeric(frame[column]).astype('Int64')
+        for column, type_name in ARCHIVE_COLUMNS[table].items()
+        if type_name == 'int64' and column in frame.columns
+    }
+    return frame.assign(**integers)
+
+def _archive_path(table, day):
+    return os.path.join(ARCHIVE_DIR, table, f'{day.isoformat()}.parquet')
+
+def _write_archive(table, day, frames):
+    """Write row frames to the day's Parquet archive of ``table``.
+
+    A day archived before (rows written with an old detected_at after its
+    partition was dropped) keeps its rows; rows whose id is already there
+    are skipped, so retrying an interrupted archive does not duplicate
+    them. The file is written next to the archive and moved into place, so
+    readers never see half of it. Returns the highest id written, or None.
+    """
+    pa = _pyarrow()
+    schema = _archive_schema(pa, table)
+    path = _archive_path(table, day)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    existing = pa.parquet.read_table(path, schema=schema) if os.path.exists(path) else None
+    archived_ids = existing.column('id').to_numpy() if existing is not None else np.empty(0, np.int64)
+    last_id = int(archived_ids.max()) if len(archived_ids) else None
+    
+    # Unique, so processes archiving the same day never share a file
+    temporary = f'{path}.{uuid.uuid4().hex}.tmp'
+    with pa.parquet.ParquetWriter(temporary, schema) as writer:
+        if existing is not None:
+            writer.write_table(existing)
+        for frame in frames:
+            frame = frame[~np.isin(frame['id'].to_numpy(), archived_ids)]
+            if len(frame):
+                writer.write_table(pa.Table.from_pandas(
+                    _archive_frame(frame, table), schema=schema, preserve_index=False
+                ))
+                last_id = max(last_id or 0, int(frame['id'].max()))
+    os.replace(temporary, path)
+    return last_id
+
+def _archive_partition(day, table):
+    """Archive one day's partition to Parquet, then drop it.
+
+    The drop is skipped if rows arrived after the archive was read, so they
+    are archived on the next run instead of being lost.
+    """
+    with connection() as conn:
+        conn.execute('BEGIN')
+        chunks = pd.read_sql_query(
+            f'SELECT * FROM {table} ORDER BY detected_at, id', conn, chunksize=ARCHIVE_CHUNK_ROWS
+        )
+        last_id = _write_archive('fraudulent_transactions', day, chunks)
     
-    conn.close()
-    return logs
+    with transaction() as cursor:
+        cursor.execute('BEGIN IMMEDIATE')
+        if not _table_exists(cursor, table):
+            return False
+        newest = cursor.execute(f'SELECT MAX(id) FROM {table}').fetchone()[0]
+        if newest is not None and (last_id is None or newest > last_id):
+            return False
+        # Dropping the table frees its pages without deleting row by row
+        cursor.execute(f'DROP TABLE {table}')
+        _refresh_transactions_view(cursor)
+    return True
+
+def _archive_processing_logs(cutoff):
+    """Archive processing logs from before ``cutoff`` by day, then delete
+    them; returns how many were archived"""
+    cutoff = cutoff.isoformat()
+    with connection() as conn:
+        logs = pd.read_sql_query(
+            'SELECT * FROM processing_logs WHERE processed_at < ? ORDER BY id', conn, params=(cutoff,)
+        )
+    if logs.empty:
+        return 0
+    days = logs['processed_at'].astype(str).str[:10]
+    for day, day_logs in logs.groupby(days):
+        _write_archive('processing_logs', date.fromisoformat(day), [day_logs])
+    
+    with transaction() as cursor:
+        # Logs written meanwhile with an old timestamp wait for the next run
+        cursor.execute(
+            'DELETE FROM processing_logs WHERE processed_at < ? AND id <= ?',
+            (cutoff, int(logs['id'].max()))
+        )
+    return len(logs)
+
+@metrics.timed('db.apply_retention')
+def apply_retention(today=None):
+    """Move fraud history older than RETENTION_DAYS to the Parquet archive.
+
+    Each expired day's partition is written to
+    ``ARCHIVE_DIR/fraudulent_transactions/YYYY-MM-DD.parquet`` and dropped,
+    and processing logs are archived the same way under
+    ``processing_logs/``. The fraud rollups keep counting archived rows.
+    Runs on the retention thread (see start_retention); returns the
+    archived days and log count.
+    """
+    summary = {'archived_days': [], 'archived_logs': 0}
+    if RETENTION_DAYS <= 0:
+        return summary
+    cutoff = (today or date.today()) - timedelta(days=RETENTION_DAYS - 1)
+    with connection() as conn:
+        expired = [(day, table) for day, table in _partitions(conn) if day < cutoff]
+    for day, table in expired:
+        if _archive_partition(day, table):
+            summary['archived_days'].append(day.isoformat())
+    summary['archived_logs'] = _archive_processing_logs(cutoff)
+    return summary
+
+def _retention_loop(interval):
+    while not _retention_stopping.is_set():
+        _retention_wake.clear()
+        try:
+            apply_retention()
+        except Exception:
+            # A failed run (e.g. pyarrow missing) is retried on the next one
+            traceback.print_exc()
+        _retention_wake.wait(interval)
+
+def start_retention(interval=None):
+    """Run apply_retention on a background thread, now and periodically
+
+    Archiving a day and dropping its partition happen on this thread, so
+    they never hold up an insert. It runs every ``interval`` seconds
+    (RETENTION_INTERVAL_SECONDS by default) and as soon as an insert opens
+    a new day's partition. Does nothing when RETENTION_DAYS is 0.
+    """
+    global _retention_thread
+    if RETENTION_DAYS <= 0 or (_retention_thread is not None and _retention_thread.is_alive()):
+        return
+    _retention_stopping.clear()
+    _retention_thread = threading.Thread(
+        target=_retention_loop, args=(interval or RETENTION_INTERVAL_SECONDS,),
+        name='fraud-retention', daemon=True
+    )
+    _retention_thread.start()
+
+def stop_retention():
+    """Stop the retention thread, waiting for a run in progress"""
+    global _retention_thread
+    if _retention_thread is None:
+        return
+    _retention_stopping.set()
+    _retention_wake.set()
+    _retention_thread.join()
+    _retention_thread = None
+
+def _archive_days(table, start=None, end=None):
+    """(day, path) of the archive files of ``table`` between start and end,
+    newest first"""
+    directory = os.path.join(ARCHIVE_DIR, table)
+    if not os.path.isdir(directory):
+        return []
+    days = []
+    for name in os.listdir(directory):
+        stem, extension = os.path.splitext(name)
+        if extension != '.parquet':
+            continue
+        try:
+            day = date.fromisoformat(stem)
+        except ValueError:
+            continue
+        if (start is None or day >= start) and (end is None or day <= end):
+            days.append((day, os.path.join(directory, name)))
+    return sorted(days, reverse=True)
+
+@metrics.timed('db.get_archived_transactions')
+def get_archived_transactions(start=None, end=None, city=None, limit=1000):
+    """Read archived fraudulent transactions, newest first, as a DataFrame.
+
+    ``start`` and ``end`` are inclusive dates bounding the archived days
+    read, and ``city`` (an index into geo.CITIES) is pushed down into the
+    Parquet reader. Only as many daily files are read as ``limit`` needs.
+    """
+    pa = _pyarrow()
+    schema = _archive_schema(pa, 'fraudulent_transactions')
+    filters = [('city', '=', city)] if city is not None else None
+    frames, remaining = [], limit
+    for _, path in _archive_days('fraudulent_transactions', start, end):
+        if remaining <= 0:
+            break
+        frame = pa.parquet.read_table(path, schema=schema, filters=filters).to_pandas()
+        frame = frame.sort_values(['detected_at', 'id'], ascending=False).head(remaining)
+        frames.append(frame)
+        remaining -= len(frame)
+    if not frames:
+        return schema.empty_table().to_pandas()
+    return pd.concat(frames, ignore_index=True)
 
 if __name__ == "__main__":
-    setup_database()
\ No newline at end of file
+    setup_database()
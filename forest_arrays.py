@@ -0,0 +1,170 @@
+"""Flat, memory-mappable export of the random forest and a NumPy predictor.
+
+The trees of a fitted RandomForestClassifier are concatenated into a few
+contiguous arrays (split feature, threshold, children, missing-value
+direction and leaf class probabilities) saved as .npy files in one
+directory. ArrayForest maps those files read-only, so every API worker
+shares the same pages and starts without unpickling the forest.
+
+ArrayForest predicts the same probabilities as sklearn but walks the trees
+in NumPy, several times slower than sklearn's compiled traversal (see
+benchmarks/bench_forest_arrays.py). The fitted estimator is therefore
+served by default; set MODEL_SOURCE=arrays to serve the mapped arrays
+where startup time and memory shared across workers matter more than
+predict throughput.
+
+Export the shipped model with:
+    python forest_arrays.py credit_fraud.pkl credit_fraud_forest
+"""
+import json
+import os
+import sys
+
+import numpy as np
+
+FOREST_ARRAYS_DIR = 'credit_fraud_forest'
+# 'pickle' (the sklearn estimator) or 'arrays' (an ArrayForest)
+MODEL_SOURCE = os.environ.get('MODEL_SOURCE', 'pickle')
+ARRAY_NAMES = ('feature', 'threshold', 'left', 'right', 'missing_left', 'proba', 'roots')
+METADATA_FILE = 'forest.json'
+
+# Rows traversed per block, which bounds the per-call working memory
+BLOCK_ROWS = 65536
+
+def export_forest(model, path=FOREST_ARRAYS_DIR):
+    """Write a fitted RandomForestClassifier to ``path`` as flat arrays"""
+    trees = [estimator.tree_ for estimator in model.estimators_]
+    offsets = np.cumsum([0] + [tree.node_count for tree in trees])
+
+    feature, threshold, left, right, missing_left, proba = [], [], [], [], [], []
+    for offset, tree in zip(offsets, trees):
+        is_leaf = tree.children_left < 0
+        feature.append(np.where(is_leaf, 0, tree.feature))
+        threshold.append(tree.threshold)
+        left.append(np.where(is_leaf, -1, tree.children_left + offset))
+        right.append(np.where(is_leaf, -1, tree.children_right + offset))
+        if hasattr(tree, 'missing_go_to_left'):
+            missing_left.append(tree.missing_go_to_left.astype(bool))
+        else:
+            # Older trees have no missing-value routing: NaN fails "<=" and goes right
+            missing_left.append(np.zeros(tree.node_count, dtype=bool))
+
+        # Normalised exactly like DecisionTreeClassifier.predict_proba
+        value = tree.value[:, 0, :]
+        normalizer = value.sum(axis=1)
+        normalizer[normalizer == 0.0] = 1.0
+        proba.append(value / normalizer[:, np.newaxis])
+
+    arrays = {
+        'feature': np.concatenate(feature).astype(np.int32),
+        'threshold': np.concatenate(threshold).astype(np.float64),
+        'left': np.concatenate(left).astype(np.int32),
+        'right': np.concatenate(right).astype(np.int32),
+        'missing_left': np.concatenate(missing_left),
+        'proba': np.concatenate(proba).astype(np.float64),
+        'roots': offsets[:-1].astype(np.int32),
+    }
+    os.makedirs(path, exist_ok=True)
+    for name, array in arrays.items():
+        np.save(os.path.join(path, f'{name}.npy'), np.ascontiguousarray(array))
+
+    metadata = {
+        'classes': model.classes_.tolist(),
+        'n_features': int(model.n_features_in_),
+        'feature_names': [str(name) for name in getattr(model, 'feature_names_in_', [])],
+    }
+    with open(os.path.join(path, METADATA_FILE), 'w') as f:
+        json.dump(metadata, f)
+    return path
+
+class ArrayForest:
+    """Random forest predictor over memory-mapped flat tree arrays.
+
+    Predictions match RandomForestClassifier exactly: inputs are cast to
+    float32 as sklearn does, all rows walk each tree together with
+    vectorized gathers, and per-tree leaf probabilities are summed in tree
+    order before averaging.
+    """
+
+    def __init__(self, path=FOREST_ARRAYS_DIR, mmap_mode='r'):
+        self.path = path
+        for name in ARRAY_NAMES:
+            setattr(self, name, np.load(os.path.join(path, f'{name}.npy'), mmap_mode=mmap_mode))
+        with open(os.path.join(path, METADATA_FILE)) as f:
+            metadata = json.load(f)
+        self.classes_ = np.array(metadata['classes'])
+        self.n_features_in_ = metadata['n_features']
+        self.feature_names_in_ = metadata['feature_names'] or None
+        self.n_estimators = len(self.roots)
+
+    def _as_matrix(self, X):
+        if self.feature_names_in_ is not None and hasattr(X, 'columns'):
+            X = X[self.feature_names_in_]
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        if X.ndim != 2 or X.shape[1] != self.n_features_in_:
+            raise ValueError(
+                f"X has {X.shape[-1]} features, but ArrayForest expects {self.n_features_in_}"
+            )
+        return X
+
+    def _apply_block(self, X):
+        """Leaf node index of every row in every tree, for one block of rows"""
+        n_rows = len(X)
+        # Feature-major copy so each lookup is one flat take(feature * n + row)
+        X_flat = np.ascontiguousarray(X.T).ravel()
+        feature_offset = self.feature.astype(np.int64) * n_rows
+        all_rows = np.arange(n_rows)
+
+        leaves = np.empty((self.n_estimators, n_rows), dtype=np.int32)
+        for tree, root in enumerate(self.roots):
+            tree_leaves = leaves[tree]
+            tree_leaves.fill(root)
+            # Only rows still at a split node are advanced on each level
+            rows, node = all_rows, tree_leaves
+            while len(rows):
+                x = X_flat.take(feature_offset.take(node) + rows)
+                go_left = (x <= self.threshold.take(node)) | (np.isnan(x) & self.missing_left.take(node))
+                node = np.where(go_left, self.left.take(node), self.right.take(node))
+                tree_leaves[rows] = node
+                at_split = self.left.take(node) >= 0
+                rows, node = rows[at_split], node[at_split]
+        return leaves
+
+    def predict_proba(self, X):
+        X = self._as_matrix(X)
+        proba = np.zeros((len(X), len(self.classes_)), dtype=np.float64)
+        for start in range(0, len(X), BLOCK_ROWS):
+            leaves = self._apply_block(X[start:start + BLOCK_ROWS])
+            block = proba[start:start + BLOCK_ROWS]
+            for tree_leaves in leaves:
+                block += self.proba.take(tree_leaves, axis=0)
+        proba /= self.n_estimators
+        return proba
+
+    def predict(self, X):
+        return self.classes_.take(np.argmax(self.predict_proba(X), axis=1), axis=0)
+
+def serving_model_path(pickle_path, arrays_path, source=None):
+    """The model to serve: ``pickle_path`` or ``arrays_path``, per MODEL_SOURCE
+
+    Falls back to the other one when the chosen artifact does not exist.
+    """
+    source = source or MODEL_SOURCE
+    if source not in ('pickle', 'arrays'):
+        raise ValueError(f"MODEL_SOURCE must be 'pickle' or 'arrays', not {source!r}")
+    preferred, other = (arrays_path, pickle_path) if source == 'arrays' else (pickle_path, arrays_path)
+    return preferred if os.path.exists(preferred) or not os.path.exists(other) else other
+
+def load_model(path):
+    """Load either a pickled model file or an exported forest directory"""
+    if os.path.isdir(path):
+        return ArrayForest(path)
+    import joblib
+    return joblib.load(path)
+
+if __name__ == "__main__":
+    import joblib
+    model_path = sys.argv[1] if len(sys.argv) > 1 else 'credit_fraud.pkl'
+    output_path = sys.argv[2] if len(sys.argv) > 2 else FOREST_ARRAYS_DIR
+    export_forest(joblib.load(model_path), output_path)
+    print(f"Forest arrays exported to {output_path}")
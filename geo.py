@@ -0,0 +1,48 @@
+"""Madhya Pradesh cities used to place fraud on the dashboard map.
+
+Transactions carry no location, so each stored fraudulent transaction is
+assigned a city from its id, amount and step. The assignment is made once
+at insert time and stored as an index into CITIES
+(fraudulent_transactions.city). The geo rollups and the map read that
+column.
+"""
+import numpy as np
+
+# Order matters: stored city indexes point into this list
+CITIES = [
+    {'city': 'Bhopal', 'lat': 23.2599, 'lng': 77.4126, 'district': 'Bhopal'},
+    {'city': 'Indore', 'lat': 22.7196, 'lng': 75.8577, 'district': 'Indore'},
+    {'city': 'Jabalpur', 'lat': 23.1815, 'lng': 79.9864, 'district': 'Jabalpur'},
+    {'city': 'Gwalior', 'lat': 26.2183, 'lng': 78.1828, 'district': 'Gwalior'},
+    {'city': 'Ujjain', 'lat': 23.1765, 'lng': 75.7885, 'district': 'Ujjain'},
+    {'city': 'Sagar', 'lat': 23.8388, 'lng': 78.7378, 'district': 'Sagar'},
+    {'city': 'Dewas', 'lat': 22.9676, 'lng': 76.0534, 'district': 'Dewas'},
+    {'city': 'Satna', 'lat': 24.5670, 'lng': 80.8320, 'district': 'Satna'},
+    {'city': 'Ratlam', 'lat': 23.3315, 'lng': 75.0367, 'district': 'Ratlam'},
+    {'city': 'Rewa', 'lat': 24.5364, 'lng': 81.2964, 'district': 'Rewa'},
+    {'city': 'Singrauli', 'lat': 24.1992, 'lng': 82.6739, 'district': 'Singrauli'},
+    {'city': 'Burhanpur', 'lat': 21.3009, 'lng': 76.2291, 'district': 'Burhanpur'},
+    {'city': 'Khandwa', 'lat': 21.8343, 'lng': 76.3569, 'district': 'Khandwa'},
+    {'city': 'Bhind', 'lat': 26.5653, 'lng': 78.7875, 'district': 'Bhind'},
+    {'city': 'Chhindwara', 'lat': 22.0572, 'lng': 78.9315, 'district': 'Chhindwara'},
+    {'city': 'Guna', 'lat': 24.6537, 'lng': 77.3112, 'district': 'Guna'},
+    {'city': 'Shivpuri', 'lat': 25.4244, 'lng': 77.6581, 'district': 'Shivpuri'},
+    {'city': 'Vidisha', 'lat': 23.5251, 'lng': 77.8081, 'district': 'Vidisha'},
+    {'city': 'Chhatarpur', 'lat': 24.9178, 'lng': 79.5941, 'district': 'Chhatarpur'},
+]
+CITY_INDEX = {city['city']: index for index, city in enumerate(CITIES)}
+
+# The same assignment in SQL, for rows stored before the city column existed.
+# CAST truncates towards zero like int() does.
+CITY_SQL = f'''abs(id + CAST(COALESCE(amount, 0) AS INTEGER) + COALESCE(step, 0)) % {len(CITIES)}'''
+
+def city_indexes(ids, amounts, steps):
+    """Vectorized city index for each transaction (missing values count as 0).
+
+    Gives the same cities as the map's original per-row rule:
+    ``abs(id + int(amount) + int(step)) % len(CITIES)``.
+    """
+    amounts = np.nan_to_num(np.asarray(amounts, dtype=float))
+    steps = np.nan_to_num(np.asarray(steps, dtype=float))
+    total = np.asarray(ids, dtype=np.int64) + np.trunc(amounts).astype(np.int64) + np.trunc(steps).astype(np.int64)
+    return np.abs(total) % len(CITIES)
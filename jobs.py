@@ -0,0 +1,213 @@
+"""Background scoring jobs on a local worker pool.
+
+Large uploads are spooled to JOBS_DIR and answered straight away with a job
+id; a pool of JOB_WORKERS threads then scores each file chunk by chunk.
+Every job has a row in the ``jobs`` table next to ``processing_logs``. The
+row records its status (queued, running, done or failed), the rows scored
+and fraud found so far, and the final result summary, so progress can be
+polled from any process sharing the database. Only SQLite and the local
+filesystem are used; there is no broker.
+
+Several runners of the same kind can share the database, one per server
+worker process. A job is claimed with a conditional update that only
+succeeds while it is still queued, so exactly one runner scores it. Each
+runner has an owner id and refreshes a heartbeat on the jobs it holds
+every JOB_HEARTBEAT_SECONDS. On every heartbeat a runner takes over jobs
+whose heartbeat is older than JOB_STALE_SECONDS, and on start also the
+jobs it held before it was stopped: queued ones are re-queued locally,
+running ones are marked failed, since their earlier chunks were already
+stored and re-running would duplicate them. Jobs held by a live peer are
+left alone.
+Stopping a runner fails its running jobs at the next chunk boundary.
+"""
+import os
+import queue
+import shutil
+import socket
+import threading
+import traceback
+import uuid
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Optional
+
+import database_setup as db
+
+JOBS_DIR = os.environ.get('JOBS_DIR', 'job_uploads')
+JOB_WORKERS = int(os.environ.get('JOB_WORKERS', '2'))
+JOB_CHUNK_SIZE = int(os.environ.get('JOB_CHUNK_SIZE', '100000'))
+JOB_HEARTBEAT_SECONDS = float(os.environ.get('JOB_HEARTBEAT_SECONDS', '10'))
+JOB_STALE_SECONDS = float(os.environ.get('JOB_STALE_SECONDS', '60'))
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+class JobStopped(Exception):
+    """Raised inside a job when its runner is stopping"""
+
+def _direct(func, *args):
+    return func(*args)
+
+def job_status(job: Dict) -> Dict:
+    """Public view of a job row, with elapsed time and throughput"""
+    elapsed = 0.0
+    if job['started_at']:
+        if job['status'] == RUNNING:
+            ended = datetime.now()
+        else:
+            ended = datetime.fromisoformat(job['finished_at'] or job['updated_at'])
+        elapsed = (ended - datetime.fromisoformat(job['started_at'])).total_seconds()
+    return {
+        'job_id': job['id'],
+        'status': job['status'],
+        'filename': job['filename'],
+        'rows_done': job['rows_done'],
+        'fraudulent_count': job['fraudulent_count'],
+        'elapsed_seconds': round(elapsed, 3),
+        'rows_per_second': round(job['rows_done'] / elapsed, 1) if elapsed > 0 else None,
+        'created_at': job['created_at'],
+        'started_at': job['started_at'],
+        'finished_at': job['finished_at'],
+        'error': job['error'],
+        'result': job['result'],
+    }
+
+class JobRunner:
+    """Run one kind of scoring job on a pool of worker threads.
+
+    ``process(job, path, report)`` scores the spooled upload at ``path``,
+    calls ``report(rows_done, fraudulent_count)`` after each chunk and
+    returns the JSON-serializable result summary. Database writes made by
+    the runner go through ``db_write(func, *args)``, so an app can keep them
+    on its single writer thread.
+    """
+
+    def __init__(self, kind: str, process: Callable, n_workers: int = JOB_WORKERS,
+                 db_write: Callable = _direct, jobs_dir: str = JOBS_DIR):
+        self.kind = kind
+        self.process = process
+        self.n_workers = max(1, n_workers)
+        self.db_write = db_write
+        self.jobs_dir = jobs_dir
+        # Unique per runner, so peers in other worker processes never match it
+        self.owner = f'{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}'
+        self._queue = queue.Queue()
+        self._threads = []
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+
+    @property
+    def running(self) -> bool:
+        return bool(self._threads)
+
+    def start(self):
+        """Start the workers and take over jobs left behind by stopped runners"""
+        with self._lock:
+            if self._threads:
+                return
+            self._stopping.clear()
+            os.makedirs(self.jobs_dir, exist_ok=True)
+            self._recover(reclaim_own=True)
+            for i in range(self.n_workers):
+                thread = threading.Thread(
+                    target=self._work, name=f'{self.kind}-job-{i}', daemon=True
+                )
+                thread.start()
+                self._threads.append(thread)
+            thread = threading.Thread(
+                target=self._heartbeat, name=f'{self.kind}-job-heartbeat', daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self):
+        """Stop the workers; running jobs fail at their next chunk boundary"""
+        with self._lock:
+            self._stopping.set()
+            for _ in range(self.n_workers):
+                self._queue.put(None)
+            for thread in self._threads:
+                thread.join()
+            self._threads = []
+
+    def submit(self, source, filename: str, options: Optional[Dict] = None) -> str:
+        """Spool an upload stream to disk and queue it; returns the job id"""
+        job_id = uuid.uuid4().hex
+        options = dict(options or {})
+        # The format is detected from the original filename, kept on the job row
+        options['path'] = os.path.join(self.jobs_dir, job_id + '.upload')
+        os.makedirs(self.jobs_dir, exist_ok=True)
+        with open(options['path'], 'wb') as spool:
+            shutil.copyfileobj(source, spool, 1024 * 1024)
+        self.db_write(db.create_job, job_id, self.kind, filename, options, QUEUED, None, self.owner)
+        self._queue.put(job_id)
+        return job_id
+
+    def complete(self, filename: str, result: Dict, options: Optional[Dict] = None) -> str:
+        """Record a job that needs no work (e.g. a cached result); returns its id"""
+        job_id = uuid.uuid4().hex
+        self.db_write(db.create_job, job_id, self.kind, filename, options, DONE, result)
+        return job_id
+
+    def _recover(self, reclaim_own=False):
+        stale_before = datetime.now() - timedelta(seconds=JOB_STALE_SECONDS)
+        failed, adopted = self.db_write(
+            db.recover_jobs, self.kind, self.owner, stale_before,
+            "Interrupted by a restart before it finished", reclaim_own
+        )
+        for job in failed:
+            self._remove_spool(job)
+        for job in adopted:
+            self._queue.put(job['id'])
+
+    def _heartbeat(self):
+        while not self._stopping.wait(JOB_HEARTBEAT_SECONDS):
+            try:
+                self.db_write(db.touch_jobs, self.owner)
+                self._recover()
+            except Exception:
+                traceback.print_exc()
+
+    def _work(self):
+        while True:
+            job_id = self._queue.get()
+            if job_id is None:
+                return
+            if self._stopping.is_set():
+                continue
+            # Another worker process may have claimed it first
+            if not self.db_write(db.claim_job, job_id, self.owner):
+                continue
+            self._run(db.get_job(job_id))
+
+    def _run(self, job: Dict):
+        job_id = job['id']
+
+        def report(rows_done, fraudulent_count):
+            if self._stopping.is_set():
+                raise JobStopped("Stopped before it finished")
+            if not self.db_write(db.update_job_progress, job_id, int(rows_done),
+                                 int(fraudulent_count), self.owner):
+                raise JobStopped("Taken over by another runner after its heartbeat went stale")
+
+        try:
+            result = self.process(job, job['options']['path'], report)
+        except JobStopped as e:
+            self.db_write(db.finish_job, job_id, FAILED, None, str(e), self.owner)
+        except Exception as e:
+            traceback.print_exc()
+            self.db_write(db.finish_job, job_id, FAILED, None, str(e), self.owner)
+        else:
+            self.db_write(db.finish_job, job_id, DONE, result, None, self.owner)
+        finally:
+            self._remove_spool(job)
+
+    @staticmethod
+    def _remove_spool(job: Dict):
+        path = job['options'].get('path')
+        if path and os.path.exists(path):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
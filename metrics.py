@@ -0,0 +1,248 @@
+"""Stage timers, counters and latency histograms in Prometheus text format.
+
+Hot paths wrap each stage in ``stage(name, rows)``. Every stage feeds two
+series:
+
+- ``cybershield_stage_seconds{stage}``: a latency histogram
+- ``cybershield_stage_rows_total{stage}``: a counter of rows handled, so
+  ``rate(rows_total) / rate(seconds_sum)`` gives rows per second
+
+Apps record request latency in ``cybershield_request_seconds`` and serve
+``render()`` from /metrics. Everything is in-process with no dependencies;
+each worker process exports its own series.
+
+A request can also be profiled. Between ``start_profile()`` and
+``stop_profile()`` the stages run in the current context are collected as
+well. ``server_timing()``
+renders them as a ``Server-Timing`` header. Stage timing costs a
+perf_counter pair and one locked histogram update; without profiling
+nothing else is done.
+"""
+import bisect
+import contextvars
+import functools
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+# Latency buckets in seconds, from a fast single prediction to a large upload
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Request header that turns on per-request profiling
+PROFILE_HEADER = 'X-Profile'
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+def _label_text(names: Tuple[str, ...], values: Tuple[str, ...]) -> str:
+    if not names:
+        return ''
+    pairs = ','.join(
+        '{}="{}"'.format(name, str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n'))
+        for name, value in zip(names, values)
+    )
+    return '{' + pairs + '}'
+
+class Counter:
+    """Monotonic counter with optional labels"""
+
+    def __init__(self, name: str, documentation: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, *label_values: str):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} counter']
+        with self._lock:
+            items = sorted(self._values.items())
+        for label_values, value in items:
+            lines.append(f'{self.name}{_label_text(self.labels, label_values)} {value}')
+        return lines
+
+class Histogram:
+    """Cumulative-bucket histogram with optional labels"""
+
+    def __init__(self, name: str, documentation: str, labels: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [per-bucket counts (+Inf last), sum, count]
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values: str):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> List[str]:
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            items = sorted((key, (list(counts), total, n)) for key, (counts, total, n) in self._series.items())
+        for label_values, (counts, total, n) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                labels = _label_text(self.labels + ('le',), label_values + (le,))
+                lines.append(f'{self.name}_bucket{labels} {cumulative}')
+            labels = _label_text(self.labels, label_values)
+            lines.append(f'{self.name}_sum{labels} {total}')
+            lines.append(f'{self.name}_count{labels} {n}')
+        return lines
+
+STAGE_SECONDS = Histogram(
+    'cybershield_stage_seconds', 'Time spent in each processing stage', ('stage',)
+)
+STAGE_ROWS = Counter(
+    'cybershield_stage_rows_total', 'Rows handled by each processing stage', ('stage',)
+)
+REQUEST_SECONDS = Histogram(
+    'cybershield_request_seconds', 'HTTP request latency', ('method', 'path', 'status')
+)
+SHADOW_ROWS = Counter(
+    'cybershield_shadow_rows_total', 'Sampled rows scored by the shadow model, by outcome',
+    ('primary', 'shadow', 'outcome')
+)
+METRICS = [STAGE_SECONDS, STAGE_ROWS, REQUEST_SECONDS, SHADOW_ROWS]
+
+# Stage timings of the request being profiled, if any: stage -> [seconds, calls]
+_profile = contextvars.ContextVar('cybershield_profile', default=None)
+
+@contextmanager
+def stage(name: str, rows: Optional[int] = None):
+    """Time a block as processing stage ``name``, counting ``rows`` if given"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_SECONDS.observe(elapsed, name)
+        if rows:
+            STAGE_ROWS.inc(rows, name)
+        profile_stages = _profile.get()
+        if profile_stages is not None:
+            totals = profile_stages.setdefault(name, [0.0, 0])
+            totals[0] += elapsed
+            totals[1] += 1
+
+def timed(name: str):
+    """Decorator form of ``stage`` for whole functions"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with stage(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def count_rows(name: str, rows: int):
+    """Count rows for a stage timed elsewhere, once the count is known"""
+    if rows:
+        STAGE_ROWS.inc(rows, name)
+
+def observe_request(method: str, path: str, status: int, seconds: float):
+    REQUEST_SECONDS.observe(seconds, method, path, str(status))
+
+def observe_shadow(primary: str, shadow: str, agree: int, disagree: int):
+    """Count shadow-scored rows whose fraud label matched the primary model's or not"""
+    SHADOW_ROWS.inc(agree, primary, shadow, 'agree')
+    SHADOW_ROWS.inc(disagree, primary, shadow, 'disagree')
+
+def profiling_requested(value: Optional[str]) -> bool:
+    """Whether a PROFILE_HEADER value asks for a stage breakdown"""
+    return bool(value) and value.strip().lower() not in ('0', 'false', 'no', 'off')
+
+def start_profile() -> contextvars.Token:
+    """Start collecting stage timings in the current context"""
+    return _profile.set({})
+
+def stop_profile(token: contextvars.Token) -> Dict[str, List[float]]:
+    """Stop collecting and return stage -> [seconds, calls]"""
+    stages = _profile.get() or {}
+    _profile.reset(token)
+    return stages
+
+def server_timing(stages: Dict[str, List[float]], total: Optional[float] = None) -> str:
+    """``Server-Timing`` header value for a stage breakdown (milliseconds)"""
+    entries = [
+        f'{name};dur={seconds * 1000:.3f};desc="{calls} call{"s" if calls != 1 else ""}"'
+        for name, (seconds, calls) in stages.items()
+    ]
+    if total is not None:
+        entries.append(f'total;dur={total * 1000:.3f}')
+    return ', '.join(entries)
+
+class ASGIMetricsMiddleware:
+    """Record request latency and serve profiled requests a Server-Timing header
+
+    Plain ASGI, so the endpoint runs in the same task and context as the
+    middleware. Requests are labelled with their route template rather than
+    the raw path. The latency covers the handler up to the response start;
+    streamed bodies are written afterwards.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._route_paths = None
+
+    def _route_path(self, scope) -> str:
+        endpoint = scope.get('endpoint')
+        if endpoint is None:
+            return 'unmatched'
+        if self._route_paths is None and 'app' in scope:
+            self._route_paths = {
+                getattr(route, 'endpoint', None): route.path for route in scope['app'].routes
+            }
+        return (self._route_paths or {}).get(endpoint, 'unmatched')
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        header = PROFILE_HEADER.lower().encode()
+        token = None
+        for name, value in scope.get('headers', ()):
+            if name == header and profiling_requested(value.decode('latin-1')):
+                token = start_profile()
+                break
+        start = time.perf_counter()
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+                if token is not None:
+                    timing = server_timing(_profile.get() or {}, time.perf_counter() - start)
+                    message = dict(message, headers=list(message.get('headers', [])) + [
+                        (b'server-timing', timing.encode('latin-1'))
+                    ])
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            observe_request(scope['method'], self._route_path(scope), status, time.perf_counter() - start)
+            if token is not None:
+                stop_profile(token)
+
+def render() -> str:
+    """All series in Prometheus text exposition format"""
+    lines = []
+    for metric in METRICS:
+        lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
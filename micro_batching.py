@@ -0,0 +1,104 @@
+import asyncio
+from typing import Callable, List, Optional
+
+class MicroBatcher:
+    """Coalesce concurrent scoring requests into one batched model call.
+
+    Requests are queued; the worker takes the first waiting request, keeps
+    collecting more for up to ``max_wait_ms`` or until ``max_batch_size``
+    items are stacked, scores them with a single ``score_batch`` call and
+    hands each caller back its own slice of the results.
+
+    ``executor`` is an executor, or a callable returning one, that
+    ``score_batch`` runs on so scoring never blocks the event loop. Without
+    one, batches are scored inline on the loop.
+    """
+
+    def __init__(self, score_batch: Callable[[List], List], max_batch_size: int = 64,
+                 max_wait_ms: float = 5.0, executor: Optional[object] = None):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1")
+        self.score_batch = score_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.executor = executor
+        self._queue = None
+        self._worker = None
+
+    async def start(self):
+        """Start the batching worker on the running event loop"""
+        self._queue = asyncio.Queue()
+        self._worker = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """Stop the worker; requests still queued are cancelled"""
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+        while self._queue is not None and not self._queue.empty():
+            _, future = self._queue.get_nowait()
+            future.cancel()
+
+    async def submit(self, items: List) -> List:
+        """Queue items for scoring and wait for their results, in order"""
+        if self._worker is None:
+            raise RuntimeError("MicroBatcher has not been started")
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((items, future))
+        return await future
+
+    async def _collect(self):
+        """Wait for one request, then gather more until the batch is full or the wait expires"""
+        pending = [await self._queue.get()]
+        batch_size = len(pending[0][0])
+        deadline = asyncio.get_running_loop().time() + self.max_wait
+
+        while batch_size < self.max_batch_size:
+            try:
+                request = self._queue.get_nowait()
+            except asyncio.QueueEmpty:
+                timeout = deadline - asyncio.get_running_loop().time()
+                if timeout <= 0:
+                    break
+                try:
+                    request = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+            pending.append(request)
+            batch_size += len(request[0])
+        return pending
+
+    async def _run(self):
+        while True:
+            pending = await self._collect()
+            # Callers that gave up (e.g. disconnected clients) are skipped
+            pending = [(items, future) for items, future in pending if not future.done()]
+            if not pending:
+                continue
+
+            stacked = [item for items, _ in pending for item in items]
+            try:
+                results = await self._score(stacked)
+            except Exception as e:
+                for _, future in pending:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            offset = 0
+            for items, future in pending:
+                if not future.done():
+                    future.set_result(results[offset:offset + len(items)])
+                offset += len(items)
+
+    async def _score(self, stacked: List) -> List:
+        """Score one stacked batch, on the executor when there is one"""
+        if self.executor is None:
+            return self.score_batch(stacked)
+        executor = self.executor() if callable(self.executor) else self.executor
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(executor, self.score_batch, stacked)
@@ -0,0 +1,238 @@
+"""Versioned model artifacts, activated atomically and hot-swapped in workers.
+
+Layout of MODEL_REGISTRY_DIR:
+
+    model_registry/
+        CURRENT                  name of the active version
+        versions/<version>/
+            model.pkl            the fitted estimator, served by default
+            forest/              exported forest arrays (see forest_arrays.py),
+                                 served with MODEL_SOURCE=arrays
+            expected_columns.pkl
+            category_mappings.pkl
+            metadata.json        created_at, trees, training metrics...
+
+train_model.py publishes each trained model as a new version. A version is
+written under a temporary name and renamed into place, and CURRENT is
+replaced with os.replace, so a reader never sees a half-written version.
+
+Serving processes hold the active version in a ModelWatcher. Its background
+thread polls CURRENT. When CURRENT changes, the new version is loaded
+completely and then swapped in with one reference assignment. A request
+reads ``watcher.current`` once and keeps that version for its whole run,
+so in-flight requests are never dropped or switched mid-way.
+
+Without a registry, the artifacts in the working directory are served as a
+single version named after their digest.
+"""
+import json
+import os
+import shutil
+import threading
+import uuid
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from forest_arrays import export_forest, load_model, serving_model_path
+from preprocessing import FeatureSchema, load_category_mappings
+
+MODEL_REGISTRY_DIR = os.environ.get('MODEL_REGISTRY_DIR', 'model_registry')
+MODEL_POLL_SECONDS = float(os.environ.get('MODEL_POLL_SECONDS', '5'))
+
+CURRENT_FILE = 'CURRENT'
+VERSIONS_DIR = 'versions'
+MODEL_FILE = 'model.pkl'
+FOREST_DIR = 'forest'
+EXPECTED_COLUMNS_FILE = 'expected_columns.pkl'
+CATEGORY_MAPPINGS_FILE = 'category_mappings.pkl'
+METADATA_FILE = 'metadata.json'
+
+# Loaded versions kept per process besides the current one (e.g. a shadow)
+MAX_LOADED_VERSIONS = 4
+
+class ModelVersion:
+    """One loaded model version and the artifacts scoring needs with it"""
+
+    def __init__(self, version: str, model, expected_columns: List[str],
+                 category_mappings: Dict, source: str):
+        self.version = version
+        self.model = model
+        self.expected_columns = expected_columns
+        self.category_mappings = category_mappings
+        # Compiled once here, reused for every batch this version scores
+        self.schema = FeatureSchema(expected_columns, category_mappings)
+        # Path the model was loaded from, for worker processes to load it too
+        self.source = source
+
+def _version_dir(version: str, registry_dir: str) -> str:
+    if not version or os.path.basename(version) != version or version.startswith('.'):
+        raise ValueError(f"Invalid model version {version!r}")
+    return os.path.join(registry_dir, VERSIONS_DIR, version)
+
+def publish(model, expected_columns: List[str], category_mappings: Dict,
+            metadata: Optional[Dict] = None, registry_dir: str = MODEL_REGISTRY_DIR,
+            activate: bool = True) -> str:
+    """Add a trained model to the registry as a new version; returns its name"""
+    import joblib
+    version = datetime.now().strftime('%Y%m%d-%H%M%S-') + uuid.uuid4().hex[:6]
+    versions_dir = os.path.join(registry_dir, VERSIONS_DIR)
+    os.makedirs(versions_dir, exist_ok=True)
+
+    staging = os.path.join(versions_dir, '.tmp-' + version)
+    os.makedirs(staging)
+    try:
+        joblib.dump(model, os.path.join(staging, MODEL_FILE))
+        export_forest(model, os.path.join(staging, FOREST_DIR))
+        joblib.dump(list(expected_columns), os.path.join(staging, EXPECTED_COLUMNS_FILE))
+        joblib.dump(category_mappings, os.path.join(staging, CATEGORY_MAPPINGS_FILE))
+        with open(os.path.join(staging, METADATA_FILE), 'w') as f:
+            json.dump(dict(metadata or {}, version=version, created_at=datetime.now().isoformat()),
+                      f, indent=2, default=str)
+        os.rename(staging, _version_dir(version, registry_dir))
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+    if activate:
+        activate_version(version, registry_dir)
+    return version
+
+def activate_version(version: str, registry_dir: str = MODEL_REGISTRY_DIR):
+    """Make ``version`` the active one for every process watching the registry"""
+    if not os.path.isdir(_version_dir(version, registry_dir)):
+        raise FileNotFoundError(f"Model version {version} is not in {registry_dir}")
+    pending = os.path.join(registry_dir, f'{CURRENT_FILE}.{uuid.uuid4().hex}.tmp')
+    with open(pending, 'w') as f:
+        f.write(version + '\n')
+    os.replace(pending, os.path.join(registry_dir, CURRENT_FILE))
+
+def active_version(registry_dir: str = MODEL_REGISTRY_DIR) -> Optional[str]:
+    """Name of the active version, or None without a registry"""
+    try:
+        with open(os.path.join(registry_dir, CURRENT_FILE)) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+def list_versions(registry_dir: str = MODEL_REGISTRY_DIR) -> List[Dict]:
+    """Metadata of every published version, oldest first"""
+    versions_dir = os.path.join(registry_dir, VERSIONS_DIR)
+    if not os.path.isdir(versions_dir):
+        return []
+    versions = []
+    for name in sorted(os.listdir(versions_dir)):
+        if name.startswith('.'):
+            continue
+        try:
+            with open(os.path.join(versions_dir, name, METADATA_FILE)) as f:
+                versions.append(json.load(f))
+        except FileNotFoundError:
+            versions.append({'version': name})
+    return versions
+
+def load_version(version: str, registry_dir: str = MODEL_REGISTRY_DIR) -> ModelVersion:
+    """Load one registry version"""
+    import joblib
+    path = _version_dir(version, registry_dir)
+    # Versions published before model.pkl was kept only have the arrays
+    source = serving_model_path(os.path.join(path, MODEL_FILE), os.path.join(path, FOREST_DIR))
+    return ModelVersion(
+        version,
+        load_model(source),
+        joblib.load(os.path.join(path, EXPECTED_COLUMNS_FILE)),
+        load_category_mappings(os.path.join(path, CATEGORY_MAPPINGS_FILE)),
+        source,
+    )
+
+class ModelWatcher:
+    """The active model version of this process, swapped when CURRENT changes
+
+    ``fallback()`` loads the model served while the registry has no active
+    version. ``on_swap(old, new)`` callbacks run after each swap, on the
+    thread that made it.
+    """
+
+    def __init__(self, registry_dir: str = MODEL_REGISTRY_DIR, fallback: Optional[Callable] = None,
+                 poll_seconds: float = MODEL_POLL_SECONDS):
+        self.registry_dir = registry_dir
+        self.fallback = fallback
+        self.poll_seconds = poll_seconds
+        self.current = None
+        self.on_swap = []
+        self._loaded = {}
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._thread = None
+
+    def load(self) -> Optional[ModelVersion]:
+        """Load the active version, or the fallback, and make it current"""
+        version = active_version(self.registry_dir)
+        if version is None:
+            loaded = self.fallback() if self.fallback is not None else None
+        else:
+            loaded = self.get(version)
+        if loaded is not None:
+            self._swap(loaded)
+        return loaded
+
+    def reload(self) -> bool:
+        """Swap to the active version if it changed; True when a swap happened"""
+        version = active_version(self.registry_dir)
+        if version is None or (self.current is not None and self.current.version == version):
+            return False
+        self._swap(self.get(version))
+        return True
+
+    def get(self, version: str) -> ModelVersion:
+        """A loaded version by name, loading it on first use"""
+        current = self.current
+        if current is not None and current.version == version:
+            return current
+        with self._lock:
+            loaded = self._loaded.get(version)
+            if loaded is None:
+                loaded = load_version(version, self.registry_dir)
+                self._loaded[version] = loaded
+                self._evict()
+        return loaded
+
+    def _evict(self):
+        keep = self.current.version if self.current is not None else None
+        for name in list(self._loaded):
+            if len(self._loaded) <= MAX_LOADED_VERSIONS:
+                break
+            if name != keep:
+                del self._loaded[name]
+
+    def _swap(self, loaded: ModelVersion):
+        with self._lock:
+            previous = self.current
+            self._loaded[loaded.version] = loaded
+            # One reference assignment: requests see the old or the new version
+            self.current = loaded
+        if previous is not None and previous.version != loaded.version:
+            print(f"Model version {previous.version} -> {loaded.version}")
+            for callback in self.on_swap:
+                callback(previous, loaded)
+
+    def start(self):
+        """Poll CURRENT every ``poll_seconds`` on a daemon thread"""
+        if self._thread is not None or self.poll_seconds <= 0:
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._watch, name='model-watcher', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _watch(self):
+        while not self._stopping.wait(self.poll_seconds):
+            try:
+                self.reload()
+            except Exception as e:
+                # Keep serving the current version; retry on the next poll
+                print(f"Error loading model version: {e}")
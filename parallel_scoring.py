@@ -0,0 +1,83 @@
+import os
+import tempfile
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from forest_arrays import load_model
+
+# Feature matrices are handed to workers through a memory-mapped .npy file;
+# /dev/shm keeps it in RAM where available
+SHARED_DIR = '/dev/shm' if os.path.isdir('/dev/shm') else None
+
+# Each worker process loads the model once, in its initializer
+_worker_model = None
+
+def _load_worker_model(model_path):
+    # An exported forest directory is memory-mapped, so workers share its pages
+    global _worker_model
+    _worker_model = load_model(model_path)
+    # Workers score bare arrays, which sklearn would warn about on every call
+    warnings.filterwarnings('ignore', message='X does not have valid feature names')
+
+def _predict_shard(matrix_path, start, stop, method='predict'):
+    """Score rows [start, stop) of the shared matrix in a worker"""
+    X = np.load(matrix_path, mmap_mode='r')[start:stop]
+    return start, getattr(_worker_model, method)(X)
+
+class ShardedScorer:
+    """Score large feature matrices in parallel across worker processes.
+
+    The matrix is written once to a memory-mapped file that every worker maps
+    read-only, so only shard boundaries and predictions cross process
+    boundaries. Predictions are reassembled in the original row order.
+    """
+
+    def __init__(self, model_path, n_workers=None, shards_per_worker=4):
+        self.model_path = model_path
+        self.n_workers = n_workers or os.cpu_count() or 1
+        self.shards_per_worker = shards_per_worker
+        self._pool = ProcessPoolExecutor(
+            max_workers=self.n_workers,
+            initializer=_load_worker_model,
+            initargs=(model_path,)
+        )
+
+    def _shard_bounds(self, n_rows):
+        n_shards = max(1, min(n_rows, self.n_workers * self.shards_per_worker))
+        edges = np.linspace(0, n_rows, n_shards + 1).astype(int)
+        return list(zip(edges[:-1], edges[1:]))
+
+    def _score(self, X, method):
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        with tempfile.NamedTemporaryFile(suffix='.npy', dir=SHARED_DIR) as shared:
+            np.save(shared, X)
+            shared.flush()
+
+            futures = [
+                self._pool.submit(_predict_shard, shared.name, start, stop, method)
+                for start, stop in self._shard_bounds(len(X))
+            ]
+            results = None
+            for future in futures:
+                start, shard_results = future.result()
+                if results is None:
+                    results = np.empty((len(X),) + shard_results.shape[1:], dtype=shard_results.dtype)
+                results[start:start + len(shard_results)] = shard_results
+        return results
+
+    def predict(self, X):
+        """Predict every row of ``X``, returned in the original order"""
+        if len(X) == 0:
+            return np.empty(0, dtype=np.int64)
+        return self._score(X, 'predict')
+
+    def predict_proba(self, X):
+        """Class probabilities for every row of ``X``, in the original order"""
+        if len(X) == 0:
+            return np.empty((0, 2), dtype=np.float64)
+        return self._score(X, 'predict_proba')
+
+    def shutdown(self):
+        self._pool.shutdown(wait=True)
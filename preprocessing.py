@@ -0,0 +1,103 @@
+import numpy as np
+import pandas as pd
+
+CATEGORY_MAPPINGS_FILE = 'category_mappings.pkl'
+
+# Code given to categories that were not seen during training
+UNKNOWN_CATEGORY_CODE = -1
+
+# Categories the shipped credit_fraud.pkl was trained on, in LabelEncoder order.
+# Used when no category_mappings.pkl has been saved by train_model.py yet.
+DEFAULT_CATEGORY_MAPPINGS = {
+    'type': ['CASH_IN', 'CASH_OUT', 'DEBIT', 'PAYMENT', 'TRANSFER']
+}
+
+def categorical_columns(df: pd.DataFrame) -> list:
+    """Return the names of the text (or categorical) columns in a DataFrame"""
+    return [
+        col for col in df.columns
+        if df[col].dtype == "O"
+        or isinstance(df[col].dtype, pd.CategoricalDtype)
+        or pd.api.types.is_string_dtype(df[col].dtype)
+    ]
+
+def fit_category_mappings(df: pd.DataFrame, columns) -> dict:
+    """Fit the category -> code table for each column.
+
+    Categories are sorted, so the codes match what LabelEncoder assigns.
+    """
+    return {col: sorted(df[col].dropna().unique().tolist()) for col in columns}
+
+def encode_categoricals(df: pd.DataFrame, category_mappings: dict) -> pd.DataFrame:
+    """Replace categorical columns with their fitted codes, in place.
+
+    The lookup is a single vectorized pass through a fixed categorical dtype,
+    so codes never depend on which categories appear in a batch. Unknown or
+    missing values get UNKNOWN_CATEGORY_CODE.
+    """
+    for col, categories in category_mappings.items():
+        if col in df.columns:
+            dtype = pd.CategoricalDtype(categories=categories)
+            df[col] = df[col].astype(dtype).cat.codes.astype('int64')
+    return df
+
+def _category_codes(values, dtype: pd.CategoricalDtype) -> np.ndarray:
+    """Codes of ``values`` in a fixed categorical dtype"""
+    if isinstance(getattr(values, 'dtype', None), pd.CategoricalDtype):
+        return pd.Categorical(values, dtype=dtype).codes
+    # Hash each value once, then look up only the few distinct ones;
+    # missing values (code -1) pick the trailing unknown code
+    codes, uniques = pd.factorize(values)
+    lookup = np.append(dtype.categories.get_indexer(uniques), UNKNOWN_CATEGORY_CODE)
+    return lookup[codes]
+
+# Value given to model columns that an input does not carry
+MISSING_FEATURE_VALUE = 0
+
+class FeatureSchema:
+    """Compiled plan from parsed transaction columns to a model's input.
+
+    Built once per model from its expected columns and category mappings.
+    ``matrix`` writes every expected column straight into one C-contiguous
+    float32 array, the dtype and layout the forest predicts on, so nothing
+    is converted again before scoring. Extra input columns are never read,
+    missing ones are filled by broadcasting MISSING_FEATURE_VALUE, and
+    categorical columns are looked up through fixed categorical dtypes
+    (unknown or missing values get UNKNOWN_CATEGORY_CODE).
+    """
+
+    def __init__(self, expected_columns, category_mappings: dict):
+        self.columns = list(expected_columns)
+        self.categories = {
+            col: pd.CategoricalDtype(categories=categories)
+            for col, categories in category_mappings.items() if col in self.columns
+        }
+
+    def matrix(self, df) -> np.ndarray:
+        """Feature matrix (rows x expected columns) for a DataFrame or a
+        mapping of column name to array"""
+        row_count = len(df) if isinstance(df, pd.DataFrame) else max(
+            (len(values) for values in df.values()), default=0
+        )
+        X = np.empty((row_count, len(self.columns)), dtype=np.float32)
+        for position, col in enumerate(self.columns):
+            if col not in df:
+                X[:, position] = MISSING_FEATURE_VALUE
+            elif col in self.categories:
+                X[:, position] = _category_codes(df[col], self.categories[col])
+            else:
+                X[:, position] = np.asarray(df[col])
+        return X
+
+def save_category_mappings(category_mappings: dict, path: str = CATEGORY_MAPPINGS_FILE):
+    """Persist the fitted category mappings next to the model artifacts"""
+    import joblib
+    joblib.dump(category_mappings, path)
+
+def load_category_mappings(path: str = CATEGORY_MAPPINGS_FILE) -> dict:
+    """Load the fitted category mappings, falling back to the shipped defaults"""
+    import joblib
+    try:
+        return joblib.load(path)
+    except FileNotFoundError:
+        return DEFAULT_CATEGORY_MAPPINGS
@@ -0,0 +1,88 @@
+"""Content-addressed cache of upload results.
+
+Re-uploading a file that was already scored returns the stored result
+instead of parsing, scoring and inserting it again. Entries are keyed by a
+streaming SHA-256 of the upload bytes together with the scorer version (the
+model artifacts, or the rule table) and any option that changes the result,
+so a new model or threshold never serves stale results.
+
+Results are stored compressed in the ``result_cache`` SQLite table, so they
+survive restarts. Tables inside a result are kept in columnar form. The
+cache is bounded to RESULT_CACHE_MAX_BYTES of payloads; least recently used
+entries are evicted first. Set it to 0 to disable caching.
+"""
+import hashlib
+import json
+import os
+import zlib
+from typing import Dict, Iterable, Optional
+
+import pandas as pd
+
+import database_setup as db
+from serialization import COLUMNAR, iter_object
+
+RESULT_CACHE_MAX_BYTES = int(os.environ.get('RESULT_CACHE_MAX_BYTES', str(256 * 1024 * 1024)))
+
+# Bytes read per step while hashing an upload
+HASH_BLOCK_SIZE = 1024 * 1024
+
+def enabled() -> bool:
+    return RESULT_CACHE_MAX_BYTES > 0
+
+def hash_upload(source) -> str:
+    """SHA-256 of a seekable upload stream, read in blocks.
+
+    The stream is rewound to where it was, ready to be parsed.
+    """
+    position = source.tell()
+    digest = hashlib.sha256()
+    for block in iter(lambda: source.read(HASH_BLOCK_SIZE), b''):
+        digest.update(block)
+    source.seek(position)
+    return digest.hexdigest()
+
+def artifact_digest(paths: Iterable[str]) -> str:
+    """Short digest of the files (or directories of files) a scorer loads"""
+    digest = hashlib.sha256()
+    for path in paths:
+        if os.path.isdir(path):
+            files = [os.path.join(path, name) for name in sorted(os.listdir(path))]
+        else:
+            files = [path]
+        for file_path in files:
+            if not os.path.isfile(file_path):
+                continue
+            digest.update(os.path.basename(file_path).encode())
+            with open(file_path, 'rb') as f:
+                for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b''):
+                    digest.update(block)
+    return digest.hexdigest()[:16]
+
+def cache_key(content_hash: str, scorer_version: str, **options) -> str:
+    """Cache key of an upload scored by ``scorer_version`` with ``options``"""
+    material = json.dumps([content_hash, scorer_version, sorted(options.items())], default=str)
+    return hashlib.sha256(material.encode()).hexdigest()
+
+def encode_result(result: Dict) -> bytes:
+    """Compressed JSON of a result; DataFrame fields are stored as columns"""
+    return zlib.compress(b''.join(iter_object(result, COLUMNAR)), 1)
+
+def decode_result(payload: bytes) -> Dict:
+    """Inverse of encode_result; columnar fields come back as DataFrames"""
+    result = json.loads(zlib.decompress(payload))
+    return {
+        key: pd.DataFrame(value) if isinstance(value, dict) else value
+        for key, value in result.items()
+    }
+
+def get(key: str) -> Optional[Dict]:
+    """The cached result for ``key``, or None on a miss"""
+    payload = db.fetch_cached_result(key)
+    return None if payload is None else decode_result(payload)
+
+def put(key: str, result: Dict):
+    """Cache ``result`` under ``key``, evicting old entries to stay in bounds"""
+    payload = encode_result(result)
+    if len(payload) <= RESULT_CACHE_MAX_BYTES:
+        db.store_cached_result(key, payload, RESULT_CACHE_MAX_BYTES)
@@ -0,0 +1,169 @@
+"""Streamed JSON encodings for large result sets.
+
+Result tables (a DataFrame, or the list of row dicts the database helpers
+return) are encoded a chunk of rows at a time straight from their column
+arrays, so a response never holds every row as a Python dict plus one
+giant string. Three shapes are supported:
+
+- ``json``: the usual object with the table as an array of records
+- ``ndjson``: one record per line; the scalar envelope fields travel in
+  ``X-...`` response headers instead
+- ``columnar``: the table as ``{column: [values...]}``, which is far more
+  compact for many rows
+
+orjson is used when installed; otherwise the standard json module is.
+Missing values (NaN/None) are always written as null.
+"""
+import json
+from typing import Dict, Iterator, List, Union
+
+import numpy as np
+import pandas as pd
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+JSON = 'json'
+NDJSON = 'ndjson'
+COLUMNAR = 'columnar'
+FORMATS = (JSON, NDJSON, COLUMNAR)
+
+MEDIA_TYPES = {
+    JSON: 'application/json',
+    NDJSON: 'application/x-ndjson',
+    COLUMNAR: 'application/json',
+}
+
+# Rows encoded per streamed chunk
+CHUNK_ROWS = 5000
+
+Table = Union[pd.DataFrame, List[Dict]]
+
+def _json_default(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def dumps(value) -> bytes:
+    """Encode one value as compact JSON bytes"""
+    if orjson is not None:
+        return orjson.dumps(value, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(value, default=_json_default, separators=(',', ':')).encode()
+
+def validate_format(fmt: str) -> str:
+    """Return ``fmt`` if it is a supported response shape, else raise ValueError"""
+    if fmt not in FORMATS:
+        raise ValueError(f"format must be one of {', '.join(FORMATS)}, got {fmt!r}")
+    return fmt
+
+def _to_list(values) -> list:
+    """Native Python values of one column array, with missing values as None"""
+    values = np.asarray(values)
+    items = values.tolist()
+    if values.dtype.kind in 'fO':
+        for i in np.flatnonzero(pd.isna(values)):
+            items[i] = None
+    return items
+
+def _column_json(values) -> bytes:
+    """Encode one whole column as a JSON array"""
+    values = np.asarray(values)
+    if orjson is not None and values.dtype.kind in 'iubf':
+        # orjson writes numeric arrays directly, NaN as null
+        return dumps(np.ascontiguousarray(values))
+    return dumps(_to_list(values))
+
+def _record_chunks(table: Table, chunk_rows: int) -> Iterator[List[Dict]]:
+    """The table as lists of at most ``chunk_rows`` record dicts"""
+    if isinstance(table, pd.DataFrame):
+        names = [str(name) for name in table.columns]
+        for start in range(0, len(table), chunk_rows):
+            chunk = table.iloc[start:start + chunk_rows]
+            columns = [_to_list(chunk.iloc[:, i].to_numpy()) for i in range(len(names))]
+            yield [dict(zip(names, row)) for row in zip(*columns)]
+    else:
+        for start in range(0, len(table), chunk_rows):
+            yield table[start:start + chunk_rows]
+
+def _columns(table: Table):
+    """(name, column values) pairs of the table"""
+    if isinstance(table, pd.DataFrame):
+        for i, name in enumerate(table.columns):
+            yield str(name), table.iloc[:, i].to_numpy()
+    elif table:
+        for name in table[0]:
+            yield name, np.array([row.get(name) for row in table], dtype=object)
+
+def iter_records(table: Table, chunk_rows: int = CHUNK_ROWS) -> Iterator[bytes]:
+    """Stream the table as a JSON array of records"""
+    yield b'['
+    separator = b''
+    for records in _record_chunks(table, chunk_rows):
+        yield separator + b','.join(map(dumps, records))
+        separator = b','
+    yield b']'
+
+def iter_columnar(table: Table) -> Iterator[bytes]:
+    """Stream the table as a JSON object of column arrays, one column at a time"""
+    yield b'{'
+    separator = b''
+    for name, values in _columns(table):
+        yield separator + dumps(name) + b':' + _column_json(values)
+        separator = b','
+    yield b'}'
+
+def iter_ndjson(table: Table, chunk_rows: int = CHUNK_ROWS) -> Iterator[bytes]:
+    """Stream the table as newline-delimited JSON records"""
+    for records in _record_chunks(table, chunk_rows):
+        yield b'\n'.join(map(dumps, records)) + b'\n'
+
+def iter_object(envelope: Dict, fmt: str = JSON, records_key: str = None,
+                chunk_rows: int = CHUNK_ROWS) -> Iterator[bytes]:
+    """Stream a response object whose table fields are encoded in chunks
+
+    The ``records_key`` field and any DataFrame field are tables, written as
+    record arrays, or as column objects when ``fmt`` is ``columnar``; every
+    other field is encoded as is.
+    """
+    yield b'{'
+    separator = b''
+    for key, value in envelope.items():
+        yield separator + dumps(key) + b':'
+        separator = b','
+        if key == records_key or isinstance(value, pd.DataFrame):
+            if fmt == COLUMNAR:
+                yield from iter_columnar(value)
+            else:
+                yield from iter_records(value, chunk_rows)
+        else:
+            yield dumps(value)
+    yield b'}'
+
+def header_name(key: str) -> str:
+    """``total_transactions`` -> ``X-Total-Transactions``"""
+    return 'X-' + '-'.join(part.capitalize() for part in key.split('_'))
+
+def ndjson_headers(envelope: Dict, records_key: str) -> Dict[str, str]:
+    """Scalar envelope fields as response headers, for NDJSON bodies"""
+    return {
+        header_name(key): str(value)
+        for key, value in envelope.items()
+        if key != records_key and value is not None and isinstance(value, (str, int, float))
+    }
+
+def iter_response(envelope: Dict, records_key: str, fmt: str,
+                  chunk_rows: int = CHUNK_ROWS) -> Iterator[bytes]:
+    """Body chunks of ``envelope`` in the requested shape
+
+    NDJSON bodies carry only the ``records_key`` table; pair them with
+    ``ndjson_headers`` for the rest.
+    """
+    if fmt == NDJSON:
+        return iter_ndjson(envelope[records_key], chunk_rows)
+    return iter_object(envelope, fmt, records_key, chunk_rows)
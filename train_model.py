@@ -1,30 +1,110 @@
 # File: train_model_simple.py
+import argparse
+import os
+import sys
+import time
 import pandas as pd
 import numpy as np
-from sklearn.preprocessing import LabelEncoder
 from sklearn.model_selection import train_test_split
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score, confusion_matrix
 import joblib
+from preprocessing import (
+    categorical_columns,
+    fit_category_mappings,
+    load_category_mappings,
+    FeatureSchema,
+    save_category_mappings,
+    CATEGORY_MAPPINGS_FILE,
+)
+from forest_arrays import export_forest, FOREST_ARRAYS_DIR
+from ingestion import IDENTIFIER_COLUMNS
+import model_registry
+from velocity import VelocityStore, uses_velocity
 
-def load_and_preprocess_data(file_path):
-    """Load and preprocess the dataset"""
-    print("Loading dataset...")
-    df = pd.read_csv(file_path)
-    print(f"Dataset shape: {df.shape}")
-    
-    # Drop unnecessary columns
-    df.drop(['nameOrig', 'nameDest'], axis=1, inplace=True)
-    
-    # Convert categorical columns to numerical
-    catCols = [col for col in df.columns if df[col].dtype == "O"]
-    lb_make = LabelEncoder()
-    
-    for item in catCols:
-        df[item] = lb_make.fit_transform(df[item])
-    
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# The Kaggle PaySim dump; benchmarks/paysim.py writes a synthetic stand-in
+TRAINING_DATA = os.environ.get('TRAINING_DATA', 'PS_20174392719_1491204439457_log.csv')
+
+MODEL_FILE = 'credit_fraud.pkl'
+EXPECTED_COLUMNS_FILE = 'expected_columns.pkl'
+N_ESTIMATORS = 10
+
+# Cores used to grow trees (-1: all of them)
+TRAINING_JOBS = int(os.environ.get('TRAINING_JOBS', '-1'))
+
+# Columns read for training and their compact dtypes. The account ids are
+# never loaded. The forest works on float32 internally, so float32 features
+# give the same splits as float64 at half the memory.
+TRAINING_DTYPES = {
+    'step': 'int32',
+    'type': 'category',
+    'amount': 'float32',
+    'oldbalanceOrg': 'float32',
+    'newbalanceOrig': 'float32',
+    'oldbalanceDest': 'float32',
+    'newbalanceDest': 'float32',
+    'isFraud': 'int8',
+    'isFlaggedFraud': 'int8',
+}
+
+# Rows read at a time when the account ids are needed for velocity features;
+# the ids are dropped chunk by chunk once the features are computed
+VELOCITY_CHUNK_ROWS = 1_000_000
+
+def peak_memory_mb():
+    """Peak resident memory of this process in MB, or None where unsupported"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / 1e6 if sys.platform == 'darwin' else peak / 1e3
+
+def read_with_velocity(file_path):
+    """Read the training columns plus per-account velocity features
+
+    The file is replayed in order through a fresh VelocityStore, the same
+    code serving uses, so the features match what the API computes.
+    """
+    store = VelocityStore()
+    chunks = []
+    for chunk in pd.read_csv(file_path, usecols=list(TRAINING_DTYPES) + IDENTIFIER_COLUMNS,
+                             dtype=TRAINING_DTYPES, chunksize=VELOCITY_CHUNK_ROWS):
+        features = store.update(chunk)
+        chunks.append(pd.concat([chunk.drop(columns=IDENTIFIER_COLUMNS), features], axis=1))
+    df = pd.concat(chunks, ignore_index=True)
+    # Chunks fit their own categories; concat leaves plain strings
+    df['type'] = df['type'].astype('category')
+    print(f"Velocity features from {store.stats()['accounts']:,} tracked accounts")
     return df
 
+def load_and_preprocess_data(file_path, category_mappings=None, velocity=False):
+    """Load and preprocess the dataset
+
+    Only the model columns are parsed, straight into TRAINING_DTYPES. With
+    ``velocity`` the account ids are read too, turned into velocity
+    features and dropped. The category codes are fitted on this data unless
+    ``category_mappings`` is given (e.g. when adding trees to an existing
+    model); the columns are encoded when the FeatureSchema builds the
+    feature matrix.
+    """
+    print("Loading dataset...")
+    if velocity:
+        df = read_with_velocity(file_path)
+    else:
+        df = pd.read_csv(file_path, usecols=list(TRAINING_DTYPES), dtype=TRAINING_DTYPES)
+    print(f"Dataset shape: {df.shape} ({df.memory_usage(deep=True).sum() / 1e6:.1f} MB in memory)")
+
+    # Fit the fixed code table for the categorical columns
+    if category_mappings is None:
+        category_mappings = fit_category_mappings(df, categorical_columns(df))
+
+    return df, category_mappings
+
 def evaluate_model(y_test, y_pred):
     """Evaluate model performance"""
     print("Accuracy Score: ", accuracy_score(y_test, y_pred))
@@ -33,41 +113,137 @@ def evaluate_model(y_test, y_pred):
     print("F1 Score: ", f1_score(y_test, y_pred))
     print("Confusion Matrix: \n", confusion_matrix(y_test, y_pred))
 
-def train_model():
-    """Train and save the fraud detection model"""
-    file_path = 'PS_20174392719_1491204439457_log.csv'
-    
+def report_resources(timings):
+    """Print the wall time of each phase and the peak memory"""
+    phases = ', '.join(f"{phase} {seconds:.2f}s" for phase, seconds in timings.items())
+    print(f"\nWall time: {phases}, total {sum(timings.values()):.2f}s")
+    peak = peak_memory_mb()
+    if peak is not None:
+        print(f"Peak memory: {peak:.0f} MB")
+
+def train_model(file_path=TRAINING_DATA, n_estimators=N_ESTIMATORS, n_jobs=TRAINING_JOBS,
+                add_trees=0, publish=True, activate=True, velocity=False):
+    """Train and save the fraud detection model
+
+    With ``add_trees`` the saved model is grown instead: that many new trees
+    are fitted on ``file_path`` (e.g. a day of new transactions) with
+    warm_start and added to the existing forest, keeping its category codes
+    and columns. The earlier trees are left as they are.
+
+    With ``publish`` the model is also added to the model registry as a new
+    version, which running APIs swap to unless ``activate`` is False.
+
+    With ``velocity`` the per-account velocity features (velocity.py) are
+    added to the model's columns. Off by default: serving computes them
+    from a store that is per process and starts empty, so a model trained
+    with them sees lower values than in training until each worker's
+    windows have filled. Added trees follow the existing model.
+    """
+    timings = {}
+    start = time.perf_counter()
+
+    category_mappings = None
+    if add_trees:
+        rfc = joblib.load(MODEL_FILE)
+        category_mappings = load_category_mappings()
+        velocity = uses_velocity(joblib.load(EXPECTED_COLUMNS_FILE))
+
     # Load and preprocess data
-    data = load_and_preprocess_data(file_path)
-    
-    # Prepare features and target
-    X = data.drop('isFraud', axis=1)
-    y = data.isFraud
+    data, category_mappings = load_and_preprocess_data(file_path, category_mappings, velocity)
+
+    # Prepare features and target: the float32 matrix serving builds too
+    columns = [col for col in data.columns if col != 'isFraud']
+    if add_trees:
+        expected_columns = joblib.load(EXPECTED_COLUMNS_FILE)
+        if columns != expected_columns:
+            raise ValueError(f"New data has columns {columns}, model expects {expected_columns}")
+    X = FeatureSchema(columns, category_mappings).matrix(data)
+    y = data['isFraud'].to_numpy()
+    del data
 
     # Split the data
     X_train, X_test, y_train, y_test = train_test_split(
         X, y, test_size=0.25, random_state=27
     )
-    
-    # Train Random Forest model
-    print("Training Random Forest model...")
-    rfc = RandomForestClassifier(n_estimators=10, random_state=42)
+    timings['load'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    if add_trees:
+        if len(np.unique(y_train)) != len(rfc.classes_):
+            raise ValueError("New data must contain both fraudulent and legitimate transactions")
+        print(f"Adding {add_trees} trees to the {rfc.n_estimators} in {MODEL_FILE}...")
+        rfc.set_params(warm_start=True, n_estimators=rfc.n_estimators + add_trees, n_jobs=n_jobs)
+    else:
+        # Train Random Forest model
+        print("Training Random Forest model...")
+        rfc = RandomForestClassifier(n_estimators=n_estimators, random_state=42, n_jobs=n_jobs)
     rfc.fit(X_train, y_train)
-    
+    timings['fit'] = time.perf_counter() - start
+
     # Make predictions and evaluate
+    start = time.perf_counter()
     predictions = rfc.predict(X_test)
     print("\nModel Evaluation:")
     evaluate_model(y_test, predictions)
-    
+    scores = {
+        'precision': precision_score(y_test, predictions),
+        'recall': recall_score(y_test, predictions),
+        'f1': f1_score(y_test, predictions),
+    }
+    timings['evaluate'] = time.perf_counter() - start
+
+    # Serving scores on its own pools; don't ship a model that grabs every core
+    rfc.set_params(n_jobs=None, warm_start=False)
+
     # Save the model directly (not wrapped in a dictionary)
-    joblib.dump(rfc, 'credit_fraud.pkl')
-    print("Model saved as credit_fraud.pkl")
-    
-    # Also save the expected columns for preprocessing
-    joblib.dump(X_train.columns.tolist(), 'expected_columns.pkl')
-    print("Expected columns saved as expected_columns.pkl")
-    
+    joblib.dump(rfc, MODEL_FILE)
+    print(f"Model saved as {MODEL_FILE} ({rfc.n_estimators} trees)")
+
+    # Memory-mappable copy of the forest, served with MODEL_SOURCE=arrays
+    export_forest(rfc, FOREST_ARRAYS_DIR)
+    print(f"Forest arrays exported to {FOREST_ARRAYS_DIR}")
+
+    if not add_trees:
+        # Also save the expected columns for preprocessing
+        joblib.dump(columns, EXPECTED_COLUMNS_FILE)
+        print(f"Expected columns saved as {EXPECTED_COLUMNS_FILE}")
+
+        # Save the category codes so serving encodes exactly like training
+        save_category_mappings(category_mappings)
+        print(f"Category mappings saved as {CATEGORY_MAPPINGS_FILE}")
+
+    if publish:
+        version = model_registry.publish(
+            rfc, columns, category_mappings,
+            metadata={'trees': rfc.n_estimators, 'training_data': os.path.basename(file_path),
+                      'rows': len(X_train) + len(X_test), 'added_trees': add_trees,
+                      'velocity_features': velocity, 'metrics': scores},
+            activate=activate,
+        )
+        state = "active" if activate else "not activated"
+        print(f"Published model version {version} to {model_registry.MODEL_REGISTRY_DIR} ({state})")
+
+    report_resources(timings)
     return rfc, X_test, y_test
 
 if __name__ == "__main__":
-    train_model()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Train the fraud detection model")
+    parser.add_argument('data', nargs='?', default=TRAINING_DATA,
+                        help="PaySim-format CSV to train on (default: %(default)s)")
+    parser.add_argument('--trees', type=int, default=N_ESTIMATORS,
+                        help="trees in a new forest (default: %(default)s)")
+    parser.add_argument('--add-trees', type=int, default=0, metavar='N',
+                        help=f"grow the saved {MODEL_FILE} by N trees fitted on DATA instead of retraining")
+    parser.add_argument('--jobs', type=int, default=TRAINING_JOBS,
+                        help="cores used for fitting, -1 for all (default: %(default)s)")
+    parser.add_argument('--velocity', action='store_true',
+                        help="add the per-account velocity features (served from a per-process "
+                             "store that starts empty)")
+    parser.add_argument('--no-publish', action='store_true',
+                        help="don't add the model to the model registry")
+    parser.add_argument('--no-activate', action='store_true',
+                        help="publish the model without making it the served version")
+    args = parser.parse_args()
+    train_model(args.data, args.trees, args.jobs, args.add_trees,
+                publish=not args.no_publish, activate=not args.no_activate,
+                velocity=args.velocity)
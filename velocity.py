@@ -0,0 +1,289 @@
+"""Per-account velocity features over a sliding window of steps.
+
+PaySim ``step`` is one hour. For every transaction the store reports, for
+both its origin (nameOrig) and its destination (nameDest) account, what
+that account did in the VELOCITY_WINDOW_STEPS steps before the
+transaction's step:
+
+- ``*_txn_count``: transactions it took part in, sent or received
+- ``*_amount_sum``: their total amount
+- ``*_counterparties``: distinct accounts on the other side (approximate)
+- ``*_drains``: times it was emptied as the origin (old balance above
+  zero, new balance zero)
+
+The current step is not in the window, so a row's features don't depend
+on the other rows of its step or on how a file is split into batches.
+Amounts are summed as integer cents, which is exact in any order, so
+batches of any size give bit-identical features. ``update(df)`` reads the
+features of a batch and then folds the batch in. Training replays the
+training file through a fresh store and serving feeds every scored upload
+into one long-lived store, so for the same rows in the same order both get
+the same features from the same code.
+
+A store is held in memory by one process and starts empty. Each serving
+worker process therefore has its own store, which only sees the uploads
+that worker scored since it started. Until its windows have filled (a
+full window of steps of traffic), a worker's features read lower than the
+ones the model was trained on. Nothing is persisted or shared between
+workers, which is why train_model.py only adds these features when run
+with --velocity.
+
+State is array-backed. Each account has a slot with a ring of
+window + 1 step buckets: count, amount in cents, drains, and a 64-bit
+bitmap of hashed counterparties (distinct counts use linear counting on
+it). A transaction touches one bucket on each side, so updates are O(1). A
+batch is processed one step at a time, vectorized over that step's rows.
+
+Memory is bounded by VELOCITY_MAX_ACCOUNTS slots. The arrays grow on
+demand up to that limit. When it is reached, accounts idle for the whole
+window are evicted first; they hold no live data, so this is exact. Only
+if that is not enough are the least recently active accounts dropped.
+"""
+import os
+import threading
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+import metrics
+
+VELOCITY_WINDOW_STEPS = int(os.environ.get('VELOCITY_WINDOW_STEPS', '24'))
+VELOCITY_MAX_ACCOUNTS = int(os.environ.get('VELOCITY_MAX_ACCOUNTS', '500000'))
+INITIAL_ACCOUNTS = 4096
+
+ROLES = ('orig', 'dest')
+COUNTERS = ('txn_count', 'amount_sum', 'counterparties', 'drains')
+VELOCITY_FEATURES = [f'{role}_{counter}' for role in ROLES for counter in COUNTERS]
+
+# Marks an empty bucket / an account with no activity yet
+_NO_STEP = np.iinfo(np.int64).min // 2
+_BITMAP_BITS = 64
+_POPCOUNT = np.array([bin(byte).count('1') for byte in range(256)], dtype=np.uint8)
+
+def uses_velocity(columns: List[str]) -> bool:
+    """Whether a model's feature columns include velocity features"""
+    return any(col in VELOCITY_FEATURES for col in columns)
+
+def counterparty_bits(names: np.ndarray) -> np.ndarray:
+    """Bitmap bit of each account name; a fixed hash, the same in every process"""
+    hashes = pd.util.hash_array(np.asarray(names, dtype=object), categorize=False)
+    return hashes % np.uint64(_BITMAP_BITS)
+
+def distinct_estimate(bitmaps: np.ndarray) -> np.ndarray:
+    """Linear-counting estimate of distinct values hashed into 64-bit bitmaps"""
+    bitmaps = np.ascontiguousarray(bitmaps, dtype=np.uint64)
+    ones = _POPCOUNT[bitmaps.view(np.uint8)].reshape(-1, 8).sum(axis=1)
+    # A full bitmap would be log(0); cap it at one empty bit's worth
+    zeros = np.maximum(_BITMAP_BITS - ones, 0.5)
+    return _BITMAP_BITS * np.log(_BITMAP_BITS / zeros)
+
+class VelocityStore:
+    """Sliding-window counters per account, fed one batch at a time
+
+    Thread-safe; batches are applied one at a time in arrival order.
+    """
+
+    def __init__(self, window_steps: int = VELOCITY_WINDOW_STEPS,
+                 max_accounts: int = VELOCITY_MAX_ACCOUNTS):
+        if window_steps <= 0 or max_accounts <= 0:
+            raise ValueError("window_steps and max_accounts must be positive")
+        self.window_steps = window_steps
+        self.max_accounts = max_accounts
+        self._ring = window_steps + 1
+        self._slots = {}
+        self._free = []
+        self._latest_step = _NO_STEP
+        self._lock = threading.Lock()
+        self._allocate(min(INITIAL_ACCOUNTS, max_accounts))
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def _allocate(self, capacity: int):
+        """Grow the slot arrays to ``capacity`` accounts, keeping their state"""
+        old = getattr(self, '_accounts', np.empty(0, dtype=object))
+        size = len(old)
+        shape = (capacity, self._ring)
+        arrays = {
+            '_bucket_step': np.full(shape, _NO_STEP, dtype=np.int64),
+            '_count': np.zeros(shape, dtype=np.int32),
+            '_cents': np.zeros(shape, dtype=np.int64),
+            '_drains': np.zeros(shape, dtype=np.int32),
+            '_bitmap': np.zeros(shape, dtype=np.uint64),
+            '_last_step': np.full(capacity, _NO_STEP, dtype=np.int64),
+        }
+        for name, array in arrays.items():
+            if size:
+                array[:size] = getattr(self, name)
+            setattr(self, name, array)
+        self._accounts = np.empty(capacity, dtype=object)
+        self._accounts[:size] = old
+        # Lowest slots are handed out first
+        self._free.extend(range(capacity - 1, size - 1, -1))
+
+    def _reserve(self, needed: int, protected: np.ndarray):
+        """Free at least ``needed`` slots without touching ``protected`` ones"""
+        missing = needed - len(self._free)
+        if missing <= 0:
+            return
+        capacity = len(self._accounts)
+        if capacity < self.max_accounts:
+            self._allocate(min(self.max_accounts, max(2 * capacity, capacity + missing)))
+            missing = needed - len(self._free)
+            if missing <= 0:
+                return
+
+        candidates = np.flatnonzero(self._accounts != None)  # noqa: E711 (elementwise)
+        candidates = candidates[~np.isin(candidates, protected)]
+        if len(candidates) < missing:
+            raise ValueError(
+                f"One step has more than {self.max_accounts} accounts; raise VELOCITY_MAX_ACCOUNTS"
+            )
+        last_step = self._last_step[candidates]
+        # Idle for the whole window: no live buckets left, evicting loses nothing
+        idle = candidates[last_step < self._latest_step - self.window_steps]
+        if len(idle) < missing:
+            # Not enough: also drop the least recently active accounts
+            idle = candidates[np.argpartition(last_step, missing - 1)[:missing]]
+        self._evict(idle)
+
+    def _evict(self, slots: np.ndarray):
+        slots_by_account = self._slots
+        for account in self._accounts[slots].tolist():
+            del slots_by_account[account]
+        self._accounts[slots] = None
+        self._free.extend(slots.tolist())
+        metrics.count_rows('velocity.evict', len(slots))
+
+    def _assign(self, names: np.ndarray) -> np.ndarray:
+        """Slot of each (distinct) account name, taking free slots for new ones"""
+        lookup = self._slots.get
+        slots = np.fromiter((lookup(name, -1) for name in names), dtype=np.int64, count=len(names))
+        new = np.flatnonzero(slots < 0)
+        if len(new):
+            self._reserve(len(new), slots[slots >= 0])
+            taken = self._free[-len(new):][::-1]
+            del self._free[-len(new):]
+            slots[new] = taken
+            self._slots.update(zip(names[new].tolist(), taken))
+            self._accounts[taken] = names[new]
+            self._bucket_step[taken] = _NO_STEP
+            self._last_step[taken] = _NO_STEP
+        return slots
+
+    def _read(self, slots: np.ndarray, step: int) -> np.ndarray:
+        """Counters over the window before ``step``, one row of COUNTERS per slot"""
+        counters = np.zeros((len(slots), len(COUNTERS)))
+        # Accounts idle for the whole window (e.g. new ones) read as zeros
+        active = np.flatnonzero(self._last_step[slots] >= step - self.window_steps)
+        if len(active):
+            counters[active] = self._window_counters(slots[active], step)
+        return counters
+
+    def _window_counters(self, slots: np.ndarray, step: int) -> np.ndarray:
+        bucket_step = self._bucket_step[slots]
+        live = (bucket_step >= step - self.window_steps) & (bucket_step < step)
+        bitmaps = np.bitwise_or.reduce(np.where(live, self._bitmap[slots], np.uint64(0)), axis=1)
+        return np.column_stack([
+            np.where(live, self._count[slots], 0).sum(axis=1),
+            np.where(live, self._cents[slots], 0).sum(axis=1) / 100,
+            distinct_estimate(bitmaps),
+            np.where(live, self._drains[slots], 0).sum(axis=1),
+        ])
+
+    def _fold(self, slots: np.ndarray, step: int, cents: np.ndarray, masks: np.ndarray,
+              drained: np.ndarray):
+        """Add one step's events (one per account side) to that step's buckets"""
+        bucket = step % self._ring
+        touched = np.unique(slots)
+        held = self._bucket_step[touched, bucket]
+        # A bucket holding a later step means these rows are too old to keep
+        kept = touched[held <= step]
+        reset = kept[self._bucket_step[kept, bucket] < step]
+        self._bucket_step[reset, bucket] = step
+        self._count[reset, bucket] = 0
+        self._cents[reset, bucket] = 0
+        self._drains[reset, bucket] = 0
+        self._bitmap[reset, bucket] = 0
+
+        keep = np.isin(slots, kept)
+        slots, cents, masks, drained = slots[keep], cents[keep], masks[keep], drained[keep]
+        np.add.at(self._count[:, bucket], slots, 1)
+        np.add.at(self._cents[:, bucket], slots, cents)
+        np.add.at(self._drains[:, bucket], slots, drained)
+        np.bitwise_or.at(self._bitmap[:, bucket], slots, masks)
+        self._last_step[kept] = np.maximum(self._last_step[kept], step)
+
+    def _update_step(self, step: int, orig: np.ndarray, dest: np.ndarray, cents: np.ndarray,
+                     drained: np.ndarray, features: np.ndarray, rows: np.ndarray):
+        n = len(rows)
+        names = np.concatenate([orig[rows], dest[rows]])
+        codes, uniques = pd.factorize(names)
+        known = codes >= 0
+        if not known.any():
+            return
+        slots = self._assign(np.asarray(uniques, dtype=object))[codes[known]]
+
+        # Read the window before this step, then add this step's rows
+        counters = self._read(slots, step)
+        sides = np.flatnonzero(known)
+        origin = sides < n
+        features[rows[sides[origin]], :len(COUNTERS)] = counters[origin]
+        features[rows[sides[~origin] - n], len(COUNTERS):] = counters[~origin]
+
+        # Each side's counterparty is the other account; names are hashed
+        # once per distinct account
+        masks = np.left_shift(np.uint64(1), counterparty_bits(uniques))
+        other = np.concatenate([codes[n:], codes[:n]])[sides]
+        self._fold(
+            slots, step,
+            np.concatenate([cents[rows], cents[rows]])[sides],
+            np.where(other >= 0, masks[other], np.uint64(0)),
+            np.concatenate([drained[rows], np.zeros(n, dtype=np.int32)])[sides],
+        )
+        self._latest_step = max(self._latest_step, step)
+
+    def update(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Velocity features of each row, then fold the rows into the store
+
+        Returns a float32 frame of VELOCITY_FEATURES aligned with ``df``.
+        Rows without account ids get zeros and are not stored.
+        """
+        features = np.zeros((len(df), len(VELOCITY_FEATURES)), dtype=np.float32)
+        if len(df) and 'nameOrig' in df.columns and 'nameDest' in df.columns:
+            steps = df['step'].to_numpy(dtype=np.int64)
+            orig = df['nameOrig'].to_numpy(dtype=object)
+            dest = df['nameDest'].to_numpy(dtype=object)
+            # Integer cents: sums are exact whatever order the rows are added in
+            cents = np.rint(np.nan_to_num(df['amount'].to_numpy(dtype=np.float64)) * 100).astype(np.int64)
+            drained = np.zeros(len(df), dtype=np.int32)
+            if 'oldbalanceOrg' in df.columns and 'newbalanceOrig' in df.columns:
+                drained = ((df['oldbalanceOrg'].to_numpy(dtype=np.float64) > 0)
+                           & (df['newbalanceOrig'].to_numpy(dtype=np.float64) == 0)).astype(np.int32)
+
+            order = np.argsort(steps, kind='stable')
+            groups = np.split(order, np.flatnonzero(np.diff(steps[order])) + 1)
+            with metrics.stage('velocity', len(df)), self._lock:
+                for rows in groups:
+                    self._update_step(int(steps[rows[0]]), orig, dest, cents, drained, features, rows)
+        return pd.DataFrame(features, columns=VELOCITY_FEATURES, index=df.index)
+
+    def stats(self) -> Dict:
+        """Size and settings of the store, for health checks and benchmarks"""
+        return {
+            'accounts': len(self._slots),
+            'capacity': len(self._accounts),
+            'max_accounts': self.max_accounts,
+            'window_steps': self.window_steps,
+            'latest_step': None if self._latest_step == _NO_STEP else int(self._latest_step),
+        }
+
+def add_velocity_features(df: pd.DataFrame, store: Optional[VelocityStore] = None) -> pd.DataFrame:
+    """``df`` with its velocity features appended, folding it into ``store``
+
+    A fresh store is used when none is given (e.g. a training file replayed
+    from the start).
+    """
+    store = store if store is not None else VelocityStore()
+    return pd.concat([df, store.update(df)], axis=1)